@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - Backtest
+===============================
+Yerel 1m kline dosyalarını bot_ultra'nın run_scalping / run_grid / run_dca
+karar mantığından AYNEN geçirir. Dolumlar PaperTrading, GridBot, TrailingTP
+ve TradingState ile simüle edilir; saat set_clock() ile enjekte edilir.
+
+- Veri NumPy dizilerinde (KlineWindow), strateji zaman dilimine tek geçişte örneklenir
+- Strateji her mum kapanışında çalışır (canlı WebSocket döngüsüyle aynı)
+- Mum içi SL/TP/trailing kontrolü 1m mumların OHLC yolu üzerinden yapılır;
+  pozisyonun tetiklenemeyeceği mumlar vektörel olarak atlanır
+
+Kullanım:
+    python backtest.py BTCUSDT-1m-2024-*.zip --mode scalping --balance 100
+    python backtest.py veri.npz --mode grid --interval 5m --verbose
+
+Dosyalar: data.binance.vision kline CSV/ZIP (başlıklı veya başlıksız) ya da
+--cache ile kaydedilmiş .npz
+"""
+
+import os
+import io
+import sys
+import glob
+import time
+import zipfile
+import itertools
+import argparse
+import contextlib
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+import bot_ultra as bot
+from kline_store import KlineWindow, FIELDS, interval_ms
+
+EPOCH = datetime(1970, 1, 1)
+# Backtest süresince değiştirilen bot_ultra global'leri - run() sonunda geri yüklenir
+BOT_GLOBALS = ("market_feed", "paper_trader", "grid_bot", "trailing_tp", "dca_bot", "state")
+BASE_INTERVAL_MS = 60_000
+
+# ===========================================
+# VERİ
+# ===========================================
+
+def _read_csv(stream) -> np.ndarray:
+    """Binance kline CSV'si -> (n, 6) dizi: open_time, open, high, low, close, volume"""
+    lines = io.TextIOWrapper(stream, encoding="utf-8")
+    first = lines.readline()
+    # Yeni dosyalarda başlık satırı var
+    rows = [first] if first[:1].isdigit() else []
+    return np.loadtxt(itertools.chain(rows, lines), delimiter=",", usecols=(0, 1, 2, 3, 4, 5),
+                      dtype=np.float64, ndmin=2)
+
+def load_klines(paths: List[str]) -> KlineWindow:
+    """CSV / ZIP / NPZ dosyalarını yükle - zamana göre sıralı, tekrarsız"""
+    parts = []
+    for path in paths:
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                parts.append(np.column_stack([data["time"].astype(np.float64)] + [data[name] for name in FIELDS]))
+        elif path.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.namelist():
+                    if member.endswith(".csv"):
+                        with archive.open(member) as stream:
+                            parts.append(_read_csv(stream))
+        else:
+            with open(path, "rb") as stream:
+                parts.append(_read_csv(stream))
+
+    if not parts:
+        raise ValueError("Kline dosyası bulunamadı")
+
+    data = np.concatenate(parts)
+    times = data[:, 0].astype(np.int64)
+    # Yeni spot dosyaları mikrosaniye kullanır
+    times = np.where(times > 10 ** 14, times // 1000, times)
+    times, first = np.unique(times, return_index=True)
+    data = data[first]
+    return KlineWindow(times, *(np.ascontiguousarray(data[:, i + 1]) for i in range(len(FIELDS))))
+
+def save_npz(path: str, candles: KlineWindow):
+    """Yüklenen veriyi hızlı tekrar kullanım için kaydet"""
+    np.savez(path, time=candles.time, **{name: getattr(candles, name) for name in FIELDS})
+
+def resample(candles: KlineWindow, interval: str) -> Tuple[KlineWindow, np.ndarray]:
+    """
+    1m mumları interval'e örnekle - (mumlar, sınırlar)
+    k. mum 1m indeksleri [sınırlar[k], sınırlar[k+1]) aralığıdır. Veri sonundaki yarım mum atılır.
+    """
+    ms = interval_ms(interval)
+    bucket = candles.time // ms
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    if len(starts) and candles.time[-1] + BASE_INTERVAL_MS < (bucket[-1] + 1) * ms:
+        end = starts[-1]
+        starts = starts[:-1]
+    else:
+        end = len(candles)
+    if not len(starts):
+        empty = np.array([], dtype=np.float64)
+        return KlineWindow(np.array([], dtype=np.int64), *([empty] * len(FIELDS))), np.array([0])
+
+    last = np.concatenate((starts[1:], [end])) - 1
+    bars = KlineWindow(
+        bucket[starts] * ms,
+        candles.open[starts],
+        np.maximum.reduceat(candles.high[:end], starts),
+        np.minimum.reduceat(candles.low[:end], starts),
+        candles.close[last],
+        np.add.reduceat(candles.volume[:end], starts),
+    )
+    return bars, np.concatenate((starts, [end]))
+
+# ===========================================
+# SİMÜLE PİYASA
+# ===========================================
+
+class BacktestFeed:
+    """
+    bot_ultra.market_feed yerine geçer - simüle saatte kapanmış mumların
+    view'ı (tek thread, KlineStore kullanılmaz) ve anlık fiyat (REST'e hiç düşülmez)
+    """
+
+    def __init__(self, symbol: str, candles: KlineWindow):
+        self.symbols = [symbol.upper()]
+        self.candles = candles
+        self.bars: Dict[str, KlineWindow] = {}
+        self.now_ms = int(candles.time[0]) if len(candles) else 0
+        self.price = 0.0
+
+    def now(self) -> datetime:
+        return EPOCH + timedelta(milliseconds=self.now_ms)
+
+    def series(self, interval: str) -> KlineWindow:
+        if interval not in self.bars:
+            self.bars[interval] = resample(self.candles, interval)[0]
+        return self.bars[interval]
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> KlineWindow:
+        bars = self.series(interval)
+        # now_ms itibarıyla kapanmış mumlar
+        closed = int(np.searchsorted(bars.time, self.now_ms - interval_ms(interval), side="right"))
+        return bars[max(0, closed - limit):closed]
+
+    def mark_price(self, symbol: str, max_age: float) -> float:
+        return self.price
+
+    def funding_rate(self, symbol: str, max_age: float) -> float:
+        return 0.0
+
+# ===========================================
+# BACKTEST MOTORU
+# ===========================================
+
+class Backtester:
+    """run_strategy'yi her strateji mumu kapanışında, pozisyon kontrollerini 1m OHLC yolunda çalıştırır"""
+
+    def __init__(self, candles: KlineWindow, mode: str = "scalping", symbol: str = "BTCUSDT",
+                 interval: str = "5m", balance: float = 100.0, verbose: bool = False,
+                 max_consecutive_losses: Optional[int] = None):
+        self.candles = candles
+        self.mode = mode
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.balance = balance
+        self.verbose = verbose
+        # None: CONFIG'deki MAX_CONSECUTIVE_LOSSES (gün dönümünde sıfırlanır)
+        self.max_consecutive_losses = max_consecutive_losses
+        self.feed = BacktestFeed(self.symbol, candles)
+
+    def _reset_bot(self):
+        """Bot'un global durumunu temiz, simüle saate bağlı nesnelerle değiştir"""
+        bot.CONFIG.update({
+            "TRADING_MODE": self.mode,
+            "PAPER_TRADING": True,
+            "PAPER_BALANCE": self.balance,
+            "SYMBOL": self.symbol,
+            "MARKET_WS_ENABLED": False,
+            "TELEGRAM_BOT_TOKEN": "",
+        })
+        if self.max_consecutive_losses is not None:
+            bot.CONFIG["MAX_CONSECUTIVE_LOSSES"] = self.max_consecutive_losses
+        bot.set_clock(self.feed.now)
+        bot.market_feed = self.feed
+        bot.paper_trader = bot.PaperTrading(self.balance)
+        bot.grid_bot = bot.GridBot()
+        bot.trailing_tp = bot.TrailingTP()
+        bot.dca_bot = bot.DCABot()
+        bot.state = bot.TradingState()
+        bot.state.starting_balance = self.balance
+        bot._trend_indicators.clear()
+        bot.trade_rejections.clear()
+
+    def _may_trigger(self, high: float, low: float) -> bool:
+        """Bu fiyat aralığında SL/TP/trailing bir şey yapabilir mi?"""
+        pos = bot.paper_trader.positions.get(self.symbol)
+        if pos is not None:
+            if pos["side"] == "BUY" and (low <= pos["sl"] or high >= pos["tp"]):
+                return True
+            if pos["side"] != "BUY" and (high >= pos["sl"] or low <= pos["tp"]):
+                return True
+
+        trail = bot.trailing_tp.active_trails.get(self.symbol)
+        if trail is not None:
+            if trail["activated"]:
+                return True
+            if trail["side"] == "BUY":
+                return high >= trail["entry"] * (1 + trail["activation_pct"] / 100)
+            return low <= trail["entry"] * (1 - trail["activation_pct"] / 100)
+        return False
+
+    def _walk(self, lo: int, hi: int):
+        """Strateji mumunun içindeki 1m mumlarda pozisyonları OHLC yolu boyunca kontrol et"""
+        c = self.candles
+        if lo >= hi or not self._may_trigger(c.high[lo:hi].max(), c.low[lo:hi].min()):
+            return
+        for j in range(lo, hi):
+            if not self._may_trigger(c.high[j], c.low[j]):
+                continue
+            o, h, l, cl = float(c.open[j]), float(c.high[j]), float(c.low[j]), float(c.close[j])
+            self.feed.now_ms = int(c.time[j]) + BASE_INTERVAL_MS
+            # Yükselen mumda önce dip, düşen mumda önce tepe
+            for price in ((o, l, h, cl) if cl >= o else (o, h, l, cl)):
+                self.feed.price = price
+                bot.check_positions(price)
+
+    def run(self) -> dict:
+        started = time.monotonic()
+        bars, bounds = resample(self.candles, self.interval)
+        ms = interval_ms(self.interval)
+        equity = np.empty(len(bars))
+
+        previous = {name: getattr(bot, name) for name in BOT_GLOBALS}
+        previous_config = dict(bot.CONFIG)
+        previous_indicators = dict(bot._trend_indicators)
+        previous_rejections = list(bot.trade_rejections)
+        out = sys.stdout if self.verbose else open(os.devnull, "w")
+        try:
+            self._reset_bot()
+            with contextlib.redirect_stdout(out):
+                for k in range(len(bars)):
+                    self._walk(int(bounds[k]), int(bounds[k + 1]))
+                    self.feed.now_ms = int(bars.time[k]) + ms
+                    self.feed.price = float(bars.close[k])
+                    bot.run_strategy()
+                    equity[k] = self._equity(float(bars.close[k]))
+            return self._summary(bars, equity, time.monotonic() - started)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            bot.set_clock(None)
+            for name, value in previous.items():
+                setattr(bot, name, value)
+            bot.CONFIG.clear()
+            bot.CONFIG.update(previous_config)
+            bot._trend_indicators.clear()
+            bot._trend_indicators.update(previous_indicators)
+            bot.trade_rejections[:] = previous_rejections
+
+    def _equity(self, price: float) -> float:
+        """Bakiye + açık paper pozisyonlar ve DCA birikimi kapanışa göre değerlenmiş (gerçekleşmemiş PnL dahil)"""
+        equity = bot.paper_trader.balance
+        for pos in bot.paper_trader.positions.values():
+            if pos["side"] == "BUY":
+                equity += (price - pos["entry_price"]) * pos["quantity"]
+            else:
+                equity += (pos["entry_price"] - price) * pos["quantity"]
+        # Paper DCA alımları bakiyeden düşmez - yalnızca değer farkı eklenir
+        equity += bot.dca_bot.total_quantity * price - bot.dca_bot.total_invested
+        return equity
+
+    def _summary(self, bars: KlineWindow, equity: np.ndarray, elapsed: float) -> dict:
+        stats = bot.paper_trader.get_stats()
+        peak = np.maximum.accumulate(equity) if len(equity) else equity
+        # Tepe <= 0 (sermaye hiç pozitif olmadı) ise düşüş %100
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = float(np.where(peak > 0, (peak - equity) / peak, 1.0).max() * 100) if len(equity) else 0.0
+        result = {
+            "mode": self.mode,
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "start": str(EPOCH + timedelta(milliseconds=int(self.candles.time[0]))) if len(self.candles) else None,
+            "end": str(EPOCH + timedelta(milliseconds=int(self.candles.time[-1]))) if len(self.candles) else None,
+            "candles": len(self.candles),
+            "bars": len(bars),
+            "elapsed_s": round(elapsed, 2),
+            "final_balance": round(stats["balance"], 2),
+            "total_pnl": round(stats["total_pnl"], 2),
+            "trades": stats["trades"],
+            "wins": stats["wins"],
+            "losses": stats["losses"],
+            "win_rate": round(stats["win_rate"], 1),
+            "max_drawdown_pct": round(drawdown, 2),
+        }
+        if self.mode == "grid":
+            result["grid"] = bot.grid_bot.get_stats()
+        if self.mode == "dca":
+            dca = bot.dca_bot.get_stats()
+            last_price = float(bars.close[-1]) if len(bars) else 0.0
+            dca["unrealized_pnl"] = round(dca["total_quantity"] * last_price - dca["total_invested"], 2)
+            result["dca"] = dca
+        return result
+
+# ===========================================
+# CLI
+# ===========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="MicroTrend Bot ULTRA backtest")
+    parser.add_argument("files", nargs="+", help="1m kline CSV/ZIP/NPZ dosyaları (glob desteklenir)")
+    parser.add_argument("--mode", default=bot.CONFIG["TRADING_MODE"], choices=["scalping", "grid", "dca"])
+    parser.add_argument("--symbol", default=bot.CONFIG["SYMBOL"])
+    parser.add_argument("--interval", default="5m", help="Strateji mumu (canlıda STRATEGY_INTERVAL)")
+    parser.add_argument("--balance", type=float, default=bot.CONFIG["PAPER_BALANCE"])
+    parser.add_argument("--max-losses", type=int, default=None,
+                        help="Ardışık kayıp limiti (varsayılan: MAX_CONSECUTIVE_LOSSES)")
+    parser.add_argument("--cache", help="Yüklenen veriyi bu .npz dosyasına kaydet")
+    parser.add_argument("--verbose", action="store_true", help="Bot çıktısını göster")
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.files for p in (glob.glob(pattern) or [pattern]))
+    t0 = time.monotonic()
+    candles = load_klines(paths)
+    print(f"📂 {len(paths)} dosya, {len(candles):,} mum yüklendi ({time.monotonic() - t0:.1f} sn)")
+    if args.cache:
+        save_npz(args.cache, candles)
+        print(f"💾 Önbellek: {args.cache}")
+
+    result = Backtester(candles, args.mode, args.symbol, args.interval, args.balance, args.verbose,
+                        args.max_losses).run()
+
+    print(f"\n{'='*50}\n📊 BACKTEST | {result['mode'].upper()} | {result['symbol']} {result['interval']}\n{'='*50}")
+    print(f"📅 {result['start']} → {result['end']} ({result['bars']:,} mum)")
+    print(f"💰 Bakiye: ${args.balance:.2f} → ${result['final_balance']:.2f} (PnL: ${result['total_pnl']:+.2f})")
+    print(f"🎯 İşlem: {result['trades']} | Kazanç: {result['wins']} | Kayıp: {result['losses']} | Win: %{result['win_rate']:.0f}")
+    print(f"📉 Max Drawdown: %{result['max_drawdown_pct']:.2f}")
+    if "grid" in result:
+        print(f"📈 Grid: {result['grid']['filled_grids']}/{result['grid']['total_grids']} dolu")
+    if "dca" in result:
+        dca = result["dca"]
+        print(f"💵 DCA: {dca['positions']} alım, ortalama ${dca['average_price']:,.2f}, "
+              f"gerçekleşmemiş PnL ${dca['unrealized_pnl']:+.2f}")
+    print(f"⚡ Süre: {result['elapsed_s']} sn")
+
+if __name__ == "__main__":
+    main()
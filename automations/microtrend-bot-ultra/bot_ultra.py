@@ -25,9 +25,13 @@ import json
 import hmac
 import hashlib
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Callable
 import requests
 from dotenv import load_dotenv
+from market_data import MarketDataFeed, WS_MAINNET_URL, WS_TESTNET_URL, KLINE_HISTORY
+from kline_store import KlineStore, KlineWindow, interval_ms
+from indicators import ema_series, rsi_series, atr_series
+from streaming_indicators import StreamingEMA, StreamingRSI, StreamingATR
 
 load_dotenv()
 
@@ -42,6 +46,12 @@ CONFIG = {
     "BASE_URL": "https://fapi.binance.com",
     "TESTNET": os.getenv("BINANCE_TESTNET", "true").lower() == "true",
     
+    # WebSocket piyasa verisi (REST polling yerine)
+    "MARKET_WS_ENABLED": os.getenv("MARKET_WS_ENABLED", "true").lower() == "true",
+    "MARKET_WS_URL": os.getenv("MARKET_WS_URL", ""),  # Boşsa Binance (testnet/mainnet); test için ws://127.0.0.1:8765
+    "MARKET_WS_MAX_AGE": float(os.getenv("MARKET_WS_MAX_AGE", "5")),  # Bundan eski fiyat -> REST fallback (sn)
+    "STRATEGY_INTERVAL": os.getenv("STRATEGY_INTERVAL", "5m"),  # Strateji bu mum kapanınca çalışır
+    
     # Trading Mode: "scalping", "grid", "dca", "arbitrage"
     "TRADING_MODE": os.getenv("TRADING_MODE", "scalping"),
     
@@ -109,6 +119,9 @@ CONFIG = {
     "TELEGRAM_CHAT_ID": os.getenv("TELEGRAM_CHAT_ID", ""),
 }
 
+if not CONFIG["MARKET_WS_URL"]:
+    CONFIG["MARKET_WS_URL"] = WS_TESTNET_URL if CONFIG["TESTNET"] else WS_MAINNET_URL
+
 if CONFIG["TESTNET"]:
     CONFIG["BASE_URL"] = "https://testnet.binancefuture.com"
     print("⚠️ TESTNET MODU AKTİF")
@@ -116,6 +129,21 @@ if CONFIG["TESTNET"]:
 if CONFIG["PAPER_TRADING"]:
     print("📝 PAPER TRADING MODU AKTİF - Gerçek işlem yapılmayacak")
 
+# ===========================================
+# SAAT (backtest simüle saat enjekte eder)
+# ===========================================
+
+_clock: Callable[[], datetime] = datetime.now
+
+def current_time() -> datetime:
+    """Strateji ve state'in kullandığı saat - canlıda datetime.now()"""
+    return _clock()
+
+def set_clock(clock: Optional[Callable[[], datetime]]):
+    """Saat kaynağını değiştir (None: gerçek saat)"""
+    global _clock
+    _clock = clock or datetime.now
+
 # ===========================================
 # ULTRA: TRADE REJECTION REASONS
 # ===========================================
@@ -125,7 +153,7 @@ trade_rejections = []
 def add_rejection(reason: str):
     """Trade rejection nedenini kaydet"""
     trade_rejections.append({
-        "time": datetime.now().isoformat(),
+        "time": current_time().isoformat(),
         "reason": reason
     })
     print(f"⚠️ İşlem açılmadı: {reason}")
@@ -224,7 +252,7 @@ def check_multi_tf_confluence() -> Tuple[bool, str, dict]:
         try:
             klines = get_klines(tf, 50)
             if klines:
-                trend = analyze_trend(klines)
+                trend = analyze_trend(klines, trend_indicators(CONFIG["SYMBOL"], tf, klines))
                 trends[tf] = trend
         except:
             trends[tf] = "NEUTRAL"
@@ -272,7 +300,7 @@ class DCABot:
     
     def should_buy(self, current_price: float) -> bool:
         """DCA alım zamanı mı?"""
-        now = datetime.now()
+        now = current_time()
         
         # İlk alım
         if self.last_buy_time is None:
@@ -298,12 +326,12 @@ class DCABot:
         self.total_invested += amount_usd
         self.total_quantity += quantity
         self.average_price = self.total_invested / self.total_quantity
-        self.last_buy_time = datetime.now()
+        self.last_buy_time = current_time()
         
         self.positions.append({
             "price": price,
             "quantity": quantity,
-            "time": datetime.now().isoformat()
+            "time": current_time().isoformat()
         })
         
         print(f"💰 [DCA] AL @ ${price:,.2f} | Miktar: {quantity:.6f}")
@@ -350,6 +378,11 @@ class PaperTrading:
         self.positions = {}
         self.trades = []
         self.pnl = 0.0
+        # get_stats sayaçları - yalnızca yeni kapanan işlemler sayılır
+        self._counted = 0
+        self._wins = 0
+        self._losses = 0
+        self._counted_list = self.trades
         
     def open_position(self, symbol: str, side: str, quantity: float, entry_price: float, sl: float, tp: float):
         """Simüle pozisyon aç"""
@@ -359,7 +392,7 @@ class PaperTrading:
             "entry_price": entry_price,
             "sl": sl,
             "tp": tp,
-            "opened_at": datetime.now().isoformat()
+            "opened_at": current_time().isoformat()
         }
         print(f"📝 [PAPER] {side} {symbol}: {quantity} @ ${entry_price:,.2f}")
         return True
@@ -407,7 +440,7 @@ class PaperTrading:
             "quantity": pos["quantity"],
             "pnl": pnl,
             "reason": reason,
-            "closed_at": datetime.now().isoformat()
+            "closed_at": current_time().isoformat()
         }
         self.trades.append(trade)
         
@@ -422,8 +455,17 @@ class PaperTrading:
         return self.balance
     
     def get_stats(self) -> dict:
-        wins = len([t for t in self.trades if t["pnl"] > 0])
-        losses = len([t for t in self.trades if t["pnl"] < 0])
+        # Liste değiştiyse (ör. /api/paper/reset) baştan say
+        if self.trades is not self._counted_list or len(self.trades) < self._counted:
+            self._counted = self._wins = self._losses = 0
+            self._counted_list = self.trades
+        for t in self.trades[self._counted:]:
+            if t["pnl"] > 0:
+                self._wins += 1
+            elif t["pnl"] < 0:
+                self._losses += 1
+        self._counted = len(self.trades)
+        wins, losses = self._wins, self._losses
         return {
             "balance": self.balance,
             "total_pnl": self.pnl,
@@ -587,14 +629,15 @@ class TradingState:
         self.daily_pnl = 0.0
         self.starting_balance = 0.0
         self.last_trade_time = None
-        self.last_reset_date = datetime.now().date()
+        self.last_reset_date = current_time().date()
         self.mode = CONFIG["TRADING_MODE"]
     
     def reset_daily(self):
-        today = datetime.now().date()
+        today = current_time().date()
         if today > self.last_reset_date:
             self.trades_today = 0
             self.losses_today = 0
+            self.consecutive_losses = 0
             self.daily_pnl = 0.0
             self.last_reset_date = today
             print(f"📅 Günlük limitler sıfırlandı: {today}")
@@ -626,7 +669,7 @@ class TradingState:
             self.consecutive_losses += 1
         else:
             self.consecutive_losses = 0
-        self.last_trade_time = datetime.now()
+        self.last_trade_time = current_time()
 
 state = TradingState()
 
@@ -650,6 +693,8 @@ def api_request(method: str, endpoint: str, params: dict = None, signed: bool =
     try:
         if method == "GET":
             r = requests.get(url, params=params, headers=headers, timeout=10)
+        elif method == "DELETE":
+            r = requests.delete(url, params=params, headers=headers, timeout=10)
         else:
             r = requests.post(url, params=params, headers=headers, timeout=10)
         r.raise_for_status()
@@ -668,21 +713,98 @@ def get_account_balance() -> float:
     return 0.0
 
 def get_mark_price() -> float:
+    if market_feed is not None:
+        price = market_feed.mark_price(CONFIG["SYMBOL"], CONFIG["MARKET_WS_MAX_AGE"])
+        if price is not None:
+            return price
     data = api_request("GET", "/fapi/v1/premiumIndex", {"symbol": CONFIG["SYMBOL"]})
     return float(data.get("markPrice", 0))
 
-def get_klines(interval: str = "5m", limit: int = 100) -> List[dict]:
-    data = api_request("GET", "/fapi/v1/klines", {"symbol": CONFIG["SYMBOL"], "interval": interval, "limit": limit})
-    return [{"open": float(k[1]), "high": float(k[2]), "low": float(k[3]), "close": float(k[4]), "volume": float(k[5])} for k in data]
+def fetch_klines(symbol: str, interval: str = "5m", limit: int = 100, start_time: Optional[int] = None) -> List[dict]:
+    """REST kline'ları (açılış zamanı dahil)"""
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = start_time
+    data = api_request("GET", "/fapi/v1/klines", params)
+    if not isinstance(data, list):
+        return []
+    return [{"time": int(k[0]), "open": float(k[1]), "high": float(k[2]), "low": float(k[3]), "close": float(k[4]), "volume": float(k[5])} for k in data]
+
+# (sembol, tf) başına ring buffer - REST ve WebSocket aynı depoya yazar
+kline_store = KlineStore(KLINE_HISTORY)
+
+def get_symbol_klines(symbol: str, interval: str = "5m", limit: int = 100) -> KlineWindow:
+    """
+    Son limit mumun anlık kopyası (kilit altında) - depoda olan geçmiş bir daha çekilmez
+    WebSocket canlıysa doğrudan depodan; değilse REST'ten yalnızca son mumdan bu yana gelenler.
+    """
+    limit = min(limit, kline_store.capacity)
+    if market_feed is not None and symbol.upper() in market_feed.symbols:
+        window = market_feed.get_klines(symbol, interval, limit)
+        if window is not None:
+            return window
+    
+    last = kline_store.last_time(symbol, interval)
+    if last is None or kline_store.size(symbol, interval) < limit:
+        # İlk yükleme (veya daha uzun pencere istendi)
+        kline_store.extend(symbol, interval, fetch_klines(symbol, interval, limit))
+    else:
+        # Devam eden son mumdan itibaren: güncellenen + yeni kapanan mumlar
+        missing = (int(time.time() * 1000) - last) // interval_ms(interval) + 1
+        if missing >= limit:
+            kline_store.extend(symbol, interval, fetch_klines(symbol, interval, limit))
+        else:
+            kline_store.extend(symbol, interval, fetch_klines(symbol, interval, missing + 1, start_time=last))
+    return kline_store.window(symbol, interval, limit)
+
+def get_klines(interval: str = "5m", limit: int = 100) -> KlineWindow:
+    return get_symbol_klines(CONFIG["SYMBOL"], interval, limit)
 
 def get_funding_rate() -> float:
+    if market_feed is not None:
+        rate = market_feed.funding_rate(CONFIG["SYMBOL"], CONFIG["MARKET_WS_MAX_AGE"])
+        if rate is not None:
+            return rate
     data = api_request("GET", "/fapi/v1/premiumIndex", {"symbol": CONFIG["SYMBOL"]})
     return float(data.get("lastFundingRate", 0))
 
+# ===========================================
+# WEBSOCKET PİYASA VERİSİ
+# ===========================================
+
+market_feed: Optional[MarketDataFeed] = None
+
+def start_market_feed() -> bool:
+    """markPrice/kline/aggTrade akışlarına abone ol - başarısızsa REST polling devam eder"""
+    global market_feed
+    
+    if not CONFIG["MARKET_WS_ENABLED"] or market_feed is not None:
+        return market_feed is not None
+    
+    intervals = [CONFIG["STRATEGY_INTERVAL"]]
+    if CONFIG["MULTI_TF_ENABLED"]:
+        intervals += [tf for tf in ["5m", "15m", "1h", "4h"] if tf not in intervals]
+    
+    feed = MarketDataFeed(
+        [CONFIG["SYMBOL"]], intervals, CONFIG["MARKET_WS_URL"],
+        seed=lambda symbol, tf: fetch_klines(symbol, tf, 100), store=kline_store
+    )
+    if not feed.start():
+        return False
+    market_feed = feed
+    return True
+
 def place_order(side: str, quantity: float, sl: float, tp: float) -> bool:
     if CONFIG["PAPER_TRADING"]:
         price = get_mark_price()
-        return paper_trader.open_position(CONFIG["SYMBOL"], side, quantity, price, sl, tp)
+        opened = paper_trader.open_position(CONFIG["SYMBOL"], side, quantity, price, sl, tp)
+        if opened and CONFIG["TRAILING_TP_ENABLED"]:
+            trailing_tp.activate(
+                CONFIG["SYMBOL"], price, side,
+                CONFIG["TRAILING_TP_ACTIVATION"],
+                CONFIG["TRAILING_TP_CALLBACK"]
+            )
+        return opened
     
     try:
         order = api_request("POST", "/fapi/v1/order", {
@@ -716,51 +838,114 @@ def place_order(side: str, quantity: float, sl: float, tp: float) -> bool:
         print(f"❌ Order: {e}")
         return False
 
+def close_position_market(symbol: str) -> bool:
+    """
+    Açık pozisyonu reduce-only MARKET emriyle kapat, kalan SL/TP emirlerini iptal et
+    Pozisyon artık kapalıysa True, kapatma emri başarısızsa False.
+    """
+    data = api_request("GET", "/fapi/v2/positionRisk", {"symbol": symbol}, signed=True)
+    if not isinstance(data, list):
+        return False
+    amount = sum(float(p.get("positionAmt", 0)) for p in data if p.get("symbol") == symbol)
+    
+    if amount != 0:
+        order = api_request("POST", "/fapi/v1/order", {
+            "symbol": symbol, "side": "SELL" if amount > 0 else "BUY", "type": "MARKET",
+            "quantity": abs(amount), "reduceOnly": "true"
+        }, signed=True)
+        if not order.get("orderId"):
+            return False
+    
+    # closePosition SL/TP emirleri pozisyon kapanınca kendiliğinden silinmez
+    api_request("DELETE", "/fapi/v1/allOpenOrders", {"symbol": symbol}, signed=True)
+    return True
+
 # ===========================================
 # TEKNİK ANALİZ
 # ===========================================
 
+# Seriler indicators.py'de (NumPy, tek geçiş); buradakiler son değeri döndürür
+
 def calculate_ema(prices: List[float], period: int) -> float:
     if len(prices) < period:
         return 0
-    k = 2 / (period + 1)
-    ema = sum(prices[:period]) / period
-    for p in prices[period:]:
-        ema = (p - ema) * k + ema
-    return ema
+    return float(ema_series(prices, period)[-1])
 
 def calculate_rsi(prices: List[float], period: int = 14) -> float:
     if len(prices) < period + 1:
         return 50
-    gains, losses = [], []
-    for i in range(1, len(prices)):
-        d = prices[i] - prices[i-1]
-        gains.append(d if d > 0 else 0)
-        losses.append(abs(d) if d < 0 else 0)
-    avg_g = sum(gains[-period:]) / period
-    avg_l = sum(losses[-period:]) / period
-    if avg_l == 0:
-        return 100
-    return 100 - (100 / (1 + avg_g / avg_l))
+    # Son period değişimin basit ortalaması (Wilder değil) - mevcut eşikler buna göre
+    return float(rsi_series(prices, period, wilder=False)[-1])
+
+def kline_column(klines, field: str):
+    """KlineWindow'dan NumPy sütunu (ek kopya yok), dict listesinden liste"""
+    if isinstance(klines, KlineWindow):
+        return getattr(klines, field)
+    return [k[field] for k in klines]
 
 def calculate_atr(klines: List[dict], period: int = 14) -> float:
     if len(klines) < period + 1:
         return 0
-    trs = []
-    for i in range(1, len(klines)):
-        tr = max(klines[i]["high"] - klines[i]["low"],
-                 abs(klines[i]["high"] - klines[i-1]["close"]),
-                 abs(klines[i]["low"] - klines[i-1]["close"]))
-        trs.append(tr)
-    return sum(trs[-period:]) / period
-
-def analyze_trend(klines: List[dict]) -> str:
-    closes = [k["close"] for k in klines]
-    ema20, ema50 = calculate_ema(closes, 20), calculate_ema(closes, 50)
+    return float(atr_series(kline_column(klines, "high"), kline_column(klines, "low"),
+                            kline_column(klines, "close"), period)[-1])
+
+class TrendIndicators:
+    """
+    (sembol, tf) başına streaming EMA20/EMA50/RSI14/ATR14 - mum başına O(1)
+    sync() yalnızca son işlenen mumdan (devam eden mumun revizyonu dahil) sonrasını uygular.
+    """
+    
+    def __init__(self):
+        self.ema_fast = StreamingEMA(20)
+        self.ema_slow = StreamingEMA(50)
+        self.rsi = StreamingRSI(14, wilder=False)
+        self.atr = StreamingATR(14)
+        self.last_time: Optional[int] = None
+    
+    def update(self, candle: dict):
+        for indicator in (self.ema_fast, self.ema_slow, self.rsi, self.atr):
+            indicator.update(candle)
+        self.last_time = candle["time"]
+    
+    def sync(self, klines: KlineWindow) -> "TrendIndicators":
+        times = klines.time
+        if not len(times):
+            return self
+        start = 0
+        if self.last_time is not None:
+            start = int(times.searchsorted(self.last_time))
+            if start >= len(times) or times[start] != self.last_time:
+                # Pencere son işlenen mumu kapsamıyor (uzun kopukluk) - baştan kur
+                self.__init__()
+                start = 0
+        for i in range(start, len(times)):
+            self.update(klines[i])
+        return self
+
+_trend_indicators: Dict[Tuple[str, str], TrendIndicators] = {}
+
+def trend_indicators(symbol: str, interval: str, klines) -> Optional[TrendIndicators]:
+    """Depodan gelen pencere için güncel streaming indikatörler (dict listesi için None)"""
+    if not isinstance(klines, KlineWindow):
+        return None
+    tracker = _trend_indicators.setdefault((symbol.upper(), interval), TrendIndicators())
+    return tracker.sync(klines)
+
+def analyze_trend(klines: List[dict], indicators: Optional[TrendIndicators] = None) -> str:
+    if indicators is not None:
+        ema20, ema50 = indicators.ema_fast.value or 0, indicators.ema_slow.value or 0
+    else:
+        closes = kline_column(klines, "close")
+        ema20, ema50 = calculate_ema(closes, 20), calculate_ema(closes, 50)
     return "LONG" if ema20 > ema50 else "SHORT" if ema20 < ema50 else "NEUTRAL"
 
-def check_pullback(klines: List[dict], trend: str) -> bool:
-    rsi = calculate_rsi([k["close"] for k in klines], 14)
+def current_rsi(klines: List[dict], indicators: Optional[TrendIndicators] = None) -> float:
+    if indicators is not None:
+        return indicators.rsi.value if indicators.rsi.value is not None else 50
+    return calculate_rsi(kline_column(klines, "close"), 14)
+
+def check_pullback(klines: List[dict], trend: str, indicators: Optional[TrendIndicators] = None) -> bool:
+    rsi = current_rsi(klines, indicators)
     if trend == "LONG":
         return CONFIG["RSI_LONG_MIN"] <= rsi <= CONFIG["RSI_LONG_MAX"]
     elif trend == "SHORT":
@@ -772,7 +957,7 @@ def check_pullback(klines: List[dict], trend: str) -> bool:
 # ===========================================
 
 def run_scalping():
-    print(f"\n{'='*50}\n⏰ {datetime.now().strftime('%H:%M:%S')} | SCALPING\n{'='*50}")
+    print(f"\n{'='*50}\n⏰ {current_time().strftime('%H:%M:%S')} | SCALPING\n{'='*50}")
     
     can, reason = state.can_trade()
     if not can:
@@ -784,18 +969,19 @@ def run_scalping():
         return
     
     price = klines[-1]["close"]
-    trend = analyze_trend(klines)
+    indicators = trend_indicators(CONFIG["SYMBOL"], "5m", klines)
+    trend = analyze_trend(klines, indicators)
     print(f"💰 {CONFIG['SYMBOL']}: ${price:,.2f} | Trend: {trend}")
     
     if trend == "NEUTRAL":
         return
     
-    if not check_pullback(klines, trend):
-        rsi = calculate_rsi([k["close"] for k in klines], 14)
+    if not check_pullback(klines, trend, indicators):
+        rsi = current_rsi(klines, indicators)
         print(f"⏳ Pullback bekleniyor (RSI: {rsi:.1f})")
         return
     
-    atr = calculate_atr(klines)
+    atr = (indicators.atr.value or 0) if indicators is not None else calculate_atr(klines)
     balance = get_account_balance()
     risk = balance * CONFIG["RISK_PER_TRADE"]
     
@@ -819,7 +1005,7 @@ def run_scalping():
 # ===========================================
 
 def run_grid():
-    print(f"\n{'='*50}\n⏰ {datetime.now().strftime('%H:%M:%S')} | GRID BOT\n{'='*50}")
+    print(f"\n{'='*50}\n⏰ {current_time().strftime('%H:%M:%S')} | GRID BOT\n{'='*50}")
     
     price = get_mark_price()
     print(f"💰 {CONFIG['SYMBOL']}: ${price:,.2f}")
@@ -867,7 +1053,7 @@ def run_grid():
 # ===========================================
 
 def run_dca():
-    print(f"\n{'='*50}\n⏰ {datetime.now().strftime('%H:%M:%S')} | DCA BOT\n{'='*50}")
+    print(f"\n{'='*50}\n⏰ {current_time().strftime('%H:%M:%S')} | DCA BOT\n{'='*50}")
     
     price = get_mark_price()
     print(f"💰 {CONFIG['SYMBOL']}: ${price:,.2f}")
@@ -906,13 +1092,71 @@ def run_strategy():
     
     # Paper trading pozisyon kontrolü
     if CONFIG["PAPER_TRADING"]:
-        price = get_mark_price()
-        paper_trader.check_position(CONFIG["SYMBOL"], price)
+        check_positions(get_mark_price())
         
         stats = paper_trader.get_stats()
         if stats["trades"] > 0:
             print(f"\n📝 Paper: ${stats['balance']:.2f} | Trades: {stats['trades']} | Win: %{stats['win_rate']:.0f}")
 
+def check_positions(price: float):
+    """SL/TP ve trailing TP kontrolü - WebSocket modunda her fiyat güncellemesinde"""
+    if price <= 0:
+        return
+    symbol = CONFIG["SYMBOL"]
+    
+    should_close, trail_price = trailing_tp.update(symbol, price)
+    if should_close:
+        print(f"🎯 Trailing TP tetiklendi @ ${trail_price:,.2f}")
+        if CONFIG["PAPER_TRADING"]:
+            trailing_tp.remove(symbol)
+            trade = paper_trader.close_position(symbol, price, "Trailing TP")
+            if trade:
+                state.record_trade(trade["pnl"])
+        elif close_position_market(symbol):
+            trailing_tp.remove(symbol)
+            send_telegram(f"🎯 Trailing TP tetiklendi, pozisyon kapatıldı: {symbol} @ ${price:,.2f}")
+        else:
+            # Trail kalır - sonraki fiyatta tekrar denenir
+            print("❌ Trailing TP kapatma emri başarısız")
+    
+    if CONFIG["PAPER_TRADING"]:
+        trade = paper_trader.check_position(symbol, price)
+        if trade:
+            trailing_tp.remove(symbol)
+            state.record_trade(trade["pnl"])
+
+def run_streaming_loop():
+    """
+    WebSocket döngüsü: her fiyatta pozisyon kontrolü, her mum kapanışında strateji
+    Akış kesikken strateji zamanlayıcıyla (mum süresi + MARKET_WS_MAX_AGE) REST üzerinden çalışır.
+    """
+    symbol, tf = CONFIG["SYMBOL"], CONFIG["STRATEGY_INTERVAL"]
+    strategy_period = interval_ms(tf) / 1000 + CONFIG["MARKET_WS_MAX_AGE"]
+    last_closed = market_feed.closed_count(symbol, tf)
+    last_run = time.monotonic()
+    last_price = None
+    
+    while True:
+        try:
+            if not market_feed.wait_for_update(CONFIG["MARKET_WS_MAX_AGE"]):
+                # Akış sessiz: REST'ten kontrol et, WebSocket kendi kendine yeniden bağlanır
+                print("⚠️ WebSocket verisi gecikti, REST fiyatı kullanılıyor")
+            
+            price = get_mark_price()
+            if price != last_price:
+                last_price = price
+                check_positions(price)
+            
+            closed = market_feed.closed_count(symbol, tf)
+            if closed != last_closed or time.monotonic() - last_run >= strategy_period:
+                last_closed = closed
+                last_run = time.monotonic()
+                run_strategy()
+        except Exception as e:
+            print(f"❌ {e}")
+            send_telegram(f"❌ Hata: {e}")
+            time.sleep(1)
+
 def main():
     print(f"""
 ╔═══════════════════════════════════════════════════════════╗
@@ -945,6 +1189,13 @@ def main():
     
     send_telegram(f"🚀 MicroTrend Bot ULTRA başlatıldı!\n💰 Bakiye: ${balance:.2f}\n📊 Mod: {CONFIG['TRADING_MODE']}")
     
+    if start_market_feed():
+        print(f"📡 WebSocket: {CONFIG['MARKET_WS_URL']} ({CONFIG['STRATEGY_INTERVAL']} kapanışında strateji)")
+        run_strategy()
+        run_streaming_loop()
+        return
+    
+    # REST polling (WebSocket kapalı/yüklü değil)
     while True:
         try:
             run_strategy()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - Vektörel İndikatörler
+============================================
+EMA / RSI / ATR / Bollinger / VWAP serilerini NumPy dizileri üzerinde tek
+geçişte hesaplar. Hepsi girdi ile aynı uzunlukta seri döndürür; değerin
+tanımsız olduğu baştaki konumlar NaN'dır.
+
+bot_ultra.calculate_* fonksiyonları bu serilerin son değerini döndürür
+(mevcut skaler sonuçlarla aynı). KlineWindow dizileri ek kopya olmadan okunur.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# EMA blok boyu: decay^-B bu değeri aşmasın (kayan nokta hatası ~1e-12 düzeyinde kalır)
+_EWM_MAX_SCALE = 1e4
+
+# ===========================================
+# YARDIMCILAR
+# ===========================================
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def _nan_series(n: int) -> np.ndarray:
+    return np.full(n, np.nan)
+
+def ewm(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """
+    y[i] = y[i-1] + alpha * (x[i] - y[i-1]), y[-1] = initial - özyinelemeyi bloklar halinde vektörel çöz
+    Blok içinde y[j] = d^(j+1) * (y0 + alpha * Σ x[i] * d^-(i+1)), d = 1 - alpha.
+    """
+    x = _as_array(values)
+    out = np.empty_like(x)
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = x
+        return out
+
+    block = max(1, int(math.log(_EWM_MAX_SCALE) / -math.log(decay)))
+    powers = decay ** np.arange(1, block + 1)
+    prev = initial
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        w = powers[:len(chunk)]
+        out[start:start + len(chunk)] = w * (prev + alpha * np.cumsum(chunk / w))
+        prev = out[start + len(chunk) - 1]
+    return out
+
+def rolling_mean(values, period: int) -> np.ndarray:
+    """Basit hareketli ortalama - ilk period-1 değer NaN"""
+    x = _as_array(values)
+    out = _nan_series(len(x))
+    if len(x) >= period:
+        out[period - 1:] = sliding_window_view(x, period).mean(axis=1)
+    return out
+
+# ===========================================
+# İNDİKATÖRLER
+# ===========================================
+
+def ema_series(close, period: int) -> np.ndarray:
+    """EMA - ilk değer ilk period kapanışın SMA'sı (calculate_ema ile aynı tohum)"""
+    x = _as_array(close)
+    out = _nan_series(len(x))
+    if len(x) < period:
+        return out
+    seed = x[:period].mean()
+    out[period - 1] = seed
+    out[period:] = ewm(x[period:], 2 / (period + 1), seed)
+    return out
+
+def rsi_series(close, period: int = 14, wilder: bool = True) -> np.ndarray:
+    """
+    RSI - wilder=True: Wilder yumuşatması (ilk ortalama SMA, sonra alpha = 1/period)
+    wilder=False: son period değişimin basit ortalaması (bot_ultra.calculate_rsi)
+    Kayıp ortalaması 0 ise 100. İlk period değer NaN.
+    """
+    x = _as_array(close)
+    out = _nan_series(len(x))
+    if len(x) < period + 1:
+        return out
+
+    delta = np.diff(x)
+    gains = np.clip(delta, 0, None)
+    losses = np.clip(-delta, 0, None)
+    if wilder:
+        avg_gain = np.concatenate(([gains[:period].mean()], ewm(gains[period:], 1 / period, gains[:period].mean())))
+        avg_loss = np.concatenate(([losses[:period].mean()], ewm(losses[period:], 1 / period, losses[:period].mean())))
+    else:
+        avg_gain = rolling_mean(gains, period)[period - 1:]
+        avg_loss = rolling_mean(losses, period)[period - 1:]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    out[period:] = np.where(avg_loss == 0, 100.0, rsi)
+    return out
+
+def true_range(high, low, close) -> np.ndarray:
+    """TR - ilk mumun önceki kapanışı olmadığından NaN"""
+    h, l, c = _as_array(high), _as_array(low), _as_array(close)
+    tr = _nan_series(len(c))
+    if len(c) > 1:
+        prev_close = c[:-1]
+        tr[1:] = np.maximum(h[1:] - l[1:], np.maximum(np.abs(h[1:] - prev_close), np.abs(l[1:] - prev_close)))
+    return tr
+
+def atr_series(high, low, close, period: int = 14, wilder: bool = False) -> np.ndarray:
+    """
+    ATR - wilder=False: son period TR'nin basit ortalaması (bot_ultra.calculate_atr)
+    wilder=True: Wilder yumuşatması. İlk period değer NaN.
+    """
+    tr = true_range(high, low, close)
+    out = _nan_series(len(tr))
+    if len(tr) < period + 1:
+        return out
+    if wilder:
+        seed = tr[1:period + 1].mean()
+        out[period] = seed
+        out[period + 1:] = ewm(tr[period + 1:], 1 / period, seed)
+    else:
+        out[period:] = rolling_mean(tr[1:], period)[period - 1:]
+    return out
+
+def bollinger_series(close, period: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bantları - (alt, orta, üst); standart sapma popülasyon (ddof=0)"""
+    x = _as_array(close)
+    middle = _nan_series(len(x))
+    std = _nan_series(len(x))
+    if len(x) >= period:
+        windows = sliding_window_view(x, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        std[period - 1:] = windows.std(axis=1)
+    return middle - num_std * std, middle, middle + num_std * std
+
+def vwap_series(high, low, close, volume, time=None, session_ms: Optional[int] = 86_400_000) -> np.ndarray:
+    """
+    VWAP - tipik fiyat (H+L+C)/3 ağırlıklı
+    time (ms) verilirse her seansta (varsayılan UTC gün) sıfırlanır, yoksa tüm seri kümülatif.
+    """
+    typical = (_as_array(high) + _as_array(low) + _as_array(close)) / 3
+    v = _as_array(volume)
+    pv = np.cumsum(typical * v)
+    cv = np.cumsum(v)
+
+    if time is not None and session_ms and len(v):
+        session = np.asarray(time, dtype=np.int64) // session_ms
+        starts = np.flatnonzero(np.diff(session)) + 1
+        # Her konumdan, kendi seansının başlangıcına kadarki toplamı çıkar
+        offsets = np.zeros(len(v), dtype=np.int64)
+        offsets[starts] = starts
+        offsets = np.maximum.accumulate(offsets)
+        base_pv = np.concatenate(([0.0], pv))[offsets]
+        base_cv = np.concatenate(([0.0], cv))[offsets]
+        pv, cv = pv - base_pv, cv - base_cv
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cv > 0, pv / cv, np.nan)
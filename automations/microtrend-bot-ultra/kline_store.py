@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - Kline Ring Buffer
+========================================
+(sembol, zaman dilimi) başına sabit kapasiteli mum deposu. Her alan
+(time/open/high/low/close/volume) ayrı, bitişik bir NumPy dizisinde tutulur.
+
+Her değer hem i hem de i + capacity konumuna yazılır; böylece son N mum
+(N <= capacity) her zaman tek parça bir dilimdir ve indikatörler kopyasız
+view okuyabilir. Yazma O(1), okuma O(1) (kopya yok).
+
+Not: KlineRing view'ları bir sonraki güncellemeye kadar geçerlidir (devam
+eden mum yerinde güncellenir). KlineStore birden çok thread'den yazıldığı
+için window() kilit altında tek bir bitişik kopya döndürür - okuyan thread
+yazılan dizilere hiç dokunmaz.
+"""
+
+import threading
+from typing import Optional, Dict, List, Tuple, Iterator
+
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+# ===========================================
+# KLINE WINDOW
+# ===========================================
+
+class KlineWindow:
+    """
+    Son N mumun sütun görünümü - alanlar NumPy dizisi (KlineRing view'ı ya da KlineStore kopyası)
+    Eski kod için liste gibi de davranır: len(), w[-1]["close"], for k in w.
+    """
+
+    __slots__ = ("time",) + FIELDS
+
+    def __init__(self, time: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return KlineWindow(*(getattr(self, name)[index] for name in self.__slots__))
+        candle = {"time": int(self.time[index])}
+        for name in FIELDS:
+            candle[name] = float(getattr(self, name)[index])
+        return candle
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def copy(self) -> "KlineWindow":
+        """Dizilerin bağımsız kopyası (kaynak sonradan değişse de sabit kalır)"""
+        return KlineWindow(*(getattr(self, name).copy() for name in self.__slots__))
+
+    def to_dicts(self) -> List[dict]:
+        """get_klines() ile aynı biçimde liste (kopya)"""
+        return list(self)
+
+# ===========================================
+# KLINE RING
+# ===========================================
+
+class KlineRing:
+    """Tek (sembol, zaman dilimi) için sabit kapasiteli mum halkası"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.time = np.zeros(self.capacity * 2, dtype=np.int64)
+        self.open = np.zeros(self.capacity * 2, dtype=np.float64)
+        self.high = np.zeros(self.capacity * 2, dtype=np.float64)
+        self.low = np.zeros(self.capacity * 2, dtype=np.float64)
+        self.close = np.zeros(self.capacity * 2, dtype=np.float64)
+        self.volume = np.zeros(self.capacity * 2, dtype=np.float64)
+        self.head = 0  # Sonraki yazılacak konum
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def last_time(self) -> Optional[int]:
+        if not self.count:
+            return None
+        return int(self.time[(self.head - 1) % self.capacity])
+
+    def _write(self, pos: int, candle: dict):
+        for name in ("time",) + FIELDS:
+            array = getattr(self, name)
+            array[pos] = candle[name]
+            array[pos + self.capacity] = candle[name]
+
+    def update(self, candle: dict) -> bool:
+        """
+        Mumu uygula - yeni mumsa ekle (True), son mumla aynı zamandaysa yerinde güncelle
+        Sondan eski mumlar yok sayılır.
+        """
+        last = self.last_time
+        if last is not None and candle["time"] < last:
+            return False
+        if last is not None and candle["time"] == last:
+            self._write((self.head - 1) % self.capacity, candle)
+            return False
+
+        self._write(self.head, candle)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def extend(self, candles: List[dict]) -> int:
+        """
+        Zaman sıralı mumları uygula - eklenen yeni mum sayısı
+        Son mumdan eski mumlar varsa (daha uzun geçmiş istendi) halka birleşik kümeden yeniden kurulur.
+        """
+        last = self.last_time
+        if last is not None and candles and candles[0]["time"] < last:
+            return self._merge(candles)
+        return sum(1 for candle in candles if self.update(candle))
+
+    def _merge(self, candles: List[dict]) -> int:
+        """Mevcut + gelen mumları zamana göre birleştir (aynı zamanda gelen kazanır), son capacity mumu yaz"""
+        merged = {candle["time"]: candle for candle in self.window().to_dicts()}
+        added = sum(1 for candle in candles if candle["time"] not in merged)
+        merged.update((candle["time"], candle) for candle in candles)
+
+        self.head = 0
+        self.count = 0
+        for t in sorted(merged)[-self.capacity:]:
+            self.update(merged[t])
+        return added
+
+    def window(self, limit: Optional[int] = None) -> KlineWindow:
+        """Son limit mumun (devam eden dahil) kopyasız, salt okunur view'ı"""
+        n = self.count if limit is None else max(0, min(limit, self.count))
+        # head + capacity'de biten dilim, ikinci kopyada her zaman bitişik
+        end = self.head + self.capacity if self.count else 0
+        views = []
+        for name in ("time",) + FIELDS:
+            view = getattr(self, name)[end - n:end]
+            view.flags.writeable = False
+            views.append(view)
+        return KlineWindow(*views)
+
+# ===========================================
+# KLINE STORE
+# ===========================================
+
+class KlineStore:
+    """(sembol, zaman dilimi) -> KlineRing; REST ve WebSocket aynı depoya yazar"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.rings: Dict[Tuple[str, str], KlineRing] = {}
+        self.lock = threading.Lock()
+
+    def ring(self, symbol: str, interval: str) -> KlineRing:
+        key = (symbol.upper(), interval)
+        with self.lock:
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = KlineRing(self.capacity)
+            return ring
+
+    def update(self, symbol: str, interval: str, candle: dict) -> bool:
+        ring = self.ring(symbol, interval)
+        with self.lock:
+            return ring.update(candle)
+
+    def extend(self, symbol: str, interval: str, candles: List[dict]) -> int:
+        ring = self.ring(symbol, interval)
+        with self.lock:
+            return ring.extend(sorted(candles, key=lambda c: c["time"]))
+
+    def size(self, symbol: str, interval: str) -> int:
+        return len(self.ring(symbol, interval))
+
+    def last_time(self, symbol: str, interval: str) -> Optional[int]:
+        ring = self.ring(symbol, interval)
+        with self.lock:
+            return ring.last_time
+
+    def window(self, symbol: str, interval: str, limit: Optional[int] = None) -> KlineWindow:
+        """Son limit mumun kilit altında alınmış kopyası - WebSocket thread'i yazarken de tutarlı"""
+        ring = self.ring(symbol, interval)
+        with self.lock:
+            return ring.window(limit).copy()
+
+_INTERVAL_UNITS_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+def interval_ms(interval: str) -> int:
+    """Binance zaman dilimi ("5m", "4h", "1d") -> milisaniye"""
+    return int(interval[:-1]) * _INTERVAL_UNITS_MS[interval[-1]]
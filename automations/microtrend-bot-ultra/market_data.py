@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - Gerçek Zamanlı Piyasa Verisi
+===================================================
+Binance Futures WebSocket akışları (markPrice, kline_<tf>, aggTrade) ile
+bellekte sürekli güncel tutulan piyasa görünümü. Tüm stratejiler REST
+yerine buradan okur; SL/TP/trailing kontrolleri her fiyat güncellemesinde
+(milisaniyeler içinde) çalışabilir.
+
+Test / replay:
+    python market_data.py --replay kayit.jsonl --port 8765
+    MARKET_WS_URL=ws://127.0.0.1:8765 python bot_ultra.py
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import base64
+import hashlib
+import threading
+from typing import Optional, Dict, List, Tuple, Callable
+
+from kline_store import KlineStore, KlineWindow
+
+try:
+    import websocket  # websocket-client
+    WEBSOCKET_OK = True
+except ImportError:
+    websocket = None
+    WEBSOCKET_OK = False
+
+# ===========================================
+# KONFİGÜRASYON
+# ===========================================
+
+WS_MAINNET_URL = "wss://fstream.binance.com"
+WS_TESTNET_URL = "wss://stream.binancefuture.com"
+
+KLINE_HISTORY = int(os.getenv("KLINE_HISTORY", "500"))  # (sembol, tf) başına tutulan mum
+WS_RECONNECT_MAX = float(os.getenv("WS_RECONNECT_MAX", "60"))  # Yeniden bağlanma backoff üst sınırı (sn)
+
+KlineSeeder = Callable[[str, str], List[dict]]
+
+# ===========================================
+# MARKET DATA FEED
+# ===========================================
+
+class MarketDataFeed:
+    """
+    Binance Futures combined stream'ine abone olup son durumu bellekte tutar
+    Mark price + funding (markPrice@1s), son işlem (aggTrade) ve her zaman
+    dilimi için kapanmış mumlar + devam eden mum (kline_<tf>, KlineStore'a yazılır).
+    """
+
+    def __init__(self, symbols: List[str], intervals: List[str], url: str = WS_MAINNET_URL,
+                 seed: Optional[KlineSeeder] = None, store: Optional[KlineStore] = None):
+        self.symbols = [s.upper() for s in symbols]
+        self.intervals = list(intervals)
+        self.url = url.rstrip("/")
+        self.seed = seed
+        self.store = store if store is not None else KlineStore(KLINE_HISTORY)
+
+        self.marks: Dict[str, dict] = {}
+        self.trades: Dict[str, dict] = {}
+        self.closed_counts: Dict[Tuple[str, str], int] = {}
+        self.messages = 0
+        self.reconnects = 0
+        self.latency_ms = 0.0
+
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+        self.connected = False
+
+    # ---------- Bağlantı ----------
+
+    def stream_url(self) -> str:
+        """Combined stream URL'i (/stream?streams=a/b/c)"""
+        streams = []
+        for symbol in self.symbols:
+            s = symbol.lower()
+            streams.append(f"{s}@markPrice@1s")
+            streams.append(f"{s}@aggTrade")
+            streams.extend(f"{s}@kline_{tf}" for tf in self.intervals)
+        return f"{self.url}/stream?streams={'/'.join(streams)}"
+
+    def start(self) -> bool:
+        """Arka plan thread'inde bağlan (websocket-client yoksa False)"""
+        if not WEBSOCKET_OK:
+            print("⚠️ websocket-client yüklü değil, REST polling kullanılacak")
+            return False
+        if self._thread is not None:
+            return True
+
+        self.reseed()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-data", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Bağlantıyı kapat ve thread'i durdur"""
+        self._stop.set()
+        if self._app is not None:
+            self._app.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._cond:
+            self.connected = False
+            self._cond.notify_all()
+
+    def reseed(self):
+        """Mum geçmişini REST'ten yükle (başlangıç ve kopukluk sonrası boşluk için)"""
+        if self.seed is None:
+            return
+        for symbol in self.symbols:
+            for tf in self.intervals:
+                try:
+                    klines = self.seed(symbol, tf)
+                except Exception as e:
+                    print(f"⚠️ {symbol} {tf} geçmişi yüklenemedi: {e}")
+                    continue
+                if klines:
+                    self.seed_klines(symbol, tf, klines)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            self._app = websocket.WebSocketApp(
+                self.stream_url(),
+                on_open=self._on_open,
+                on_message=lambda app, raw: self.handle_message(raw),
+                on_error=lambda app, e: print(f"⚠️ WebSocket: {e}"),
+                on_close=self._on_close,
+            )
+            started = time.monotonic()
+            self._app.run_forever(ping_interval=60, ping_timeout=10)
+            if self._stop.is_set():
+                break
+
+            # Binance bağlantıları 24 saatte bir keser; uzun süren bağlantıdan sonra hızlı dön
+            if time.monotonic() - started > 60:
+                backoff = 1.0
+            print(f"🔌 WebSocket koptu, {backoff:.0f} sn sonra yeniden bağlanılıyor...")
+            self._stop.wait(backoff)
+            backoff = min(WS_RECONNECT_MAX, backoff * 2)
+            self.reconnects += 1
+            # Kopuk kaldığımız sürede kaçan mumlar
+            self.reseed()
+
+    def _on_open(self, app):
+        with self._cond:
+            self.connected = True
+        print(f"📡 WebSocket bağlandı: {', '.join(self.symbols)} ({', '.join(self.intervals)})")
+
+    def _on_close(self, app, status=None, message=None):
+        with self._cond:
+            self.connected = False
+            self._cond.notify_all()
+
+    # ---------- Mesaj işleme ----------
+
+    def handle_message(self, raw):
+        """Tek stream mesajını işle (WebSocket, replay ve testler aynı yolu kullanır)"""
+        try:
+            payload = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+        except ValueError:
+            return
+        data = payload.get("data", payload) if isinstance(payload, dict) else None
+        if not isinstance(data, dict):
+            return
+
+        event = data.get("e")
+        with self._cond:
+            if event == "markPriceUpdate":
+                self.marks[data["s"]] = {
+                    "price": float(data["p"]),
+                    "funding_rate": float(data.get("r") or 0),
+                    "time": data.get("E"),
+                    "received": time.monotonic(),
+                }
+            elif event == "aggTrade":
+                self.trades[data["s"]] = {
+                    "price": float(data["p"]),
+                    "qty": float(data["q"]),
+                    "is_buyer_maker": bool(data.get("m")),
+                    "time": data.get("T"),
+                    "received": time.monotonic(),
+                }
+            elif event == "kline":
+                self._apply_kline(data["s"], data["k"])
+            else:
+                return
+
+            self.messages += 1
+            if data.get("E"):
+                self.latency_ms = max(0.0, time.time() * 1000 - data["E"])
+            self._cond.notify_all()
+
+    def _apply_kline(self, symbol: str, k: dict):
+        """Devam eden mumu yerinde güncelle, yeni mumu ekle (kilit tutulurken çağrılır)"""
+        # Geç gelen eski mumlar depoda yok sayılır
+        self.store.update(symbol, k["i"], {
+            "time": int(k["t"]),
+            "open": float(k["o"]),
+            "high": float(k["h"]),
+            "low": float(k["l"]),
+            "close": float(k["c"]),
+            "volume": float(k["v"]),
+        })
+
+        if k.get("x"):
+            key = (symbol, k["i"])
+            self.closed_counts[key] = self.closed_counts.get(key, 0) + 1
+
+    def seed_klines(self, symbol: str, interval: str, klines: List[dict]):
+        """REST'ten gelen mumları (time anahtarlı) depoya ekle - yalnızca eksik/yeni olanlar yazılır"""
+        with self._cond:
+            self.store.extend(symbol, interval, klines)
+            self._cond.notify_all()
+
+    # ---------- Okuma ----------
+
+    def mark_price(self, symbol: str, max_age: float) -> Optional[float]:
+        """Son mark price - max_age saniyeden eskiyse None"""
+        with self._cond:
+            mark = self.marks.get(symbol.upper())
+            if not mark or time.monotonic() - mark["received"] > max_age:
+                return None
+            return mark["price"]
+
+    def funding_rate(self, symbol: str, max_age: float) -> Optional[float]:
+        with self._cond:
+            mark = self.marks.get(symbol.upper())
+            if not mark or time.monotonic() - mark["received"] > max_age:
+                return None
+            return mark["funding_rate"]
+
+    def last_trade(self, symbol: str) -> Optional[dict]:
+        with self._cond:
+            trade = self.trades.get(symbol.upper())
+            return dict(trade) if trade else None
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> Optional[KlineWindow]:
+        """Son limit mumun anlık kopyası (devam eden dahil) - bağlı değilse/yetersizse None"""
+        with self._cond:
+            if not self.connected or self.store.size(symbol, interval) < limit:
+                return None
+            return self.store.window(symbol, interval, limit)
+
+    def closed_count(self, symbol: str, interval: str) -> int:
+        """Bağlantıdan beri kapanan mum sayısı (strateji tetikleyicisi)"""
+        with self._cond:
+            return self.closed_counts.get((symbol.upper(), interval), 0)
+
+    def wait_for_update(self, timeout: float) -> bool:
+        """Yeni mesaj gelene kadar bekle - zaman aşımında False"""
+        with self._cond:
+            seen = self.messages
+            return self._cond.wait_for(lambda: self.messages != seen or self._stop.is_set(), timeout)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return {
+                "connected": self.connected,
+                "messages": self.messages,
+                "reconnects": self.reconnects,
+                "latency_ms": round(self.latency_ms, 1),
+                "symbols": list(self.marks),
+            }
+
+# ===========================================
+# REPLAY SUNUCUSU (test)
+# ===========================================
+
+def _ws_frame(text: str) -> bytes:
+    """Sunucudan istemciye maskesiz text frame"""
+    payload = text.encode()
+    header = bytearray([0x81])
+    if len(payload) < 126:
+        header.append(len(payload))
+    elif len(payload) < 65536:
+        header.append(126)
+        header += len(payload).to_bytes(2, "big")
+    else:
+        header.append(127)
+        header += len(payload).to_bytes(8, "big")
+    return bytes(header) + payload
+
+def serve_replay(messages: List[str], host: str = "127.0.0.1", port: int = 8765,
+                 interval: float = 0.0, ready: Optional[threading.Event] = None):
+    """
+    Kaydedilmiş stream mesajlarını yerel WebSocket olarak yayınla (bağlantı başına baştan)
+    Sadece test içindir: handshake + text frame, istemci frame'leri okunmaz.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+    if ready is not None:
+        ready.set()
+    print(f"🎞️ Replay: ws://{host}:{server.getsockname()[1]} ({len(messages)} mesaj)")
+
+    while True:
+        conn, _ = server.accept()
+        with conn:
+            request = conn.recv(4096).decode(errors="ignore")
+            key = next((line.split(":", 1)[1].strip() for line in request.split("\r\n")
+                        if line.lower().startswith("sec-websocket-key:")), "")
+            accept = base64.b64encode(hashlib.sha1(
+                (key + "258EAFA5-E914-47DA-95CA-C5AB0DC85B11").encode()).digest()).decode()
+            conn.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                          f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            try:
+                for message in messages:
+                    conn.sendall(_ws_frame(message))
+                    if interval:
+                        time.sleep(interval)
+                conn.sendall(b"\x88\x00")  # close
+            except OSError:
+                pass
+
+if __name__ == "__main__":
+    # python market_data.py --replay kayit.jsonl [--port 8765] [--interval 0.01]
+    args = sys.argv[1:]
+    if "--replay" not in args:
+        print("Kullanım: python market_data.py --replay kayit.jsonl [--port 8765] [--interval 0.01]")
+        sys.exit(1)
+    path = args[args.index("--replay") + 1]
+    port = int(args[args.index("--port") + 1]) if "--port" in args else 8765
+    interval = float(args[args.index("--interval") + 1]) if "--interval" in args else 0.0
+    with open(path) as f:
+        recorded = [line.strip() for line in f if line.strip()]
+    serve_replay(recorded, port=port, interval=interval)
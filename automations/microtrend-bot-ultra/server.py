@@ -46,9 +46,9 @@ def add_log(message):
 
 # Import bot
 try:
-    from bot import (
-        get_account_balance, get_mark_price, get_klines, get_funding_rate,
-        analyze_trend, calculate_rsi, calculate_atr, check_pullback,
+    from bot_ultra import (
+        get_account_balance, get_mark_price, get_klines, get_symbol_klines, get_funding_rate,
+        analyze_trend, calculate_rsi, calculate_atr, check_pullback, kline_column,
         run_strategy, CONFIG, state as trading_state,
         paper_trader, grid_bot, trailing_tp
     )
@@ -108,7 +108,7 @@ def get_market_data(symbol):
             CONFIG["SYMBOL"] = old
             return jsonify({"error": "No data"}), 500
         
-        closes = [k["close"] for k in klines]
+        closes = kline_column(klines, "close")
         trend = analyze_trend(klines)
         rsi = calculate_rsi(closes, 14)
         atr = calculate_atr(klines)
@@ -140,12 +140,10 @@ def scan_all():
     
     for symbol in symbols:
         try:
-            old = CONFIG["SYMBOL"]
-            CONFIG["SYMBOL"] = symbol
-            
-            klines = get_klines("5m", 50)
+            # Ortak mum deposundan: ilk taramadan sonra yalnızca yeni mumlar çekilir
+            klines = get_symbol_klines(symbol, "5m", 50)
             if klines:
-                closes = [k["close"] for k in klines]
+                closes = kline_column(klines, "close")
                 trend = analyze_trend(klines)
                 rsi = calculate_rsi(closes, 14)
                 pullback = check_pullback(klines, trend)
@@ -163,8 +161,6 @@ def scan_all():
                     "pullback": pullback,
                     "score": score
                 })
-            
-            CONFIG["SYMBOL"] = old
         except:
             pass
     
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - Streaming İndikatörler
+=============================================
+Mum geldikçe update(candle) ile güncellenen, durum tutan indikatörler.
+Tick başına maliyet lookback uzunluğundan bağımsızdır (O(1), rolling
+min/max amortize O(1)).
+
+Devam eden mum: aynı "time" ile gelen her güncelleme son mumu revize eder;
+durum, o mumdan önceki (kapanmış) mumlara göre tutulduğu için revizyon
+geçmişi bozmaz. Yeni "time" gelince önceki mum kesinleşir. "time" yoksa
+her update yeni (kapanmış) mum sayılır.
+
+Sonuçlar indicators.py serilerinin son değeriyle aynıdır (aynı tohumlama).
+"""
+
+from collections import deque
+from typing import Optional, Deque, Tuple
+
+# ===========================================
+# TEMEL SINIF
+# ===========================================
+
+class StreamingIndicator:
+    """update(candle) -> güncel değer (yetersiz veri varken None)"""
+
+    def __init__(self):
+        self.time = None
+        self.pending: Optional[dict] = None
+        self.value: Optional[float] = None
+
+    def update(self, candle: dict) -> Optional[float]:
+        t = candle.get("time")
+        if t is not None and self.time is not None and t < self.time:
+            return self.value  # Geç gelen eski mum
+        if t is None or t != self.time:
+            if self.pending is not None:
+                self._commit(self.pending)
+            self.time = t
+        self.pending = candle
+        self.value = self._compute(candle)
+        return self.value
+
+    def _commit(self, candle: dict):
+        """Mum kesinleşti - kalıcı duruma kat"""
+        raise NotImplementedError
+
+    def _compute(self, candle: dict) -> Optional[float]:
+        """Kalıcı durum + devam eden mumdan değeri hesapla (durumu değiştirmez)"""
+        raise NotImplementedError
+
+class _RollingSum:
+    """Son size-1 kesin değerin toplamı - devam eden değerle birlikte size'lık pencere"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self.pushes = 0
+
+    def push(self, value: float):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size - 1:
+            self.total -= self.values.popleft()
+        # Ekle/çıkar kayan nokta kaymasını pencere başına bir kez sıfırla (amortize O(1))
+        self.pushes += 1
+        if self.pushes % self.size == 0:
+            self.total = sum(self.values)
+
+    def mean_with(self, value: float) -> Optional[float]:
+        if len(self.values) < self.size - 1:
+            return None
+        return (self.total + value) / self.size
+
+# ===========================================
+# İNDİKATÖRLER
+# ===========================================
+
+class StreamingEMA(StreamingIndicator):
+    """EMA - ilk period değerin SMA'sıyla tohumlanır (ema_series ile aynı)"""
+
+    def __init__(self, period: int, field: str = "close"):
+        super().__init__()
+        self.period = period
+        self.field = field
+        self.alpha = 2 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.ema: Optional[float] = None
+
+    def _commit(self, candle: dict):
+        x = candle[self.field]
+        if self.ema is None:
+            self.count += 1
+            self.seed_sum += x
+            if self.count == self.period:
+                self.ema = self.seed_sum / self.period
+        else:
+            self.ema += self.alpha * (x - self.ema)
+
+    def _compute(self, candle: dict) -> Optional[float]:
+        x = candle[self.field]
+        if self.ema is not None:
+            return self.ema + self.alpha * (x - self.ema)
+        if self.count + 1 == self.period:
+            return (self.seed_sum + x) / self.period
+        return None
+
+class StreamingRSI(StreamingIndicator):
+    """
+    RSI - wilder=True: Wilder yumuşatması; wilder=False: son period değişimin basit ortalaması
+    (rsi_series ile aynı). Kayıp ortalaması 0 ise 100.
+    """
+
+    def __init__(self, period: int = 14, wilder: bool = True):
+        super().__init__()
+        self.period = period
+        self.wilder = wilder
+        self.prev_close: Optional[float] = None
+        self.count = 0
+        self.seed_gain = 0.0
+        self.seed_loss = 0.0
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self.gains = _RollingSum(period)
+        self.losses = _RollingSum(period)
+
+    def _commit(self, candle: dict):
+        x = candle["close"]
+        if self.prev_close is not None:
+            gain, loss = max(x - self.prev_close, 0.0), max(self.prev_close - x, 0.0)
+            self.count += 1
+            if not self.wilder:
+                self.gains.push(gain)
+                self.losses.push(loss)
+            elif self.count < self.period:
+                self.seed_gain += gain
+                self.seed_loss += loss
+            else:
+                self.avg_gain, self.avg_loss = self._smooth(gain, loss, self.count)
+        self.prev_close = x
+
+    def _smooth(self, gain: float, loss: float, count: int) -> Tuple[float, float]:
+        """Wilder: period. değişimde ilk ortalamalar SMA, sonra (önceki*(p-1) + yeni) / p"""
+        p = self.period
+        if count == p:
+            return (self.seed_gain + gain) / p, (self.seed_loss + loss) / p
+        return (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+
+    def _compute(self, candle: dict) -> Optional[float]:
+        if self.prev_close is None:
+            return None
+        x = candle["close"]
+        gain, loss = max(x - self.prev_close, 0.0), max(self.prev_close - x, 0.0)
+        if self.wilder:
+            if self.count + 1 < self.period:
+                return None
+            avg_gain, avg_loss = self._smooth(gain, loss, self.count + 1)
+        else:
+            avg_gain, avg_loss = self.gains.mean_with(gain), self.losses.mean_with(loss)
+            if avg_gain is None:
+                return None
+        if avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+class StreamingATR(StreamingIndicator):
+    """ATR - wilder=False: son period TR'nin basit ortalaması (calculate_atr), wilder=True: Wilder"""
+
+    def __init__(self, period: int = 14, wilder: bool = False):
+        super().__init__()
+        self.period = period
+        self.wilder = wilder
+        self.prev_close: Optional[float] = None
+        self.count = 0
+        self.atr: Optional[float] = None
+        self.seed_sum = 0.0
+        self.trs = _RollingSum(period)
+
+    def _true_range(self, candle: dict) -> float:
+        high, low = candle["high"], candle["low"]
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def _commit(self, candle: dict):
+        if self.prev_close is not None:
+            tr = self._true_range(candle)
+            self.count += 1
+            if not self.wilder:
+                self.trs.push(tr)
+            elif self.atr is None:
+                self.seed_sum += tr
+                if self.count == self.period:
+                    self.atr = self.seed_sum / self.period
+            else:
+                self.atr = (self.atr * (self.period - 1) + tr) / self.period
+        self.prev_close = candle["close"]
+
+    def _compute(self, candle: dict) -> Optional[float]:
+        if self.prev_close is None:
+            return None
+        tr = self._true_range(candle)
+        if not self.wilder:
+            return self.trs.mean_with(tr)
+        if self.atr is not None:
+            return (self.atr * (self.period - 1) + tr) / self.period
+        if self.count + 1 == self.period:
+            return (self.seed_sum + tr) / self.period
+        return None
+
+class RollingExtreme(StreamingIndicator):
+    """Son window mumun en yükseği / en düşüğü - monoton deque (amortize O(1))"""
+
+    def __init__(self, window: int, field: str, highest: bool):
+        super().__init__()
+        self.window = window
+        self.field = field
+        self.highest = highest
+        self.index = 0  # Kesinleşen mum sayısı
+        self.candidates: Deque[Tuple[int, float]] = deque()
+
+    def _better(self, a: float, b: float) -> bool:
+        return a >= b if self.highest else a <= b
+
+    def _commit(self, candle: dict):
+        x = candle[self.field]
+        while self.candidates and self._better(x, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((self.index, x))
+        self.index += 1
+        # Devam eden mumla birlikte pencere window olsun: son window-1 kesin mum
+        while self.candidates and self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+
+    def _compute(self, candle: dict) -> Optional[float]:
+        x = candle[self.field]
+        if not self.candidates:
+            return x
+        best = self.candidates[0][1]
+        return x if self._better(x, best) else best
+
+class RollingMax(RollingExtreme):
+    def __init__(self, window: int, field: str = "high"):
+        super().__init__(window, field, highest=True)
+
+class RollingMin(RollingExtreme):
+    def __init__(self, window: int, field: str = "low"):
+        super().__init__(window, field, highest=False)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+MicroTrend Bot ULTRA - İndikatör Eşlik Testi
+============================================
+indicators.py serileri, bot_ultra.calculate_* ve streaming indikatörler
+eski (saf Python döngülü) calculate_* ile aynı sonucu vermeli.
+
+Çalıştırma: python -m pytest -q test_indicators.py  (veya python test_indicators.py)
+"""
+
+import math
+import unittest
+from typing import List
+
+import numpy as np
+
+import bot_ultra
+from indicators import ema_series, rsi_series, atr_series
+from streaming_indicators import StreamingEMA, StreamingRSI, StreamingATR
+
+# ===========================================
+# REFERANS (eski döngülü calculate_*)
+# ===========================================
+
+def ref_ema(prices: List[float], period: int) -> float:
+    if len(prices) < period:
+        return 0
+    k = 2 / (period + 1)
+    ema = sum(prices[:period]) / period
+    for p in prices[period:]:
+        ema = (p - ema) * k + ema
+    return ema
+
+def ref_rsi(prices: List[float], period: int = 14) -> float:
+    if len(prices) < period + 1:
+        return 50
+    gains, losses = [], []
+    for i in range(1, len(prices)):
+        d = prices[i] - prices[i-1]
+        gains.append(d if d > 0 else 0)
+        losses.append(abs(d) if d < 0 else 0)
+    avg_g = sum(gains[-period:]) / period
+    avg_l = sum(losses[-period:]) / period
+    if avg_l == 0:
+        return 100
+    return 100 - (100 / (1 + avg_g / avg_l))
+
+def ref_rsi_wilder(prices: List[float], period: int = 14) -> float:
+    deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
+    avg_g = sum(max(d, 0) for d in deltas[:period]) / period
+    avg_l = sum(max(-d, 0) for d in deltas[:period]) / period
+    for d in deltas[period:]:
+        avg_g = (avg_g * (period - 1) + max(d, 0)) / period
+        avg_l = (avg_l * (period - 1) + max(-d, 0)) / period
+    if avg_l == 0:
+        return 100
+    return 100 - (100 / (1 + avg_g / avg_l))
+
+def ref_atr(klines: List[dict], period: int = 14) -> float:
+    if len(klines) < period + 1:
+        return 0
+    trs = []
+    for i in range(1, len(klines)):
+        tr = max(klines[i]["high"] - klines[i]["low"],
+                 abs(klines[i]["high"] - klines[i-1]["close"]),
+                 abs(klines[i]["low"] - klines[i-1]["close"]))
+        trs.append(tr)
+    return sum(trs[-period:]) / period
+
+# ===========================================
+# VERİ
+# ===========================================
+
+def random_klines(n: int, seed: int) -> List[dict]:
+    """Tohumlu rastgele yürüyüş OHLC (dakikalık)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    return [{"time": i * 60_000, "open": float(open_[i]), "high": float(high[i]),
+             "low": float(low[i]), "close": float(close[i]), "volume": 1.0}
+            for i in range(n)]
+
+def closes(klines: List[dict]) -> List[float]:
+    return [k["close"] for k in klines]
+
+def columns(klines: List[dict]):
+    return tuple(np.array([k[f] for k in klines]) for f in ("high", "low", "close"))
+
+SEEDS = (1, 7, 42)
+LENGTHS = (15, 16, 21, 50, 51, 300)
+
+# ===========================================
+# TESTLER
+# ===========================================
+
+class CalculateParityTest(unittest.TestCase):
+    """bot_ultra.calculate_* ve indicators.* son değeri == eski döngü"""
+
+    def assertClose(self, a: float, b: float):
+        self.assertTrue(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9), f"{a} != {b}")
+
+    def test_ema(self):
+        for seed in SEEDS:
+            for n in LENGTHS:
+                prices = closes(random_klines(n, seed))
+                for period in (20, 50):
+                    with self.subTest(seed=seed, n=n, period=period):
+                        expected = ref_ema(prices, period)
+                        self.assertClose(bot_ultra.calculate_ema(prices, period), expected)
+                        if n >= period:
+                            self.assertClose(float(ema_series(prices, period)[-1]), expected)
+
+    def test_rsi(self):
+        for seed in SEEDS:
+            for n in LENGTHS:
+                prices = closes(random_klines(n, seed))
+                with self.subTest(seed=seed, n=n):
+                    expected = ref_rsi(prices, 14)
+                    self.assertClose(bot_ultra.calculate_rsi(prices, 14), expected)
+                    self.assertClose(float(rsi_series(prices, 14, wilder=False)[-1]), expected)
+                    self.assertClose(float(rsi_series(prices, 14)[-1]), ref_rsi_wilder(prices, 14))
+
+    def test_atr(self):
+        for seed in SEEDS:
+            for n in LENGTHS:
+                klines = random_klines(n, seed)
+                with self.subTest(seed=seed, n=n):
+                    expected = ref_atr(klines, 14)
+                    self.assertClose(bot_ultra.calculate_atr(klines, 14), expected)
+                    self.assertClose(float(atr_series(*columns(klines), 14)[-1]), expected)
+
+    def test_short_input(self):
+        klines = random_klines(10, 3)
+        prices = closes(klines)
+        self.assertEqual(bot_ultra.calculate_ema(prices, 20), 0)
+        self.assertEqual(bot_ultra.calculate_rsi(prices, 14), 50)
+        self.assertEqual(bot_ultra.calculate_atr(klines, 14), 0)
+        self.assertTrue(np.isnan(ema_series(prices, 20)).all())
+        self.assertTrue(np.isnan(rsi_series(prices, 14)).all())
+        self.assertTrue(np.isnan(atr_series(*columns(klines), 14)).all())
+
+    def test_flat_rsi(self):
+        prices = [100.0] * 30
+        self.assertEqual(bot_ultra.calculate_rsi(prices, 14), ref_rsi(prices, 14))
+        self.assertEqual(float(rsi_series(prices, 14)[-1]), 100.0)
+
+class StreamingParityTest(unittest.TestCase):
+    """Streaming indikatörler her mumda seri son değeriyle aynı"""
+
+    def assertClose(self, a: float, b: float):
+        self.assertTrue(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9), f"{a} != {b}")
+
+    def test_streaming_matches_reference(self):
+        for seed in SEEDS:
+            klines = random_klines(120, seed)
+            ema = StreamingEMA(20)
+            rsi = StreamingRSI(14, wilder=False)
+            rsi_wilder = StreamingRSI(14)
+            atr = StreamingATR(14)
+            for i, candle in enumerate(klines):
+                window = klines[:i + 1]
+                prices = closes(window)
+                with self.subTest(seed=seed, i=i):
+                    value = ema.update(candle)
+                    if len(window) < 20:
+                        self.assertIsNone(value)
+                    else:
+                        self.assertClose(value, ref_ema(prices, 20))
+                    value = rsi.update(candle)
+                    wilder_value = rsi_wilder.update(candle)
+                    if len(window) < 15:
+                        self.assertIsNone(value)
+                        self.assertIsNone(wilder_value)
+                    else:
+                        self.assertClose(value, ref_rsi(prices, 14))
+                        self.assertClose(wilder_value, ref_rsi_wilder(prices, 14))
+                    value = atr.update(candle)
+                    if len(window) < 15:
+                        self.assertIsNone(value)
+                    else:
+                        self.assertClose(value, ref_atr(window, 14))
+
+    def test_forming_candle_revision(self):
+        """Aynı "time" ile gelen revizyon son mumu değiştirir, geçmişi bozmaz"""
+        klines = random_klines(60, 11)
+        ema, rsi, atr = StreamingEMA(20), StreamingRSI(14, wilder=False), StreamingATR(14)
+        for candle in klines[:-1]:
+            for indicator in (ema, rsi, atr):
+                indicator.update(candle)
+        last = dict(klines[-1])
+        for close in (last["close"] * 0.99, last["close"] * 1.01, last["close"]):
+            revised = dict(last, close=close, high=max(last["high"], close), low=min(last["low"], close))
+            window = klines[:-1] + [revised]
+            self.assertClose(ema.update(revised), ref_ema(closes(window), 20))
+            self.assertClose(rsi.update(revised), ref_rsi(closes(window), 14))
+            self.assertClose(atr.update(revised), ref_atr(window, 14))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ import time
 import requests
 import sys
 import io
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Windows terminal encoding fix
@@ -28,6 +29,11 @@ try:
 except ImportError:
     pass
 
+# Toplu işlem ayarları
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', '32'))  # Tek istekte sınıflandırılan yorum
+AI_CONCURRENCY = int(os.getenv('AI_CONCURRENCY', '4'))  # Aynı anda üretilen yanıt
+AI_MAX_RETRIES = 3
+
 # ============================================
 # GERÇEK API FONKSİYONLARI
 # ============================================
@@ -69,49 +75,65 @@ def fetch_google_reviews():
         print(f"❌ Bağlantı hatası: {e}")
         return []
 
-def analyze_sentiment(text):
-    """HuggingFace ile duygu analizi yapar"""
+SENTIMENT_LABELS = {
+    "positive": "olumlu",
+    "negative": "olumsuz",
+    "neutral": "nötr",
+    "LABEL_0": "olumsuz",
+    "LABEL_1": "olumlu"
+}
+
+def keyword_sentiment(text):
+    """API yoksa basit kelime bazlı analiz"""
+    lower_text = text.lower()
+    if any(x in lower_text for x in ['kötü', 'berbat', 'rezalet', 'pahalı', 'yavaş']):
+        return {"label": "olumsuz", "score": 0.8}
+    if any(x in lower_text for x in ['iyi', 'süper', 'harika', 'güzel', 'hızlı']):
+        return {"label": "olumlu", "score": 0.8}
+    return {"label": "nötr", "score": 0.5}
+
+def parse_sentiment(predictions):
+    """Tek yorumun tahmin listesinden en olası etiketi seç"""
+    if isinstance(predictions, list) and predictions:
+        best = max(predictions, key=lambda x: x.get("score", 0))
+        label = best.get("label", "neutral")
+        return {"label": SENTIMENT_LABELS.get(label, label), "score": best.get("score", 0)}
+    return {"label": "belirsiz", "score": 0}
+
+def analyze_sentiments(texts):
+    """HuggingFace ile toplu duygu analizi - yorumlar SENTIMENT_BATCH_SIZE'lık tek isteklerle gönderilir"""
     hf_token = os.getenv('HUGGINGFACE_TOKEN')
     
     if not hf_token:
         print("❌ HUGGINGFACE_TOKEN tanımlı değil!")
-        return {"label": "nötr", "score": 0}
+        return [{"label": "nötr", "score": 0} for _ in texts]
     
     API_URL = "https://api-inference.huggingface.co/models/savasy/bert-base-turkish-sentiment-cased"
     headers = {"Authorization": f"Bearer {hf_token}"}
     
-    try:
-        response = requests.post(API_URL, headers=headers, json={"inputs": text}, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        
-        if isinstance(result, list) and len(result) > 0:
-            predictions = result[0]
-            if isinstance(predictions, list):
-                best = max(predictions, key=lambda x: x.get("score", 0))
-                label = best.get("label", "neutral")
-                score = best.get("score", 0)
-                
-                label_tr = {
-                    "positive": "olumlu",
-                    "negative": "olumsuz", 
-                    "neutral": "nötr",
-                    "LABEL_0": "olumsuz",
-                    "LABEL_1": "olumlu"
-                }.get(label, label)
-                
-                return {"label": label_tr, "score": score}
-        
-        return {"label": "belirsiz", "score": 0}
-    except Exception as e:
-        print(f"⚠️ Sentiment analizi uyarısı (API meşgul olabilir): {e}")
-        # Fallback: Basit kelime bazlı analiz
-        lower_text = text.lower()
-        if any(x in lower_text for x in ['kötü', 'berbat', 'rezalet', 'pahalı', 'yavaş']):
-            return {"label": "olumsuz", "score": 0.8}
-        if any(x in lower_text for x in ['iyi', 'süper', 'harika', 'güzel', 'hızlı']):
-            return {"label": "olumlu", "score": 0.8}
-        return {"label": "nötr", "score": 0.5}
+    results = []
+    for start in range(0, len(texts), max(1, SENTIMENT_BATCH_SIZE)):
+        chunk = texts[start:start + max(1, SENTIMENT_BATCH_SIZE)]
+        try:
+            response = requests.post(API_URL, headers=headers, json={"inputs": chunk}, timeout=30)
+            response.raise_for_status()
+            result = response.json()
+            
+            # Çoklu girdide yanıt, yorum başına bir tahmin listesi içerir
+            if isinstance(result, list) and len(result) == len(chunk):
+                results.extend(parse_sentiment(predictions) for predictions in result)
+            else:
+                results.extend({"label": "belirsiz", "score": 0} for _ in chunk)
+        except Exception as e:
+            print(f"⚠️ Sentiment analizi uyarısı (API meşgul olabilir): {e}")
+            # Fallback: Basit kelime bazlı analiz
+            results.extend(keyword_sentiment(text) for text in chunk)
+    
+    return results
+
+def analyze_sentiment(text):
+    """HuggingFace ile duygu analizi yapar"""
+    return analyze_sentiments([text])[0]
 
 def generate_ai_response(prompt, max_tokens=512):
     """HuggingFace veya OpenAI ile AI yanıt üretir"""
@@ -136,8 +158,18 @@ def generate_ai_response(prompt, max_tokens=512):
     }
     
     try:
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
+        for attempt in range(AI_MAX_RETRIES):
+            response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
+            # Paralel isteklerde rate limit: Retry-After kadar bekle
+            if response.status_code == 429 and attempt < AI_MAX_RETRIES - 1:
+                try:
+                    wait_time = float(response.headers.get('Retry-After', 2 ** attempt))
+                except ValueError:
+                    wait_time = 2 ** attempt
+                time.sleep(min(wait_time, 30))
+                continue
+            response.raise_for_status()
+            break
         data = response.json()
         
         if "choices" in data and len(data["choices"]) > 0:
@@ -194,15 +226,12 @@ def node_1_gr_2(input_data):
     print(f"⚙️ Running: Sentiment Analizi")
     
     if isinstance(input_data, list):
-        analyzed = []
-        for item in input_data:
-            text = item.get("text", "")
-            if text:
-                sentiment = analyze_sentiment(text)
-                analyzed.append({
-                    **item,
-                    "sentiment": sentiment
-                })
+        items = [item for item in input_data if item.get("text", "")]
+        sentiments = analyze_sentiments([item["text"] for item in items])
+        analyzed = [
+            {**item, "sentiment": sentiment}
+            for item, sentiment in zip(items, sentiments)
+        ]
         print(f"✅ {len(analyzed)} yorum analiz edildi")
         return analyzed
     return input_data
@@ -252,8 +281,9 @@ def node_4_gr_5(input_data):
     elif isinstance(input_data, list):
         items_to_process = input_data
     
-    print(f"ℹ️  Toplam {len(items_to_process)} yoruma yanıt üretiliyor...")
+    print(f"ℹ️  Toplam {len(items_to_process)} yoruma yanıt üretiliyor ({AI_CONCURRENCY} paralel)...")
     
+    prompts = []
     for item in items_to_process:
         text = item.get("text", "")
         author = item.get("author", "Müşteri")
@@ -263,9 +293,13 @@ def node_4_gr_5(input_data):
             prompt = f"Bir işletme sahibi olarak bu OLUMLU Google yorumuna samimi, kısa ve Türkçe bir teşekkür mesajı yaz. Yorum yapan: {author}. Yorum: '{text}'"
         else:
             prompt = f"Bir işletme sahibi olarak bu OLUMSUZ Google yorumuna profesyonel, çözüm odaklı, kibar ve Türkçe bir yanıt yaz. Özür dile ve iletişime geçmesini iste. Yorum yapan: {author}. Yorum: '{text}'"
-        
-        ai_response = generate_ai_response(prompt, max_tokens=250)
-        
+        prompts.append(prompt)
+    
+    # Yanıtlar sınırlı paralellikle üretilir, sıra korunur (429'lar generate_ai_response'ta beklenir)
+    with ThreadPoolExecutor(max_workers=max(1, AI_CONCURRENCY)) as pool:
+        ai_responses = list(pool.map(lambda prompt: generate_ai_response(prompt, max_tokens=250), prompts))
+    
+    for item, ai_response in zip(items_to_process, ai_responses):
         # Tırnak işaretlerini temizle
         ai_response = ai_response.replace('"', '').replace("'", "")
         
@@ -273,7 +307,6 @@ def node_4_gr_5(input_data):
             **item,
             "suggested_reply": ai_response
         })
-        time.sleep(1) # API limit
         
     print(f"✅ {len(responses)} yanıt başarıyla üretildi")
     return responses
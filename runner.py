@@ -1,19 +1,39 @@
 #!/usr/bin/env python3
 """
 OmniFlow Automation Runner - HuggingFace Native (0 Maliyet)
-✅ Free HF API + Ollama local models
-✅ SQLite persistence
+✅ Free HF API + Ollama local models (opsiyonel token streaming)
+✅ Model router - HF/Ollama/Gemini arasında gecikmeye göre seçim + devre kesici
+✅ Ollama warm-up + takvime göre keep_alive (load/eval süreleri metriklerde)
+✅ SQLite persistence + LLM yanıt cache'i (TTL/LRU)
 ✅ Exponential backoff + 3x retry
-✅ Telegram/Discord notifications
+✅ Checkpoint - başarısız blueprint kaldığı düğümden devam eder
+✅ DAG scheduler - bağımsız düğümler paralel çalışır (asyncio engine, senkron shim'ler)
+✅ Telegram/Discord notifications (blueprint notify_on'a göre)
+✅ Supabase yazımları toplu (execution_logs dizi POST + record_blueprint_runs RPC)
+✅ Daemon modu (--daemon) - blueprint'ler kendi schedule_cron'una göre çalışır
 """
 
 import os
+import asyncio
 import json
+import hashlib
+import heapq
+import queue
+import signal
 import requests
+from requests.adapters import HTTPAdapter
 import sqlite3
+import threading
 import time
-from datetime import datetime
-from typing import Optional, Tuple, Dict, Any
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from functools import partial
+from urllib.parse import quote
+from typing import Optional, Tuple, Dict, Any, List, Iterator, Callable
 import sys
 
 # ==================== CONFIGURATION ====================
@@ -23,19 +43,91 @@ HF_TOKEN = os.environ.get('HUGGINGFACE_TOKEN', '')
 SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
 
+# Gemini (opsiyonel)
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+
 # Ollama (Local, completely free)
 USE_OLLAMA = os.environ.get('USE_OLLAMA', 'false').lower() == 'true'
 OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', 'auto')  # auto = sonraki zamanlanmış çalışmaya kadar
+OLLAMA_KEEP_ALIVE_MAX = int(os.environ.get('OLLAMA_KEEP_ALIVE_MAX', '3600'))  # auto'da en uzun tutma (sn)
+OLLAMA_KEEP_ALIVE_IDLE = os.environ.get('OLLAMA_KEEP_ALIVE_IDLE', '5m')  # Yakın çalışma yoksa (Ollama varsayılanı)
+OLLAMA_WARMUP = os.environ.get('OLLAMA_WARMUP', 'true').lower() == 'true'  # Başlangıçta modelleri belleğe yükle
+# Statik prefix'i bir kez gönderip dönen context ile yalnızca değişen kısmı yolla (raw mod, şablonsuz)
+OLLAMA_PREFIX_CONTEXT = os.environ.get('OLLAMA_PREFIX_CONTEXT', 'false').lower() == 'true'
 
 # Notifications
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')
 DISCORD_WEBHOOK = os.environ.get('DISCORD_WEBHOOK', '')
 
+# Bildirim kuyruğu - runner hiçbir zaman bildirim göndermeyi beklemez
+NOTIFY_QUEUE_SIZE = int(os.environ.get('NOTIFY_QUEUE_SIZE', '100'))  # Kanal başına bekleyen mesaj (dolunca en eskisi düşer)
+NOTIFY_DIGEST_INTERVAL = float(os.environ.get('NOTIFY_DIGEST_INTERVAL', '0'))  # >0: bu aralıkta (sn) tek özet mesajı
+NOTIFY_MAX_RETRIES = int(os.environ.get('NOTIFY_MAX_RETRIES', '3'))
+NOTIFY_CLOSE_TIMEOUT = float(os.environ.get('NOTIFY_CLOSE_TIMEOUT', '30'))  # Kapanışta kuyruğun boşalması için üst sınır (sn)
+TELEGRAM_RATE_LIMIT = float(os.environ.get('TELEGRAM_RATE_LIMIT', '1'))  # mesaj/sn (sohbet başına)
+DISCORD_RATE_LIMIT = float(os.environ.get('DISCORD_RATE_LIMIT', '2'))  # mesaj/sn (webhook başına)
+
 # Execution settings
 REQUEST_TIMEOUT = int(os.environ.get('REQUEST_TIMEOUT', '300'))
 MAX_RETRIES = int(os.environ.get('MAX_RETRIES', '3'))
+API_TIMEOUT = int(os.environ.get('API_TIMEOUT', '10'))  # Supabase/bildirim okuma timeout
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))  # Varsayılan host başına bağlantı
 DB_FILE = os.environ.get('DB_FILE', 'automation_runner.db')
+BLUEPRINT_PAGE_SIZE = int(os.environ.get('BLUEPRINT_PAGE_SIZE', '100'))  # Supabase Range sayfa boyu
+
+# Runner'ın kullandığı blueprint kolonları (description, test_config vb. çekilmez)
+BLUEPRINT_COLUMNS = 'id,name,nodes,base_knowledge,version,use_cache,hedge_requests,schedule_cron,notify_on,is_active,updated_at'
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # saniye
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '5000'))
+LOG_FLUSH_SIZE = int(os.environ.get('LOG_FLUSH_SIZE', '50'))  # Bu kadar satır birikince yaz
+LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', '5'))  # saniye
+SUPABASE_FLUSH_SIZE = int(os.environ.get('SUPABASE_FLUSH_SIZE', '50'))  # execution_logs toplu POST boyu
+SUPABASE_FLUSH_INTERVAL = float(os.environ.get('SUPABASE_FLUSH_INTERVAL', '10'))  # saniye
+SUPABASE_QUEUE_MAX = int(os.environ.get('SUPABASE_QUEUE_MAX', '5000'))  # Yazılamayan log satırı sınırı (eskiler atılır)
+RESUME_FROM_CHECKPOINT = os.environ.get('RESUME_FROM_CHECKPOINT', 'true').lower() == 'true'
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', '0'))  # 0 = model penceresinden türet
+NODE_WORKERS = int(os.environ.get('NODE_WORKERS', '4'))  # Blueprint başına paralel düğüm
+BLUEPRINT_WORKERS = int(os.environ.get('BLUEPRINT_WORKERS', '4'))  # Paralel blueprint sayısı
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('ASYNC_MAX_IN_FLIGHT', '256'))  # Event loop'un aynı anda bekleyebildiği bloklayan çağrı
+
+# Daemon modu
+DEFAULT_SCHEDULE_CRON = os.environ.get('DEFAULT_SCHEDULE_CRON', '0 */6 * * *')  # schedule_cron boşsa (UTC)
+DAEMON_REFRESH_INTERVAL = int(os.environ.get('DAEMON_REFRESH_INTERVAL', '300'))  # Blueprint yenileme (sn)
+
+# Sağlayıcı başına eşzamanlı istek limitleri
+HF_CONCURRENCY = int(os.environ.get('HF_CONCURRENCY', '4'))
+OLLAMA_CONCURRENCY = int(os.environ.get('OLLAMA_CONCURRENCY', '1'))
+SUPABASE_CONCURRENCY = int(os.environ.get('SUPABASE_CONCURRENCY', '8'))
+NOTIFY_CONCURRENCY = int(os.environ.get('NOTIFY_CONCURRENCY', '2'))
+GEMINI_CONCURRENCY = int(os.environ.get('GEMINI_CONCURRENCY', '4'))
+
+# Model router - sağlayıcı:model listesi (model yerine HF_MODELS/OLLAMA_MODELS anahtarı da olur)
+ROUTER_BACKENDS = os.environ.get('ROUTER_BACKENDS', 'ollama:fast,hf:text,gemini')
+ROUTER_WINDOW = int(os.environ.get('ROUTER_WINDOW', '50'))  # Backend başına kayan pencere (istek)
+ROUTER_BREAKER_THRESHOLD = int(os.environ.get('ROUTER_BREAKER_THRESHOLD', '3'))  # Art arda hata -> devre açılır
+ROUTER_BREAKER_COOLDOWN = float(os.environ.get('ROUTER_BREAKER_COOLDOWN', '60'))  # Açık devre süresi (sn)
+
+# Hedged istekler - yavaş çağrıya kopya gönderilir, ilk biten kazanır
+HEDGE_REQUESTS = os.environ.get('HEDGE_REQUESTS', 'false').lower() == 'true'  # blueprint hedge_requests NULL ise
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', '0.95'))  # Backend gecikmesinin bu yüzdeliği aşılınca
+HEDGE_MIN_SAMPLES = int(os.environ.get('HEDGE_MIN_SAMPLES', '5'))  # Daha az geçmişte hedge yapılmaz
+HEDGE_MIN_DELAY = float(os.environ.get('HEDGE_MIN_DELAY', '2'))  # En erken hedge (sn)
+HEDGE_TARGET = os.environ.get('HEDGE_TARGET', 'alternate')  # alternate | same
+HEDGE_WORKERS = int(os.environ.get('HEDGE_WORKERS', str(max(2, BLUEPRINT_WORKERS * NODE_WORKERS * 2))))
+
+# Toplu çıkarım (call_model_batch) - sağlayıcı semaforları ayrıca sınırlar
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', '8'))
+
+# Adaptif rate limit (istek/saniye) - 429'larda yarıya iner, başarıda yavaşça artar
+HF_RATE_LIMIT = float(os.environ.get('HF_RATE_LIMIT', '2'))
+HF_RATE_LIMIT_MAX = float(os.environ.get('HF_RATE_LIMIT_MAX', '10'))
+
+HF_ROUTER_URL = 'https://router.huggingface.co'
 
 # HF Models
 HF_MODELS = {
@@ -49,91 +141,1010 @@ OLLAMA_MODELS = {
     'standard': 'neural-chat',
 }
 
+# Context penceresi (token) - prompt bütçesi buradan türetilir
+MODEL_CONTEXT_WINDOWS = {
+    'mistralai/Mistral-7B-Instruct-v0.2': 32768,
+    'meta-llama/Llama-2-7b-chat-hf': 4096,
+    'bigcode/starcoder': 8192,
+    'mistral': 2048,  # Ollama varsayılan num_ctx
+    'neural-chat': 2048,
+    'gemini-2.0-flash': 1048576,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Sampling parametreleri (cache anahtarının parçası)
+GENERATION_PARAMS = {
+    'max_tokens': 512,
+    'temperature': 0.7,
+}
+
+# ==================== CONCURRENCY LIMITS ====================
+
+# Paralel blueprint'ler aynı semaforları paylaşır
+PROVIDER_LIMITS = {
+    'hf': threading.BoundedSemaphore(max(1, HF_CONCURRENCY)),
+    'ollama': threading.BoundedSemaphore(max(1, OLLAMA_CONCURRENCY)),
+    'supabase': threading.BoundedSemaphore(max(1, SUPABASE_CONCURRENCY)),
+    'notify': threading.BoundedSemaphore(max(1, NOTIFY_CONCURRENCY)),
+    'gemini': threading.BoundedSemaphore(max(1, GEMINI_CONCURRENCY)),
+}
+
+# Paylaşılan SQLite bağlantısına erişim tek tek yapılır
+DB_LOCK = threading.Lock()
+
+# ==================== RATE LIMITER ====================
+
+class RateLimiter:
+    """
+    Adaptif token bucket (AIMD)
+    429 / Retry-After -> hız yarıya iner ve tüm bekleyenler duraklar,
+    her başarılı istek hızı max_rate'e kadar biraz artırır.
+    """
+    
+    def __init__(self, rate: float, max_rate: float, min_rate: float = 0.05):
+        self.rate = max(min_rate, rate)
+        self.max_rate = max(self.rate, max_rate)
+        self.min_rate = min_rate
+        self.increase = self.rate * 0.1
+        self.tokens = 1.0
+        self.paused_until = 0.0
+        self.last_refill = time.monotonic()
+        self.waiting = 0
+        self.acquired = 0
+        self.throttled = 0
+        self._cond = threading.Condition()
+    
+    def _refill(self, now: float):
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+    
+    def acquire(self) -> float:
+        """Token alınana kadar bekle - beklenen süreyi (sn) döndür"""
+        start = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        self.acquired += 1
+                        return now - start
+                    delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+                    self._cond.wait(delay)
+            finally:
+                self.waiting -= 1
+    
+    def on_success(self):
+        with self._cond:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+    
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """429 alındı - hızı düşür ve Retry-After kadar herkesi durdur"""
+        with self._cond:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+            self._cond.notify_all()
+    
+    def pause(self, seconds: float):
+        """Hızı değiştirmeden duraklat (ör. model yükleniyor)"""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'rate': round(self.rate, 3),
+                'queue_depth': self.waiting,
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'paused_for': round(max(0.0, self.paused_until - time.monotonic()), 1),
+            }
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """Sağlayıcı/model başına paylaşılan limiter"""
+    key = f"{provider}:{model}"
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(HF_RATE_LIMIT, HF_RATE_LIMIT_MAX)
+        return _rate_limiters[key]
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Monitoring: limiter başına hız, kuyruk ve throttle sayıları"""
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {key: limiter.stats() for key, limiter in limiters.items()}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After başlığı: saniye veya HTTP tarihi"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# ==================== NODE METRICS ====================
+
+# Düğüm worker'ı başına aktif metrik kaydı (call_model zincirinin derinliklerinden doldurulur)
+_node_metrics = threading.local()
+
+# runner_node_executions metrik kolonları
+NODE_METRIC_COLUMNS = {
+    'provider': 'TEXT',
+    'model': 'TEXT',
+    'fallback': 'INTEGER',
+    'cached': 'INTEGER',
+    'resumed': 'INTEGER',
+    'queue_wait_ms': 'INTEGER',
+    'duration_ms': 'INTEGER',
+    'http_ms': 'INTEGER',
+    'http_calls': 'INTEGER',
+    'rate_wait_ms': 'INTEGER',
+    'retries': 'INTEGER',
+    'prompt_chars': 'INTEGER',
+    'completion_chars': 'INTEGER',
+    'prompt_tokens': 'INTEGER',
+    'completion_tokens': 'INTEGER',
+    'hedged': 'INTEGER',
+    'hedge_won': 'INTEGER',
+    'load_ms': 'INTEGER',
+    'eval_ms': 'INTEGER',
+    'prefix_hash': 'TEXT',
+    'prefix_bytes_saved': 'INTEGER',
+    'cached_prompt_tokens': 'INTEGER',
+}
+
+def start_node_metrics() -> Dict[str, Any]:
+    """Bu thread için yeni metrik kaydı başlat"""
+    metrics: Dict[str, Any] = {column: None for column in NODE_METRIC_COLUMNS}
+    metrics.update({'fallback': False, 'cached': False, 'resumed': False, 'hedged': False, 'hedge_won': False,
+                    'http_ms': 0, 'http_calls': 0, 'rate_wait_ms': 0, 'retries': 0, 'prefix_bytes_saved': 0})
+    _node_metrics.current = metrics
+    return metrics
+
+def stop_node_metrics():
+    _node_metrics.current = None
+
+def record_metric(**values):
+    """Aktif düğüm metriğini güncelle (düğüm dışında no-op)"""
+    metrics = getattr(_node_metrics, 'current', None)
+    if metrics is not None:
+        metrics.update(values)
+
+def add_metric(key: str, amount: float):
+    """Aktif düğüm sayacını artır (düğüm dışında no-op)"""
+    metrics = getattr(_node_metrics, 'current', None)
+    if metrics is not None:
+        metrics[key] = (metrics.get(key) or 0) + amount
+
+def hedge_cancelled() -> bool:
+    """Bu thread'deki hedge denemesi kaybetti mi (retry döngüleri erken çıkar)"""
+    cancelled = getattr(_node_metrics, 'cancelled', None)
+    return cancelled is not None and cancelled.is_set()
+
+def estimate_tokens(text: str) -> int:
+    """Sağlayıcı token sayısı vermezse kaba tahmin (~4 karakter/token)"""
+    return (len(text) + 3) // 4
+
+# ==================== HTTP SESSION POOL ====================
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+def host_pool_sizes() -> Dict[str, int]:
+    """Host başına keep-alive havuz boyutu - eşzamanlılık limitleriyle aynı"""
+    sizes = {
+        HF_ROUTER_URL: HF_CONCURRENCY,
+        OLLAMA_URL: OLLAMA_CONCURRENCY,
+        'https://api.telegram.org': NOTIFY_CONCURRENCY,
+        'https://discord.com': NOTIFY_CONCURRENCY,
+        'https://generativelanguage.googleapis.com': GEMINI_CONCURRENCY,
+    }
+    if SUPABASE_URL:
+        sizes[SUPABASE_URL.rstrip('/')] = SUPABASE_CONCURRENCY
+    return {prefix: max(1, size) for prefix, size in sizes.items()}
+
+def get_http_session() -> requests.Session:
+    """Tüm ağ çağrılarının paylaştığı keep-alive session'ı döndür"""
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            default_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', default_adapter)
+            session.mount('http://', default_adapter)
+            # En uzun prefix kazanır: bilinen host'lar kendi havuzunu alır
+            for prefix, size in host_pool_sizes().items():
+                session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size))
+            _http_session = session
+    
+    return _http_session
+
+def close_http_session():
+    """Açık bağlantıları kapat (shutdown)"""
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+def http_request(method: str, url: str, timeout: float = API_TIMEOUT, **kwargs) -> requests.Response:
+    """Paylaşılan session üzerinden istek at - timeout = (connect, read)"""
+    start = time.monotonic()
+    try:
+        return get_http_session().request(method, url, timeout=(HTTP_CONNECT_TIMEOUT, timeout), **kwargs)
+    finally:
+        # Yanıt başlıklarına kadar geçen süre (stream gövdesi hariç)
+        add_metric('http_ms', int((time.monotonic() - start) * 1000))
+        add_metric('http_calls', 1)
+
 # ==================== DATABASE ====================
 
+_db_conn: Optional[sqlite3.Connection] = None
+
+def get_db() -> sqlite3.Connection:
+    """
+    Uzun ömürlü tek SQLite bağlantısı (WAL modu)
+    Thread'ler arası paylaşılır - yalnızca DB_LOCK tutulurken kullanın
+    """
+    global _db_conn
+    
+    if _db_conn is None:
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _db_conn = conn
+    return _db_conn
+
+def ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+    """Eski database'lerde eksik kolonları ekle"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, column_type in columns.items():
+        if column not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
 def init_database():
     """SQLite database'i oluştur"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS runner_executions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            blueprint_id TEXT,
-            blueprint_name TEXT,
-            started_at TIMESTAMP,
-            finished_at TIMESTAMP,
-            status TEXT,
-            total_time_ms INTEGER,
-            result_summary TEXT,
-            error_message TEXT
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with DB_LOCK:
+        conn = get_db()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS runner_executions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    blueprint_id TEXT,
+                    blueprint_name TEXT,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    status TEXT,
+                    total_time_ms INTEGER,
+                    result_summary TEXT,
+                    error_message TEXT
+                )
+            ''')
+            ensure_columns(cursor, 'runner_executions', {'run_id': 'TEXT'})
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS runner_node_executions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT,
+                    blueprint_id TEXT,
+                    node_key TEXT,
+                    node_title TEXT,
+                    status TEXT,
+                    error_message TEXT,
+                    finished_at TIMESTAMP
+                )
+            ''')
+            ensure_columns(cursor, 'runner_node_executions', NODE_METRIC_COLUMNS)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_node_executions_run ON runner_node_executions(run_id)')
+            
+            # Çalıştırma başına özet: hangi blueprint/düğüm bütçeyi yiyor?
+            cursor.execute('''
+                DROP VIEW IF EXISTS runner_run_metrics
+            ''')
+            cursor.execute('''
+                CREATE VIEW runner_run_metrics AS
+                SELECT
+                    run_id,
+                    blueprint_id,
+                    COUNT(*) AS nodes,
+                    SUM(duration_ms) AS node_time_ms,
+                    SUM(queue_wait_ms) AS queue_wait_ms,
+                    SUM(http_ms) AS http_ms,
+                    SUM(retries) AS retries,
+                    SUM(fallback) AS fallbacks,
+                    SUM(cached) AS cache_hits,
+                    SUM(hedged) AS hedges,
+                    SUM(hedge_won) AS hedge_wins,
+                    SUM(load_ms) AS load_ms,
+                    SUM(eval_ms) AS eval_ms,
+                    SUM(prefix_bytes_saved) AS prefix_bytes_saved,
+                    SUM(cached_prompt_tokens) AS cached_prompt_tokens,
+                    SUM(prompt_tokens) AS prompt_tokens,
+                    SUM(completion_tokens) AS completion_tokens
+                FROM runner_node_executions
+                GROUP BY run_id, blueprint_id
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    response TEXT,
+                    created_at REAL,
+                    last_used_at REAL,
+                    hits INTEGER DEFAULT 0
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at)')
+            
+            # Supabase blueprint'lerinin yerel kopyası (updated_at ile artımlı senkron)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS runner_blueprints (
+                    id TEXT PRIMARY KEY,
+                    updated_at TEXT,
+                    is_active INTEGER,
+                    data TEXT
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS runner_checkpoints (
+                    blueprint_id TEXT,
+                    blueprint_version INTEGER,
+                    node_key TEXT,
+                    input_hash TEXT,
+                    output TEXT,
+                    created_at TIMESTAMP,
+                    PRIMARY KEY (blueprint_id, blueprint_version, node_key)
+                )
+            ''')
+
+class ExecutionLogBuffer:
+    """
+    runner_executions / runner_node_executions satırlarını biriktirir,
+    LOG_FLUSH_SIZE satıra ulaşınca veya LOG_FLUSH_INTERVAL saniyede bir
+    tek transaction'da yazar. Shutdown'da close() kalanları yazar.
+    """
+    
+    def __init__(self, flush_size: int, flush_interval: float):
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.executions: List[tuple] = []
+        self.nodes: List[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _ensure_started(self):
+        if self._thread is None and self.flush_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='log-flusher', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def add_execution(self, row: tuple):
+        with self._lock:
+            self.executions.append(row)
+            self._ensure_started()
+            full = len(self.executions) + len(self.nodes) >= self.flush_size
+        if full:
+            self.flush()
+    
+    def add_node(self, row: tuple):
+        with self._lock:
+            self.nodes.append(row)
+            self._ensure_started()
+            full = len(self.executions) + len(self.nodes) >= self.flush_size
+        if full:
+            self.flush()
+    
+    def flush(self):
+        """Biriken satırları tek transaction'da yaz"""
+        with self._lock:
+            executions, self.executions = self.executions, []
+            nodes, self.nodes = self.nodes, []
+        if not executions and not nodes:
+            return
+        
+        try:
+            with DB_LOCK:
+                conn = get_db()
+                with conn:
+                    conn.executemany('''
+                        INSERT INTO runner_executions
+                        (run_id, blueprint_id, blueprint_name, started_at, finished_at, status,
+                         total_time_ms, result_summary, error_message)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', executions)
+                    columns = ['run_id', 'blueprint_id', 'node_key', 'node_title', 'status',
+                               'error_message', 'finished_at'] + list(NODE_METRIC_COLUMNS)
+                    conn.executemany(
+                        f"INSERT INTO runner_node_executions ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})",
+                        nodes
+                    )
+        except sqlite3.Error as e:
+            print(f"⚠️ Log yazma hatası: {e}")
+            # Satırları kaybetme, sonraki flush'ta tekrar dene
+            with self._lock:
+                self.executions = executions + self.executions
+                self.nodes = nodes + self.nodes
+    
+    def close(self):
+        """Flusher thread'i durdur ve kalanları yaz"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+execution_log = ExecutionLogBuffer(LOG_FLUSH_SIZE, LOG_FLUSH_INTERVAL)
+
+def close_database():
+    """Bekleyen logları yaz ve bağlantıyı kapat (shutdown)"""
+    global _db_conn
+    
+    execution_log.close()
+    with DB_LOCK:
+        if _db_conn is not None:
+            _db_conn.close()
+            _db_conn = None
 
 def log_execution(blueprint_id: str, blueprint_name: str, status: str, 
-                  total_time: int, result: str, error: str = None):
-    """Execution'ı database'e kaydet"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT INTO runner_executions
-        (blueprint_id, blueprint_name, started_at, finished_at, status, total_time_ms, result_summary, error_message)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+                  total_time: int, result: str, error: str = None, run_id: str = None,
+                  started_at: datetime = None):
+    """Execution'ı log buffer'ına ekle (toplu yazılır)"""
+    execution_log.add_execution((
+        run_id,
         blueprint_id,
         blueprint_name,
-        datetime.now(),
+        started_at or datetime.now(),
         datetime.now(),
         status,
         total_time,
         result[:500] if result else None,
         error[:500] if error else None
     ))
+
+def log_node_execution(run_id: str, blueprint_id: str, node_key: str, node_title: str,
+                       status: str, error: str = None, metrics: Optional[Dict[str, Any]] = None):
+    """Düğüm sonucunu ve metriklerini log buffer'ına ekle"""
+    metrics = metrics or {}
+    execution_log.add_node((
+        run_id,
+        blueprint_id,
+        node_key,
+        node_title,
+        status,
+        error[:500] if error else None,
+        datetime.now()
+    ) + tuple(metrics.get(column) for column in NODE_METRIC_COLUMNS))
+
+# ==================== CHECKPOINTS ====================
+
+def load_checkpoint(blueprint_id: str, version: int, node_key: str, input_hash: str) -> Optional[str]:
+    """Girdisi değişmemiş düğümün kayıtlı çıktısını getir"""
+    try:
+        with DB_LOCK:
+            cursor = get_db().execute('''
+                SELECT output FROM runner_checkpoints
+                WHERE blueprint_id = ? AND blueprint_version = ? AND node_key = ? AND input_hash = ?
+            ''', (blueprint_id, version, node_key, input_hash))
+            row = cursor.fetchone()
+    except sqlite3.Error as e:
+        print(f"⚠️ Checkpoint okuma hatası: {e}")
+        return None
+    
+    return row[0] if row else None
+
+def save_checkpoint(blueprint_id: str, version: int, node_key: str, input_hash: str, output: str):
+    """Başarılı düğüm çıktısını kaydet"""
+    try:
+        with DB_LOCK:
+            conn = get_db()
+            with conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO runner_checkpoints
+                    (blueprint_id, blueprint_version, node_key, input_hash, output, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (blueprint_id, version, node_key, input_hash, output, datetime.now()))
+    except sqlite3.Error as e:
+        print(f"⚠️ Checkpoint yazma hatası: {e}")
+
+def clear_checkpoints(blueprint_id: str, keep_version: Optional[int] = None):
+    """Blueprint checkpoint'lerini sil - keep_version verilirse o sürüm kalır"""
+    try:
+        with DB_LOCK:
+            conn = get_db()
+            with conn:
+                if keep_version is None:
+                    conn.execute('DELETE FROM runner_checkpoints WHERE blueprint_id = ?', (blueprint_id,))
+                else:
+                    conn.execute(
+                        'DELETE FROM runner_checkpoints WHERE blueprint_id = ? AND blueprint_version != ?',
+                        (blueprint_id, keep_version)
+                    )
+    except sqlite3.Error as e:
+        print(f"⚠️ Checkpoint silme hatası: {e}")
+
+# ==================== LLM RESPONSE CACHE ====================
+
+_cache_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+_cache_stats_lock = threading.Lock()
+
+def _count_cache(event: str, amount: int = 1):
+    with _cache_stats_lock:
+        _cache_stats[event] += amount
+
+def cache_key(provider: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+    """(provider, model, prompt hash, sampling params) -> içerik adresli anahtar"""
+    payload = json.dumps({
+        'provider': provider,
+        'model': model,
+        'prompt_sha256': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        'params': params,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def cache_get(key: str) -> Optional[str]:
+    """Cache'ten yanıt getir - süresi dolmuşsa sil ve None döndür"""
+    now = time.time()
+    try:
+        with DB_LOCK:
+            conn = get_db()
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT response, created_at FROM llm_cache WHERE cache_key = ?', (key,))
+                row = cursor.fetchone()
+                
+                if row and now - row[1] > LLM_CACHE_TTL:
+                    cursor.execute('DELETE FROM llm_cache WHERE cache_key = ?', (key,))
+                    row = None
+                elif row:
+                    cursor.execute(
+                        'UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?',
+                        (now, key)
+                    )
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache okuma hatası: {e}")
+        row = None
+    
+    _count_cache('hits' if row else 'misses')
+    return row[0] if row else None
+
+def cache_put(key: str, provider: str, model: str, response: str):
+    """Yanıtı cache'e yaz, limit aşılırsa en eski kullanılanları (LRU) sil"""
+    now = time.time()
+    try:
+        with DB_LOCK:
+            conn = get_db()
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO llm_cache
+                    (cache_key, provider, model, response, created_at, last_used_at, hits)
+                    VALUES (?, ?, ?, ?, ?, ?, 0)
+                ''', (key, provider, model, response, now, now))
+                
+                cursor.execute('''
+                    DELETE FROM llm_cache WHERE cache_key IN (
+                        SELECT cache_key FROM llm_cache
+                        ORDER BY last_used_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                ''', (max(1, LLM_CACHE_MAX_ENTRIES),))
+                evicted = cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache yazma hatası: {e}")
+        return
+    
+    _count_cache('stores')
+    if evicted > 0:
+        _count_cache('evictions', evicted)
+
+def cache_stats() -> Dict[str, int]:
+    """Bu süreçteki hit/miss sayaçları"""
+    with _cache_stats_lock:
+        return dict(_cache_stats)
+
+def cached_call(provider: str, model: str, prompt: str, call, use_cache: bool = True) -> Tuple[bool, str, str]:
+    """call() sonucunu cache'le - yalnızca başarılı yanıtlar saklanır"""
+    if not (LLM_CACHE_ENABLED and use_cache):
+        return call()
     
-    conn.commit()
-    conn.close()
+    key = cache_key(provider, model, prompt, GENERATION_PARAMS)
+    cached = cache_get(key)
+    if cached is not None:
+        print(f"[CACHE] ⚡ {provider}/{model} cache hit")
+        record_metric(provider=provider, model=model, cached=True)
+        return True, cached, ''
+    
+    success, output, error = call()
+    if success:
+        cache_put(key, provider, model, output)
+    return success, output, error
 
 # ==================== SUPABASE CLIENT ====================
 
-def supabase_request(method: str, endpoint: str, data: Optional[dict] = None) -> dict:
-    """Supabase REST API isteği"""
-    url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    headers = {
+def supabase_headers() -> Dict[str, str]:
+    """Supabase REST ortak header'ları"""
+    return {
         'apikey': SUPABASE_KEY,
         'Authorization': f'Bearer {SUPABASE_KEY}',
         'Content-Type': 'application/json',
         'Prefer': 'return=representation'
     }
+
+def supabase_request(method: str, endpoint: str, data: Optional[dict] = None,
+                     extra_headers: Optional[dict] = None) -> dict:
+    """Supabase REST API isteği"""
+    url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
+    headers = supabase_headers()
+    if extra_headers:
+        headers.update(extra_headers)
+    
+    if method not in ('GET', 'POST', 'PATCH'):
+        return {'error': f'Unsupported method: {method}'}
     
     try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers, timeout=10)
-        elif method == 'POST':
-            response = requests.post(url, headers=headers, json=data, timeout=10)
-        elif method == 'PATCH':
-            response = requests.patch(url, headers=headers, json=data, timeout=10)
-        else:
-            return {'error': f'Unsupported method: {method}'}
+        with PROVIDER_LIMITS['supabase']:
+            if method == 'GET':
+                response = http_request('GET', url, headers=headers)
+            else:
+                response = http_request(method, url, headers=headers, json=data)
         
         return response.json() if response.text else {}
     except Exception as e:
         print(f"[Supabase] Hata: {e}")
         return {}
 
+def fetch_paginated(endpoint: str, page_size: int = BLUEPRINT_PAGE_SIZE) -> Optional[list]:
+    """Range header ile sayfa sayfa GET - hata olursa None"""
+    rows = []
+    offset = 0
+    while True:
+        page = supabase_request('GET', endpoint, extra_headers={
+            'Range-Unit': 'items',
+            'Range': f'{offset}-{offset + page_size - 1}',
+        })
+        if isinstance(page, dict) and page.get('code') == 'PGRST103' and offset:
+            return rows  # Son sayfa tam doluydu, aralık dışına çıkıldı (416)
+        if not isinstance(page, list):
+            return None
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+# ==================== SUPABASE WRITE QUEUE ====================
+
+def supabase_write(endpoint: str, payload: Any) -> int:
+    """Yanıt gövdesi istemeyen POST - HTTP durum kodu (bağlantı hatasında 0)"""
+    headers = supabase_headers()
+    headers['Prefer'] = 'return=minimal'
+    try:
+        with PROVIDER_LIMITS['supabase']:
+            response = http_request('POST', f"{SUPABASE_URL}/rest/v1/{endpoint}", headers=headers, json=payload)
+    except requests.RequestException as e:
+        print(f"[Supabase] Yazma hatası: {e}")
+        return 0
+    
+    if not response.ok:
+        print(f"[Supabase] {endpoint} HTTP {response.status_code}: {response.text[:200]}")
+    return response.status_code
+
+def supabase_retryable(status: int) -> bool:
+    """Bağlantı hatası, 429 ve 5xx geçicidir; diğer 4xx'ler tekrar denense de başarısız olur"""
+    return status == 0 or status == 429 or status >= 500
+
+class SupabaseWriteQueue:
+    """
+    execution_logs satırlarını ve blueprint durum güncellemelerini biriktirir
+    Loglar tek bir dizi POST'u ile, durumlar blueprint başına birleştirilip
+    record_blueprint_runs RPC'si ile (run_count atomik artar) tek istekte yazılır.
+    SUPABASE_FLUSH_SIZE'a ulaşınca, SUPABASE_FLUSH_INTERVAL'da bir veya close()'da flush edilir.
+    Yalnızca geçici hatalar (bağlantı, 429, 5xx) kuyruğa geri döner; reddedilen satırlar
+    loglanıp atılır. Kuyruk max_logs satırı aşarsa en eskiler atılır.
+    """
+    
+    def __init__(self, flush_size: int, flush_interval: float, max_logs: int = SUPABASE_QUEUE_MAX):
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = flush_interval
+        self.max_logs = max(self.flush_size, max_logs)
+        self.dropped = 0
+        self.overflowed = 0  # Son flush'tan beri sınır yüzünden atılan (flush'ta raporlanır)
+        self.added = 0  # Son flush'tan beri eklenen - geri dönen satırlar her eklemede flush tetiklemesin
+        self.logs: List[Dict[str, Any]] = []
+        self.statuses: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _ensure_started(self):
+        if self._thread is None and self.flush_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='supabase-flusher', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def _trim(self):
+        """Sınırı aşan en eski logları at (_lock altında çağrılır)"""
+        overflow = len(self.logs) - self.max_logs
+        if overflow > 0:
+            del self.logs[:overflow]
+            self.dropped += overflow
+            self.overflowed += overflow
+    
+    def add_log(self, row: Dict[str, Any]):
+        with self._lock:
+            self.logs.append(row)
+            self.added += 1
+            self._trim()
+            self._ensure_started()
+            full = self.added >= self.flush_size
+        if full:
+            self.flush()
+    
+    def add_status(self, blueprint_id: str, status: str, finished_at: str):
+        """Aynı blueprint'in bekleyen güncellemeleri tek satırda birleşir"""
+        with self._lock:
+            pending = self.statuses.setdefault(str(blueprint_id), {'id': str(blueprint_id), 'runs': 0})
+            pending['last_run'] = finished_at
+            pending['last_result'] = status
+            pending['runs'] += 1
+            self._ensure_started()
+    
+    def _requeue(self, logs: List[Dict[str, Any]], statuses: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self.logs = logs + self.logs
+            self._trim()
+            for bp_id, old in statuses.items():
+                newer = self.statuses.get(bp_id)
+                if newer:
+                    newer['runs'] += old['runs']
+                else:
+                    self.statuses[bp_id] = old
+    
+    def flush(self):
+        """Biriken logları ve durumları Supabase'e yaz"""
+        with self._flush_lock:
+            with self._lock:
+                logs, self.logs = self.logs, []
+                statuses, self.statuses = self.statuses, {}
+                overflowed, self.overflowed = self.overflowed, 0
+                self.added = 0
+            if overflowed:
+                print(f"⚠️ [Supabase] Yazma kuyruğu dolu, en eski {overflowed} log atıldı")
+            if not logs and not statuses:
+                return
+            
+            if logs:
+                self._requeue(self._write_logs(logs), {})
+            if statuses:
+                status = supabase_write('rpc/record_blueprint_runs', {'runs': list(statuses.values())})
+                if supabase_retryable(status):
+                    self._requeue([], statuses)
+                elif status >= 400:
+                    with self._lock:
+                        self.dropped += len(statuses)
+                    print(f"⚠️ [Supabase] {len(statuses)} blueprint durumu reddedildi (HTTP {status}), atıldı")
+    
+    def _write_logs(self, logs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Logları yaz - tekrar denenecek satırları döndür; reddedilen parti ikiye bölünerek hatalı satır ayıklanır"""
+        status = supabase_write('execution_logs', logs)
+        if supabase_retryable(status):
+            return logs
+        if status < 400:
+            return []
+        if len(logs) == 1:
+            with self._lock:
+                self.dropped += 1
+            print(f"⚠️ [Supabase] execution_logs satırı reddedildi (HTTP {status}), atıldı: "
+                  f"blueprint {logs[0].get('blueprint_id')} @ {logs[0].get('finished_at')}")
+            return []
+        middle = len(logs) // 2
+        return self._write_logs(logs[:middle]) + self._write_logs(logs[middle:])
+    
+    def close(self):
+        """Flusher thread'i durdur ve kalanları yaz"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+supabase_writes = SupabaseWriteQueue(SUPABASE_FLUSH_SIZE, SUPABASE_FLUSH_INTERVAL)
+
+def record_remote_execution(blueprint_id: str, status: str, result: Optional[str],
+                            started_at: datetime, total_time: int):
+    """execution_logs satırını ve blueprint durumunu write-behind kuyruğuna ekle"""
+    finished_at = datetime.utcnow().isoformat()
+    try:
+        node_results = json.loads(result) if result else None
+    except ValueError:
+        node_results = {'output': result}
+    
+    supabase_writes.add_log({
+        'blueprint_id': blueprint_id,
+        'status': status,
+        'started_at': started_at.isoformat(),
+        'finished_at': finished_at,
+        'duration_ms': total_time,
+        'node_results': node_results if status == 'success' else None,
+        'error_message': result[:1000] if status != 'success' and result else None,
+    })
+    supabase_writes.add_status(blueprint_id, status, finished_at)
+
+# ==================== BLUEPRINT CACHE ====================
+
+def blueprint_sync_cursor() -> Optional[str]:
+    """Yerel kopyadaki en yeni updated_at"""
+    with DB_LOCK:
+        row = get_db().execute('SELECT MAX(updated_at) FROM runner_blueprints').fetchone()
+    return row[0] if row else None
+
+def sync_blueprints() -> bool:
+    """
+    Supabase'den sadece son senkrondan beri değişen blueprint'leri çek
+    Pasife alınanlar da updated_at'i güncellediği için aynı sorguda gelir;
+    silinenler küçük bir id listesiyle ayıklanır.
+    İmleç gte ile uygulanır: imleçle aynı zaman damgalı olup son senkronda
+    gelmemiş satırlar atlanmaz; zaten kayıtlı olanlar id ile ayıklanır.
+    """
+    cursor = blueprint_sync_cursor()
+    endpoint = f'blueprints?select={BLUEPRINT_COLUMNS}&order=updated_at.asc,id.asc'
+    if cursor:
+        endpoint += f'&updated_at=gte.{quote(cursor, safe="")}'
+    
+    changed = fetch_paginated(endpoint)
+    active_ids = fetch_paginated('blueprints?select=id&is_active=eq.true&order=id.asc')
+    if changed is None or active_ids is None:
+        print("⚠️ Blueprint senkronu başarısız, yerel kopya kullanılıyor")
+        return False
+    
+    # Sayfalama sırasında güncellenen satır iki kez gelebilir - id başına en yenisi
+    latest = {str(bp['id']): bp for bp in changed if isinstance(bp, dict) and bp.get('id')}
+    keep = {str(item['id']) for item in active_ids if isinstance(item, dict) and item.get('id')}
+    
+    with DB_LOCK:
+        conn = get_db()
+        with conn:
+            known = dict(conn.execute('SELECT id, updated_at FROM runner_blueprints WHERE updated_at = ?', (cursor,))) if cursor else {}
+            rows = [
+                (bp_id, bp.get('updated_at'), int(bp.get('is_active') is not False),
+                 json.dumps(bp, ensure_ascii=False))
+                for bp_id, bp in latest.items() if known.get(bp_id) != bp.get('updated_at')
+            ]
+            conn.executemany('INSERT OR REPLACE INTO runner_blueprints (id, updated_at, is_active, data) VALUES (?, ?, ?, ?)', rows)
+            stale = [(bp_id,) for (bp_id,) in conn.execute('SELECT id FROM runner_blueprints WHERE is_active = 1')
+                     if bp_id not in keep]
+            conn.executemany('UPDATE runner_blueprints SET is_active = 0 WHERE id = ?', stale)
+    
+    print(f"🔄 Blueprint senkronu: {len(rows)} değişen, {len(stale)} kaldırılan ({'artımlı' if cursor else 'tam'})")
+    return True
+
 def get_active_blueprints() -> list:
-    """Supabase'den aktif blueprint'leri getir"""
-    result = supabase_request('GET', 'blueprints?is_active=eq.true')
-    return result if isinstance(result, list) else []
+    """Aktif blueprint'ler - önce artımlı senkron, sonra yerel kopyadan oku"""
+    try:
+        sync_blueprints()
+        with DB_LOCK:
+            rows = get_db().execute('SELECT data FROM runner_blueprints WHERE is_active = 1 ORDER BY id').fetchall()
+    except sqlite3.Error as e:
+        print(f"⚠️ Blueprint cache hatası: {e}, doğrudan Supabase'den çekiliyor")
+        result = fetch_paginated(f'blueprints?select={BLUEPRINT_COLUMNS}&is_active=eq.true')
+        return result or []
+    return [json.loads(data) for (data,) in rows]
 
 # ==================== HUGGINGFACE API ====================
 
-def call_hf_with_retry(prompt: str, model: str = None, max_retries: int = MAX_RETRIES) -> Tuple[bool, str, str]:
+class ModelStreamError(Exception):
+    """Streaming model çağrısı başarısız"""
+
+class HedgeCancelled(ModelStreamError):
+    """Hedge denemesi kaybetti - istek yarıda bırakıldı"""
+
+HEDGE_CANCELLED_ERROR = 'Hedge kaybetti, iptal edildi'
+
+def hedge_active() -> bool:
+    """Bu thread bir hedge denemesi mi (kaybederse iptal edilebilir)"""
+    return getattr(_node_metrics, 'cancelled', None) is not None
+
+@contextmanager
+def provider_slot(provider: str):
+    """PROVIDER_LIMITS slotu - hedge kaybedeni slot beklerken HedgeCancelled ile vazgeçer"""
+    limit = PROVIDER_LIMITS[provider]
+    while not limit.acquire(timeout=0.05):
+        if hedge_cancelled():
+            raise HedgeCancelled(HEDGE_CANCELLED_ERROR)
+    try:
+        yield
+    finally:
+        limit.release()
+
+_STREAM_END = object()
+
+def pump_stream(name: str, read: Callable[[], Iterator[str]]) -> Iterator[str]:
+    """
+    read() parçalarını ayrı thread'de okuyup kuyruktan yield et
+    Sağlayıcı semaforunu yalnızca ağ okuması (read içinde) tutar; yavaş tüketici
+    slotu bloklamaz. Tüketici erken bırakırsa okuma sonraki parçada durur.
+    """
+    chunks: queue.Queue = queue.Queue()
+    stopped = threading.Event()
+    # Okuyucu thread çağıranın düğüm metriğine ve hedge iptaline yazar
+    metrics = getattr(_node_metrics, 'current', None)
+    cancelled = getattr(_node_metrics, 'cancelled', None)
+    
+    def run():
+        _node_metrics.current = metrics
+        _node_metrics.cancelled = cancelled
+        try:
+            for chunk in read():
+                if stopped.is_set():
+                    break
+                chunks.put(chunk)
+            chunks.put(_STREAM_END)
+        except BaseException as e:
+            chunks.put(e)
+        finally:
+            _node_metrics.current = None
+            _node_metrics.cancelled = None
+    
+    threading.Thread(target=run, name=f'{name}-stream', daemon=True).start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+def loading_wait_time(response: requests.Response, attempt: int) -> float:
+    """503 'model loading' için bekleme: Retry-After > estimated_time > backoff"""
+    wait_time = parse_retry_after(response.headers.get('Retry-After'))
+    if wait_time is None:
+        try:
+            wait_time = float(response.json().get('estimated_time'))
+        except (ValueError, TypeError, AttributeError):
+            wait_time = min(30 * (2 ** attempt), 60)
+    return min(wait_time, 60)
+
+def call_hf_with_retry(prompt: str, model: str = None, max_retries: int = MAX_RETRIES,
+                       wait_on_loading: bool = True) -> Tuple[bool, str, str]:
     """
     HuggingFace API'yi çağır - 3x retry ile
+    wait_on_loading=False: model yükleniyorsa (503) beklemeden hata döner, router başka backend'e geçer
     Returns: (success, output, error)
     """
     
@@ -141,50 +1152,68 @@ def call_hf_with_retry(prompt: str, model: str = None, max_retries: int = MAX_RE
         model = HF_MODELS['text']
     
     if not HF_TOKEN:
-        print("[HF] Token bulunamadı, Ollama'ya fallback...")
-        return call_ollama(prompt)
+        return False, '', 'HUGGINGFACE_TOKEN tanımlı değil'
+    
+    if hedge_active():
+        # Hedge denemesi stream edilir: kaybederse bağlantı kapanır, slot hemen boşalır
+        try:
+            return True, ''.join(_read_hf_stream(prompt, model, max_retries, wait_on_loading)).strip(), ''
+        except ModelStreamError as e:
+            return False, '', str(e)
     
-    url = 'https://router.huggingface.co/v1/chat/completions'
+    url = f'{HF_ROUTER_URL}/v1/chat/completions'
     headers = {
         'Authorization': f'Bearer {HF_TOKEN}',
         'Content-Type': 'application/json',
     }
+    limiter = get_rate_limiter('hf', model)
     
     for attempt in range(max_retries):
+        if attempt > 0:
+            if hedge_cancelled():
+                return False, '', HEDGE_CANCELLED_ERROR
+            add_metric('retries', 1)
         try:
-            response = requests.post(
-                url,
-                headers=headers,
-                json={
-                    'model': model,
-                    'messages': [
-                        {'role': 'user', 'content': prompt}
-                    ],
-                    'max_tokens': 512,
-                    'temperature': 0.7,
-                    'stream': False
-                },
-                timeout=REQUEST_TIMEOUT
-            )
+            # Token gelene kadar bekle (semafor tutulmadan)
+            add_metric('rate_wait_ms', int(limiter.acquire() * 1000))
+            with provider_slot('hf'):
+                response = http_request(
+                    'POST',
+                    url,
+                    headers=headers,
+                    json={
+                        'model': model,
+                        'messages': [
+                            {'role': 'user', 'content': prompt}
+                        ],
+                        'max_tokens': GENERATION_PARAMS['max_tokens'],
+                        'temperature': GENERATION_PARAMS['temperature'],
+                        'stream': False
+                    },
+                    timeout=REQUEST_TIMEOUT
+                )
             
-            # Model yükleniyor?
+            # Model yükleniyor? Limiter'ı duraklat, sonraki acquire bekler
             if response.status_code == 503:
                 error_text = response.text
                 if 'loading' in error_text.lower():
-                    wait_time = min(30 * (2 ** attempt), 60)
-                    print(f"⏳ Model yükleniyor, {wait_time}s bekleniyor... ({attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
+                    wait_time = loading_wait_time(response, attempt)
+                    limiter.pause(wait_time)
+                    if not wait_on_loading:
+                        return False, '', f'Model loading (~{wait_time:.0f}s)'
+                    print(f"⏳ Model yükleniyor, {wait_time:.0f}s bekleniyor... ({attempt + 1}/{max_retries})")
                     continue
             
-            # Rate limit?
+            # Rate limit? Limiter hızı öğrenir, tüm blueprint'ler yavaşlar
             if response.status_code == 429:
-                wait_time = min(5 * (2 ** attempt), 60)
-                print(f"⏳ Rate limited, {wait_time}s bekleniyor... ({attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                limiter.on_throttle(retry_after)
+                print(f"⏳ Rate limited ({limiter.rate:.2f} req/s)... ({attempt + 1}/{max_retries})")
                 continue
             
             # Başarılı?
             if response.status_code == 200:
+                limiter.on_success()
                 data = response.json()
                 # Chat Completions format parsing
                 if 'choices' in data and len(data['choices']) > 0:
@@ -193,11 +1222,19 @@ def call_hf_with_retry(prompt: str, model: str = None, max_retries: int = MAX_RE
                     output = data[0].get('generated_text', '')
                 else:
                     output = data.get('generated_text', '')
+                usage = (data.get('usage') or {}) if isinstance(data, dict) else {}
+                record_metric(provider='hf', model=model,
+                              prompt_tokens=usage.get('prompt_tokens'),
+                              completion_tokens=usage.get('completion_tokens'),
+                              cached_prompt_tokens=(usage.get('prompt_tokens_details') or {}).get('cached_tokens'))
                 return True, str(output).strip(), ''
             
             # Ciddi hata
             return False, '', f'API Error {response.status_code}: {response.text[:100]}'
         
+        except HedgeCancelled as e:
+            return False, '', str(e)
+        
         except requests.Timeout:
             wait_time = 2 ** attempt
             print(f"⏳ Timeout, {wait_time}s sonra retry... ({attempt + 1}/{max_retries})")
@@ -214,28 +1251,252 @@ def call_hf_with_retry(prompt: str, model: str = None, max_retries: int = MAX_RE
     
     return False, '', f'Max retries ({max_retries}) exceeded'
 
+def stream_hf(prompt: str, model: str = None, max_retries: int = MAX_RETRIES,
+              wait_on_loading: bool = True) -> Iterator[str]:
+    """
+    HF chat-completions'ı SSE ile stream et - içerik parçalarını yield eder
+    İlk token'dan önceki 429/503/bağlantı hataları retry edilir; hata ModelStreamError fırlatır
+    """
+    yield from pump_stream('hf', partial(_read_hf_stream, prompt, model, max_retries, wait_on_loading))
+
+def _read_hf_stream(prompt: str, model: Optional[str], max_retries: int,
+                    wait_on_loading: bool) -> Iterator[str]:
+    """stream_hf okuyucusu - semafor yalnızca HTTP okuması boyunca tutulur"""
+    
+    if not model:
+        model = HF_MODELS['text']
+    
+    if not HF_TOKEN:
+        raise ModelStreamError('HUGGINGFACE_TOKEN tanımlı değil')
+    
+    url = f'{HF_ROUTER_URL}/v1/chat/completions'
+    headers = {
+        'Authorization': f'Bearer {HF_TOKEN}',
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+    }
+    limiter = get_rate_limiter('hf', model)
+    last_error = f'Max retries ({max_retries}) exceeded'
+    
+    for attempt in range(max_retries):
+        if attempt > 0:
+            if hedge_cancelled():
+                raise HedgeCancelled(HEDGE_CANCELLED_ERROR)
+            add_metric('retries', 1)
+        retry_wait = 0
+        add_metric('rate_wait_ms', int(limiter.acquire() * 1000))
+        with provider_slot('hf'):
+            try:
+                response = http_request(
+                    'POST',
+                    url,
+                    headers=headers,
+                    json={
+                        'model': model,
+                        'messages': [
+                            {'role': 'user', 'content': prompt}
+                        ],
+                        'max_tokens': GENERATION_PARAMS['max_tokens'],
+                        'temperature': GENERATION_PARAMS['temperature'],
+                        'stream': True,
+                        'stream_options': {'include_usage': True}
+                    },
+                    timeout=REQUEST_TIMEOUT,
+                    stream=True
+                )
+            except requests.RequestException as e:
+                last_error = str(e)
+                retry_wait = 2 ** attempt
+                response = None
+            
+            if response is not None:
+                with response:
+                    if response.status_code == 503 and 'loading' in response.text.lower():
+                        limiter.pause(loading_wait_time(response, attempt))
+                        last_error = 'Model loading'
+                        if not wait_on_loading:
+                            raise ModelStreamError(last_error)
+                        continue
+                    
+                    if response.status_code == 429:
+                        limiter.on_throttle(parse_retry_after(response.headers.get('Retry-After')))
+                        last_error = 'Rate limited'
+                        continue
+                    
+                    if response.status_code != 200:
+                        raise ModelStreamError(f'API Error {response.status_code}: {response.text[:100]}')
+                    
+                    limiter.on_success()
+                    record_metric(provider='hf', model=model)
+                    response.encoding = 'utf-8'
+                    try:
+                        for line in response.iter_lines(decode_unicode=True):
+                            # Kaybeden hedge bağlantıyı kapatır, HF slotu hemen boşalır
+                            if hedge_cancelled():
+                                raise HedgeCancelled(HEDGE_CANCELLED_ERROR)
+                            if not line or not line.startswith('data:'):
+                                continue
+                            payload = line[len('data:'):].strip()
+                            if payload == '[DONE]':
+                                break
+                            data = json.loads(payload)
+                            if data.get('usage'):
+                                record_metric(prompt_tokens=data['usage'].get('prompt_tokens'),
+                                              completion_tokens=data['usage'].get('completion_tokens'),
+                                              cached_prompt_tokens=(data['usage'].get('prompt_tokens_details') or {}).get('cached_tokens'))
+                            choices = data.get('choices') or [{}]
+                            chunk = choices[0].get('delta', {}).get('content')
+                            if chunk:
+                                yield chunk
+                    except (requests.RequestException, ValueError) as e:
+                        raise ModelStreamError(f'Stream kesildi: {e}')
+                    return
+        
+        # Bağlantı hatası: semafor bırakıldıktan sonra bekle
+        if attempt < max_retries - 1 and retry_wait:
+            print(f"⚠️ Hata: {last_error}, {retry_wait}s sonra retry...")
+            time.sleep(retry_wait)
+    
+    raise ModelStreamError(last_error)
+
 # ==================== OLLAMA LOCAL ====================
 
+# Daemon'un bildirdiği en yakın zamanlanmış çalışma (UTC) - keep_alive buna göre seçilir
+_next_scheduled_run: Optional[datetime] = None
+
+def set_next_scheduled_run(moment: Optional[datetime]):
+    global _next_scheduled_run
+    _next_scheduled_run = moment
+
+def ollama_keep_alive():
+    """
+    keep_alive politikası: sabit değer veya auto
+    auto: sonraki çalışma OLLAMA_KEEP_ALIVE_MAX içindeyse o ana kadar (+1 dk) bellekte tut,
+    değilse OLLAMA_KEEP_ALIVE_IDLE sonra boşalt (küçük makinelerde RAM serbest kalır)
+    """
+    if OLLAMA_KEEP_ALIVE != 'auto':
+        return OLLAMA_KEEP_ALIVE
+    
+    upcoming = _next_scheduled_run
+    if upcoming is not None:
+        seconds = (upcoming - datetime.utcnow()).total_seconds() + 60
+        if seconds <= OLLAMA_KEEP_ALIVE_MAX:
+            return int(max(seconds, 60))
+    return OLLAMA_KEEP_ALIVE_IDLE
+
+def record_ollama_timings(model: str, data: Dict[str, Any]):
+    """Ollama'nın done yanıtındaki token ve süre (ns) alanlarını düğüm metriğine yaz"""
+    record_metric(provider='ollama', model=model,
+                  prompt_tokens=data.get('prompt_eval_count'),
+                  completion_tokens=data.get('eval_count'))
+    if data.get('load_duration') is not None:
+        add_metric('load_ms', int(data['load_duration'] / 1e6))
+    if data.get('eval_duration') is not None:
+        add_metric('eval_ms', int(data['eval_duration'] / 1e6))
+
+def warm_ollama_models():
+    """Router'ın kullanacağı Ollama modellerini boş prompt ile belleğe yükle"""
+    if not (USE_OLLAMA and OLLAMA_WARMUP):
+        return
+    
+    models = [model for provider, model in configured_backends() if provider == 'ollama']
+    for model in models:
+        try:
+            with PROVIDER_LIMITS['ollama']:
+                response = http_request('POST', f'{OLLAMA_URL}/api/generate',
+                                        json={'model': model, 'keep_alive': ollama_keep_alive()},
+                                        timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                load_ms = int((response.json().get('load_duration') or 0) / 1e6)
+                print(f"[OLLAMA] 🔥 {model} hazır (yükleme {load_ms}ms)")
+            else:
+                print(f"[OLLAMA] ⚠️ {model} ısıtılamadı: {response.status_code}")
+        except Exception as e:
+            print(f"[OLLAMA] ⚠️ {model} ısıtılamadı: {e}")
+
+def start_ollama_warmup():
+    """Warm-up'ı arka planda başlat - blueprint'ler çekilirken model yüklenir"""
+    if USE_OLLAMA and OLLAMA_WARMUP:
+        threading.Thread(target=warm_ollama_models, name='ollama-warmup', daemon=True).start()
+
+_ollama_prefix_contexts: 'OrderedDict[Tuple[str, str], List[int]]' = OrderedDict()
+_ollama_prefix_lock = threading.Lock()
+OLLAMA_PREFIX_CONTEXT_MAX = 64  # Bellekte tutulan prefix context sayısı (LRU)
+
+def ollama_prompt_fields(prompt: str, model: str) -> Dict[str, Any]:
+    """
+    /api/generate prompt alanları
+    OLLAMA_PREFIX_CONTEXT açıksa ve prompt statik prefix taşıyorsa prefix bir kez
+    değerlendirilir, dönen context token'larıyla sonraki çağrılar yalnızca son ekini gönderir.
+    """
+    prefix = getattr(prompt, 'prefix', '')
+    if not (OLLAMA_PREFIX_CONTEXT and prefix):
+        return {'prompt': prompt}
+    
+    key = (model, prompt.prefix_hash)
+    with _ollama_prefix_lock:
+        context = _ollama_prefix_contexts.get(key)
+        if context is not None:
+            _ollama_prefix_contexts.move_to_end(key)
+    if context is not None:
+        # Yalnızca bu yol prefix'i göndermez - tasarruf gerçek
+        add_metric('prefix_bytes_saved', len(prefix.encode('utf-8')))
+    
+    if context is None:
+        try:
+            with provider_slot('ollama'):
+                response = http_request('POST', f'{OLLAMA_URL}/api/generate', json={
+                    'model': model,
+                    'prompt': prefix,
+                    'raw': True,
+                    'stream': False,
+                    'keep_alive': ollama_keep_alive(),
+                    'options': {'num_predict': 0},
+                }, timeout=REQUEST_TIMEOUT)
+            context = response.json().get('context') if response.status_code == 200 else None
+        except (requests.RequestException, ValueError):
+            context = None
+        if not context:
+            return {'prompt': prompt}
+        with _ollama_prefix_lock:
+            _ollama_prefix_contexts[key] = context
+            while len(_ollama_prefix_contexts) > OLLAMA_PREFIX_CONTEXT_MAX:
+                _ollama_prefix_contexts.popitem(last=False)
+    
+    return {'prompt': prompt[len(prefix):], 'context': context, 'raw': True}
+
 def call_ollama(prompt: str, model: str = None) -> Tuple[bool, str, str]:
     """Ollama local model'i çağır"""
     
     if not model:
         model = OLLAMA_MODELS['fast']
     
+    if hedge_active():
+        # Hedge denemesi stream edilir: kaybederse bağlantı kapanır, slot hemen boşalır
+        try:
+            return True, ''.join(_read_ollama_stream(prompt, model)), ''
+        except ModelStreamError as e:
+            return False, '', str(e)
+    
     try:
-        response = requests.post(
-            f'{OLLAMA_URL}/api/generate',
-            json={
-                'model': model,
-                'prompt': prompt,
-                'stream': False,
-                'temperature': 0.7,
-            },
-            timeout=REQUEST_TIMEOUT
-        )
+        fields = ollama_prompt_fields(prompt, model)  # Semafor alınmadan (prefix isteği kendisi alır)
+        with provider_slot('ollama'):
+            response = http_request(
+                'POST',
+                f'{OLLAMA_URL}/api/generate',
+                json={
+                    'model': model,
+                    **fields,
+                    'stream': False,
+                    'temperature': GENERATION_PARAMS['temperature'],
+                    'keep_alive': ollama_keep_alive(),
+                },
+                timeout=REQUEST_TIMEOUT
+            )
         
         if response.status_code == 200:
             data = response.json()
+            record_ollama_timings(model, data)
             return True, data.get('response', ''), ''
         else:
             return False, '', f'Ollama error: {response.status_code}'
@@ -243,446 +1504,1627 @@ def call_ollama(prompt: str, model: str = None) -> Tuple[bool, str, str]:
     except Exception as e:
         return False, '', f'Ollama connection failed: {e}'
 
-# ==================== UNIFIED API CALL ====================
+def stream_ollama(prompt: str, model: str = None) -> Iterator[str]:
+    """Ollama /api/generate NDJSON stream - response parçalarını yield eder"""
+    yield from pump_stream('ollama', partial(_read_ollama_stream, prompt, model))
 
-def call_model(prompt: str) -> Tuple[bool, str, str]:
-    """
-    Model'i çağır - HF veya Ollama
-    Önce tercih edilen, başarısız olursa fallback
-    """
+def _read_ollama_stream(prompt: str, model: Optional[str]) -> Iterator[str]:
+    """stream_ollama okuyucusu - semafor yalnızca HTTP okuması boyunca tutulur"""
     
-    if USE_OLLAMA:
-        print("[OLLAMA] Çalışıyor...")
-        success, output, error = call_ollama(prompt)
-        if success:
-            return True, output, ''
-        print(f"[OLLAMA] Başarısız: {error}, HF'ye fallback...")
+    if not model:
+        model = OLLAMA_MODELS['fast']
     
-    # HuggingFace API'yi dene
-    print("[HF] Çalışıyor...")
-    return call_hf_with_retry(prompt, HF_MODELS['text'])
+    fields = ollama_prompt_fields(prompt, model)  # Semafor alınmadan (prefix isteği kendisi alır)
+    with provider_slot('ollama'):
+        try:
+            response = http_request(
+                'POST',
+                f'{OLLAMA_URL}/api/generate',
+                json={
+                    'model': model,
+                    **fields,
+                    'stream': True,
+                    'temperature': GENERATION_PARAMS['temperature'],
+                    'keep_alive': ollama_keep_alive(),
+                },
+                timeout=REQUEST_TIMEOUT,
+                stream=True
+            )
+        except requests.RequestException as e:
+            raise ModelStreamError(f'Ollama connection failed: {e}')
+        
+        with response:
+            if response.status_code != 200:
+                raise ModelStreamError(f'Ollama error: {response.status_code}')
+            
+            try:
+                for line in response.iter_lines():
+                    # Kaybeden hedge bağlantıyı kapatır - Ollama üretimi durdurur, slot boşalır
+                    if hedge_cancelled():
+                        raise HedgeCancelled(HEDGE_CANCELLED_ERROR)
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get('error'):
+                        raise ModelStreamError(f"Ollama error: {data['error']}")
+                    if data.get('response'):
+                        yield data['response']
+                    if data.get('done'):
+                        record_ollama_timings(model, data)
+                        break
+            except (requests.RequestException, ValueError) as e:
+                raise ModelStreamError(f'Ollama stream kesildi: {e}')
 
-# ==================== NOTIFICATIONS ====================
+# ==================== GEMINI ====================
 
-def send_telegram(message: str):
-    """Telegram bildirimi gönder"""
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        return
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models'
+
+def gemini_payload(prompt: str) -> Dict[str, Any]:
+    return {
+        'contents': [{'parts': [{'text': prompt}]}],
+        'generationConfig': {
+            'maxOutputTokens': GENERATION_PARAMS['max_tokens'],
+            'temperature': GENERATION_PARAMS['temperature'],
+        }
+    }
+
+def call_gemini(prompt: str, model: str = None) -> Tuple[bool, str, str]:
+    """Gemini generateContent çağrısı - Returns: (success, output, error)"""
+    
+    if not model:
+        model = GEMINI_MODEL
+    
+    if not GEMINI_API_KEY:
+        return False, '', 'GEMINI_API_KEY tanımlı değil'
+    
+    if hedge_active():
+        # Hedge denemesi stream edilir: kaybederse bağlantı kapanır, slot hemen boşalır
+        try:
+            output = ''.join(_read_gemini_stream(prompt, model)).strip()
+        except ModelStreamError as e:
+            return False, '', str(e)
+        return (True, output, '') if output else (False, '', 'API Hatası: boş yanıt')
+    
+    url = f"{GEMINI_API_URL}/{model}:generateContent?key={GEMINI_API_KEY}"
+    
     try:
-        requests.post(url, json={
-            'chat_id': TELEGRAM_CHAT_ID,
-            'text': message,
-            'parse_mode': 'HTML'
-        }, timeout=10)
-        print("✓ Telegram mesajı gönderildi")
+        with provider_slot('gemini'):
+            response = http_request('POST', url, timeout=REQUEST_TIMEOUT, json=gemini_payload(prompt))
+        data = response.json()
+        
+        if 'candidates' in data and data['candidates']:
+            usage = data.get('usageMetadata') or {}
+            record_metric(provider='gemini', model=model,
+                          prompt_tokens=usage.get('promptTokenCount'),
+                          completion_tokens=usage.get('candidatesTokenCount'))
+            return True, data['candidates'][0]['content']['parts'][0]['text'].strip(), ''
+        return False, '', f"API Hatası: {data.get('error', {}).get('message', 'Unknown')}"
+    except HedgeCancelled as e:
+        return False, '', str(e)
     except Exception as e:
-        print(f"⚠️ Telegram hatası: {e}")
+        return False, '', f"Bağlantı hatası: {str(e)}"
+
+def _read_gemini_stream(prompt: str, model: str) -> Iterator[str]:
+    """Gemini streamGenerateContent (SSE) - hedge kaybederse parçalar arasında bağlantıyı kapatır"""
+    url = f"{GEMINI_API_URL}/{model}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+    with provider_slot('gemini'):
+        try:
+            response = http_request('POST', url, timeout=REQUEST_TIMEOUT, json=gemini_payload(prompt), stream=True)
+        except requests.RequestException as e:
+            raise ModelStreamError(f"Bağlantı hatası: {e}")
+        
+        with response:
+            if response.status_code != 200:
+                raise ModelStreamError(f"API Hatası: {response.status_code}: {response.text[:100]}")
+            
+            record_metric(provider='gemini', model=model)
+            response.encoding = 'utf-8'
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if hedge_cancelled():
+                        raise HedgeCancelled(HEDGE_CANCELLED_ERROR)
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = json.loads(line[len('data:'):].strip())
+                    usage = data.get('usageMetadata')
+                    if usage:
+                        record_metric(prompt_tokens=usage.get('promptTokenCount'),
+                                      completion_tokens=usage.get('candidatesTokenCount'))
+                    candidates = data.get('candidates') or [{}]
+                    for part in (candidates[0].get('content') or {}).get('parts') or []:
+                        if part.get('text'):
+                            yield part['text']
+            except (requests.RequestException, ValueError) as e:
+                raise ModelStreamError(f'Gemini stream kesildi: {e}')
+
+def run_gemini_agent(node: dict, context: str) -> str:
+    """Gemini AI ile ajan çalıştır"""
+    if not GEMINI_API_KEY:
+        return f"[MOCK] {node.get('title', 'Agent')}: Simülasyon yanıtı"
+    
+    prompt = f"""
+    ROL: {node.get('role', 'Assistant')}
+    GÖREV: {node.get('task', '')}
+    BAĞLAM: {context}
+    
+    Türkçe ve detaylı yanıt ver.
+    """
+    
+    success, output, error = call_gemini(prompt)
+    return output if success else error
+
+# ==================== MODEL ROUTER ====================
+
+class BackendHealth:
+    """
+    Backend (sağlayıcı/model) başına kayan gecikme ve hata penceresi + devre kesici
+    ROUTER_BREAKER_THRESHOLD art arda hatada devre açılır, cooldown sonunda
+    tek bir deneme isteğine izin verilir (half-open); başarılıysa kapanır.
+    """
+    
+    def __init__(self, provider: str, model: str, window: int = ROUTER_WINDOW):
+        self.provider = provider
+        self.model = model
+        self.latencies = deque(maxlen=max(1, window))
+        self.outcomes = deque(maxlen=max(1, window))
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def _state(self, now: float) -> str:
+        if not self.open_until:
+            return 'closed'
+        return 'open' if now < self.open_until else 'half_open'
+    
+    def available(self) -> bool:
+        with self._lock:
+            state = self._state(time.monotonic())
+            return state == 'closed' or (state == 'half_open' and not self.trial_in_flight)
+    
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+            if self._state(time.monotonic()) == 'half_open':
+                self.trial_in_flight = True
+    
+    def end(self, success: bool, latency: float, cancelled: bool = False):
+        """
+        İstek sonucu - cancelled: hedge kaybedeni yarıda bırakıldı; hata sayılmaz,
+        süresi (kazanandan yavaştı) gecikme örneği olarak eklenir
+        """
+        with self._lock:
+            self.in_flight -= 1
+            was_trial, self.trial_in_flight = self.trial_in_flight, False
+            if cancelled:
+                self.latencies.append(latency)
+                return
+            self.outcomes.append(success)
+            if success:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+                return
+            self.consecutive_failures += 1
+            if was_trial or self.consecutive_failures >= ROUTER_BREAKER_THRESHOLD:
+                if not self.open_until or was_trial:
+                    print(f"[ROUTER] 🔌 {self.provider}/{self.model} devre açıldı ({ROUTER_BREAKER_COOLDOWN:.0f}s)")
+                self.open_until = time.monotonic() + ROUTER_BREAKER_COOLDOWN
+    
+    def _percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    def latency_percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Başarılı isteklerin q yüzdelik gecikmesi (sn) - yeterli örnek yoksa None"""
+        with self._lock:
+            if len(self.latencies) < max(1, min_samples):
+                return None
+            return self._percentile(q)
+    
+    def score(self) -> float:
+        """Beklenen süre (sn): p50 x kuyruk x hata cezası + limiter duraklaması - küçük olan seçilir"""
+        with self._lock:
+            p50 = self._percentile(0.5)
+            if p50 is None:
+                # Hiç denenmemiş backend önce keşfedilir; yalnızca hata almış olan en kötü süreyle sayılır
+                p50 = REQUEST_TIMEOUT if self.outcomes else 0.0
+            errors = self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+            queued = self.in_flight
+        if self.provider == 'hf':
+            limiter = get_rate_limiter('hf', self.model).stats()
+            queued += limiter['queue_depth']
+            return p50 * (1 + queued) / max(0.05, 1 - errors) + limiter['paused_for']
+        return p50 * (1 + queued) / max(0.05, 1 - errors)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            p50, p95 = self._percentile(0.5), self._percentile(0.95)
+            return {
+                'p50_ms': int(p50 * 1000) if p50 is not None else None,
+                'p95_ms': int(p95 * 1000) if p95 is not None else None,
+                'error_rate': round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else 0.0,
+                'requests': len(self.outcomes),
+                'in_flight': self.in_flight,
+                'state': self._state(time.monotonic()),
+            }
+
+_backend_health: Dict[str, BackendHealth] = {}
+_backend_health_lock = threading.Lock()
+
+def get_backend_health(provider: str, model: str) -> BackendHealth:
+    """Sağlayıcı/model başına paylaşılan sağlık kaydı"""
+    key = f"{provider}:{model}"
+    with _backend_health_lock:
+        if key not in _backend_health:
+            _backend_health[key] = BackendHealth(provider, model)
+        return _backend_health[key]
+
+def router_stats() -> Dict[str, Dict[str, Any]]:
+    """Monitoring: backend başına p50/p95, hata oranı ve devre durumu"""
+    with _backend_health_lock:
+        backends = dict(_backend_health)
+    return {key: health.stats() for key, health in backends.items()}
 
-def send_discord(message: str):
-    """Discord webhook bildirimi"""
-    if not DISCORD_WEBHOOK:
+def parse_router_backends(spec: str) -> List[Tuple[str, str]]:
+    """ROUTER_BACKENDS'ten kimlik bilgisi olan backend'ler (sıra = eşitlikte öncelik)"""
+    aliases = {'hf': HF_MODELS, 'ollama': OLLAMA_MODELS, 'gemini': {}}
+    enabled = {'hf': bool(HF_TOKEN), 'ollama': USE_OLLAMA, 'gemini': bool(GEMINI_API_KEY)}
+    defaults = {'hf': HF_MODELS['text'], 'ollama': OLLAMA_MODELS['fast'], 'gemini': GEMINI_MODEL}
+    
+    backends = []
+    for entry in spec.split(','):
+        provider, _, model = entry.strip().partition(':')
+        if provider not in enabled:
+            if provider:
+                print(f"⚠️ Bilinmeyen router backend'i: {entry.strip()}")
+            continue
+        model = aliases[provider].get(model, model) or defaults[provider]
+        if enabled[provider] and (provider, model) not in backends:
+            backends.append((provider, model))
+    
+    # Hiçbir sağlayıcı yapılandırılmamışsa local Ollama denenir (eski davranış)
+    return backends or [('ollama', OLLAMA_MODELS['fast'])]
+
+# Başlangıçta bir kez ayrıştırılır (uyarılar her yönlendirmede tekrarlanmaz)
+_router_backends = parse_router_backends(ROUTER_BACKENDS)
+
+def configured_backends() -> List[Tuple[str, str]]:
+    """Yönlendirilebilir backend'ler - ROUTER_BACKENDS sırasıyla"""
+    return list(_router_backends)
+
+def route_backends(prompt: str) -> List[Tuple[str, str]]:
+    """
+    Backend'leri beklenen süreye göre sırala
+    Prompt'u sığdıramayan pencereler ve açık devreler sona kalır (hepsi elenirse yine denenir).
+    """
+    needed = estimate_tokens(prompt) + GENERATION_PARAMS['max_tokens']
+    ranked = []
+    for order, (provider, model) in enumerate(configured_backends()):
+        health = get_backend_health(provider, model)
+        fits = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) >= needed
+        ranked.append((not (fits and health.available()), health.score(), order, provider, model))
+    ranked.sort()
+    return [(provider, model) for _, _, _, provider, model in ranked]
+
+def backend_call(provider: str, model: str, prompt: str, last_resort: bool) -> Tuple[bool, str, str]:
+    """Tek backend çağrısı - sağlık kaydını günceller (cache hit'ler buraya gelmez)"""
+    note_prompt_prefix(prompt)
+    health = get_backend_health(provider, model)
+    health.begin()
+    start = time.monotonic()
+    success = False
+    try:
+        if provider == 'hf':
+            # Yedek varken cold-start 503'ünü beklemek yerine diğer backend'e geç
+            result = call_hf_with_retry(prompt, model, wait_on_loading=last_resort)
+        elif provider == 'gemini':
+            result = call_gemini(prompt, model)
+        else:
+            result = call_ollama(prompt, model)
+        success = result[0]
+        return result
+    finally:
+        # Kaybeden hedge'in iptali backend hatası sayılmaz
+        health.end(success, time.monotonic() - start, cancelled=not success and hedge_cancelled())
+
+def backend_stream(provider: str, model: str, prompt: str, last_resort: bool) -> Iterator[str]:
+    """Tek backend stream'i - sağlık kaydını stream bitince günceller"""
+    note_prompt_prefix(prompt)
+    health = get_backend_health(provider, model)
+    health.begin()
+    start = time.monotonic()
+    success = False
+    try:
+        if provider == 'hf':
+            yield from stream_hf(prompt, model, wait_on_loading=last_resort)
+        elif provider == 'gemini':
+            ok, output, error = call_gemini(prompt, model)
+            if not ok:
+                raise ModelStreamError(error)
+            yield output
+        else:
+            yield from stream_ollama(prompt, model)
+        success = True
+    finally:
+        health.end(success, time.monotonic() - start)
+
+# ==================== HEDGED REQUESTS ====================
+
+_hedge_pool = ThreadPoolExecutor(max_workers=max(2, HEDGE_WORKERS), thread_name_prefix='hedge')
+_hedge_counts = {'calls': 0, 'fired': 0, 'won': 0, 'cancelled': 0}
+_hedge_lock = threading.Lock()
+
+# Denemeler arasında toplanan sayaçlar (kaybedenin maliyeti de düğüme yazılır)
+HEDGE_SUMMED_METRICS = ('http_ms', 'http_calls', 'rate_wait_ms', 'retries')
+# Yalnızca kazanan denemeden alınanlar
+HEDGE_WINNER_METRICS = ('provider', 'model', 'cached', 'prompt_tokens', 'completion_tokens', 'load_ms', 'eval_ms',
+                        'prefix_hash', 'prefix_bytes_saved', 'cached_prompt_tokens')
+
+def hedge_stats() -> Dict[str, int]:
+    """Monitoring: hedge'li çağrılar, ateşlenen ve kazanan hedge sayıları"""
+    with _hedge_lock:
+        return dict(_hedge_counts)
+
+def _hedge_attempt(provider: str, model: str, prompt: str, use_cache: bool, last_resort: bool,
+                   cancelled: threading.Event) -> Tuple[Tuple[bool, str, str], Dict[str, Any]]:
+    """Havuz thread'inde tek deneme - kendi metrik kaydıyla"""
+    metrics = start_node_metrics()
+    _node_metrics.cancelled = cancelled
+    try:
+        if cancelled.is_set():
+            return (False, '', HEDGE_CANCELLED_ERROR), metrics
+        call = partial(backend_call, provider, model, prompt, last_resort)
+        return cached_call(provider, model, prompt, call, use_cache), metrics
+    finally:
+        _node_metrics.cancelled = None
+        stop_node_metrics()
+
+def _hedge_loser_done(future):
+    """Kazanan belli olduktan sonra biten deneme - yarıda bırakıldıysa say"""
+    if future.cancelled() or future.exception() is not None:
         return
+    (_, _, error), _ = future.result()
+    if error == HEDGE_CANCELLED_ERROR:
+        with _hedge_lock:
+            _hedge_counts['cancelled'] += 1
+
+def hedged_call(backends: List[Tuple[str, str]], prompt: str,
+                use_cache: bool) -> Tuple[bool, str, str, List[Tuple[str, str]]]:
+    """
+    İlk backend'i çağır; HEDGE_PERCENTILE gecikmesini aşarsa alternatif (veya aynı)
+    backend'e kopya gönder, ilk başarılı yanıtı al, kaybedeni iptal et.
+    Returns: (success, output, error, denenen backend'ler)
+    """
+    provider, model = backends[0]
+    observed = get_backend_health(provider, model).latency_percentile(HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+    delay = max(HEDGE_MIN_DELAY, observed) if observed is not None else None
+    
+    cancelled = threading.Event()
+    attempts = {_hedge_pool.submit(_hedge_attempt, provider, model, prompt, use_cache,
+                                   len(backends) == 1, cancelled): backends[0]}
+    with _hedge_lock:
+        _hedge_counts['calls'] += 1
+    
+    done, _ = wait(attempts, timeout=delay)
+    if not done:
+        target = backends[1] if HEDGE_TARGET == 'alternate' and len(backends) > 1 else backends[0]
+        print(f"[HEDGE] ⏱️ {provider}/{model} {delay:.1f}s'yi aştı, {target[0]}/{target[1]} ile yarışıyor...")
+        attempts[_hedge_pool.submit(_hedge_attempt, target[0], target[1], prompt, use_cache,
+                                    len(backends) <= 2, cancelled)] = target
+        record_metric(hedged=True)
+        with _hedge_lock:
+            _hedge_counts['fired'] += 1
+    
+    # İlk başarılı yanıt kazanır; hepsi başarısızsa son hata döner
+    winner = None
+    error = ''
+    pending = set(attempts)
+    results: Dict[Any, Tuple[Tuple[bool, str, str], Dict[str, Any]]] = {}
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[future] = future.result()
+            if results[future][0][0] and winner is None:
+                winner = future
+            error = error or results[future][0][2]
+    
+    # Çalışan kaybedenler slot beklerken veya sonraki parçada bağlantıyı kapatıp bırakır
+    cancelled.set()
+    for future in pending:
+        if not future.cancel():
+            future.add_done_callback(_hedge_loser_done)
+    
+    for future, (_, metrics) in results.items():
+        for key in HEDGE_SUMMED_METRICS:
+            add_metric(key, metrics.get(key) or 0)
+    tried = list(dict.fromkeys(attempts.values()))
+    
+    if winner is None:
+        return False, '', error, tried
+    
+    (_, output, _), metrics = results[winner]
+    record_metric(**{key: metrics[key] for key in HEDGE_WINNER_METRICS})
+    if len(attempts) > 1 and winner is not next(iter(attempts)):
+        record_metric(hedge_won=True)
+        print(f"[HEDGE] 🏁 Hedge kazandı: {attempts[winner][0]}/{attempts[winner][1]}")
+        with _hedge_lock:
+            _hedge_counts['won'] += 1
+    return True, output, '', tried
+
+# ==================== UNIFIED API CALL ====================
+
+def stream_model(prompt: str, use_cache: bool = True) -> Iterator[str]:
+    """
+    call_model'in streaming karşılığı - parçaları geldikçe yield eder
+    Backend sırası router'dan gelir; cache hit tek parça döner.
+    Token üretilmeden önceki hatalarda fallback yapılır, sonrasında ModelStreamError fırlar.
+    """
+    
+    backends = route_backends(prompt)
+    
+    last_error = ''
+    for index, (provider, model) in enumerate(backends):
+        key = cache_key(provider, model, prompt, GENERATION_PARAMS) if LLM_CACHE_ENABLED and use_cache else None
+        if key:
+            cached = cache_get(key)
+            if cached is not None:
+                print(f"[CACHE] ⚡ {provider}/{model} cache hit")
+                record_metric(provider=provider, model=model, cached=True)
+                yield cached
+                return
+        
+        print(f"[{provider.upper()}] {model} stream ediliyor...")
+        stream = backend_stream(provider, model, prompt, last_resort=index == len(backends) - 1)
+        chunks = []
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        except ModelStreamError as e:
+            if chunks:
+                raise
+            last_error = str(e)
+            record_metric(fallback=True)
+            print(f"[{provider.upper()}] Başarısız: {last_error}, fallback...")
+            continue
+        
+        if key:
+            cache_put(key, provider, model, ''.join(chunks).strip())
+        return
+    
+    raise ModelStreamError(last_error or 'Kullanılabilir model yok')
+
+def call_model(prompt: str, use_cache: bool = True,
+               on_token: Optional[Callable[[str], None]] = None,
+               hedge: bool = False) -> Tuple[bool, str, str]:
+    """
+    Model'i çağır - router'ın seçtiği en hızlı sağlıklı backend (HF, Ollama, Gemini)
+    Başarısız olursa sıradaki backend'e fallback
+    use_cache=False: LLM cache'i atla (blueprint bazlı opt-out)
+    on_token: verilirse yanıt stream edilir ve her parça bu callback'e iletilir
+    hedge: yavaş çağrıya kopya gönder (stream edilen çağrılarda uygulanmaz)
+    """
+    
+    if on_token is not None:
+        chunks = []
+        try:
+            for chunk in stream_model(prompt, use_cache=use_cache):
+                chunks.append(chunk)
+                on_token(chunk)
+        except ModelStreamError as e:
+            return False, '', str(e)
+        return True, ''.join(chunks).strip(), ''
+    
+    backends = route_backends(prompt)
+    error = 'Kullanılabilir model yok'
+    
+    if hedge:
+        success, output, error, tried = hedged_call(backends, prompt, use_cache)
+        if success:
+            return True, output, ''
+        backends = [backend for backend in backends if backend not in tried]
+        if backends:
+            record_metric(fallback=True)
+            print(f"[HEDGE] Başarısız: {error}, fallback...")
+    
+    for index, (provider, model) in enumerate(backends):
+        print(f"[{provider.upper()}] {model} çalışıyor...")
+        call = partial(backend_call, provider, model, prompt, index == len(backends) - 1)
+        success, output, error = cached_call(provider, model, prompt, call, use_cache)
+        if success:
+            return True, output, ''
+        if index < len(backends) - 1:
+            record_metric(fallback=True)
+            print(f"[{provider.upper()}] Başarısız: {error}, fallback...")
+    
+    return False, '', error
+
+# ==================== BATCH INFERENCE ====================
+
+# Batch öğelerinden çağıran düğüme toplanan sayaçlar
+BATCH_SUMMED_METRICS = ('http_ms', 'http_calls', 'rate_wait_ms', 'retries', 'prompt_tokens', 'completion_tokens',
+                        'load_ms', 'eval_ms', 'prefix_bytes_saved', 'cached_prompt_tokens')
+
+def _batch_item(prompt: str, use_cache: bool) -> Tuple[Tuple[bool, str, str], Dict[str, Any]]:
+    """Havuz thread'inde tek öğe - kendi metrik kaydıyla"""
+    metrics = start_node_metrics()
+    try:
+        try:
+            result = call_model(prompt, use_cache=use_cache)
+        except Exception as e:
+            result = (False, '', str(e))
+        return result, metrics
+    finally:
+        stop_node_metrics()
+
+def call_model_batch(prompts: List[str], use_cache: bool = True,
+                     max_workers: int = BATCH_WORKERS) -> List[Tuple[bool, str, str]]:
+    """
+    Birbirinden bağımsız prompt listesini toplu çalıştır - sonuçlar girdi sırasıyla döner
+    Aynı prompt'lar bir kez çağrılır; en fazla max_workers istek aynı anda uçar
+    (HF/Ollama semaforları ve rate limiter yine geçerlidir). Her öğe kendi router
+    seçimini, cache'ini ve fallback'ini kullanır.
+    """
+    unique = list(dict.fromkeys(prompts))
+    if not unique:
+        return []
+    
+    print(f"[BATCH] 📦 {len(prompts)} prompt ({len(unique)} benzersiz), {max(1, max_workers)} paralel")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique))),
+                            thread_name_prefix='batch') as pool:
+        outcomes = dict(zip(unique, pool.map(partial(_batch_item, use_cache=use_cache), unique)))
+    
+    # Öğe metriklerini çağıran düğüme topla
+    for _, metrics in outcomes.values():
+        for key in BATCH_SUMMED_METRICS:
+            add_metric(key, metrics.get(key) or 0)
+        if metrics.get('fallback'):
+            record_metric(fallback=True)
+    first = next((metrics for _, metrics in outcomes.values() if metrics.get('provider')), None)
+    current = getattr(_node_metrics, 'current', None)
+    if first and current is not None and current.get('provider') is None:
+        record_metric(provider=first['provider'], model=first['model'], prefix_hash=first.get('prefix_hash'))
     
+    failed = sum(1 for result, _ in outcomes.values() if not result[0])
+    if failed:
+        print(f"[BATCH] ⚠️ {failed}/{len(unique)} prompt başarısız")
+    return [outcomes[prompt][0] for prompt in prompts]
+
+def batch_items(node: Dict[str, Any], node_input: str) -> Optional[List[str]]:
+    """batch: true düğümünde Input bir JSON dizisiyse öğeleri döndür (değilse tek çağrı)"""
+    if not node.get('batch'):
+        return None
     try:
-        requests.post(DISCORD_WEBHOOK, json={
+        items = json.loads(node_input)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(items, list) or not items:
+        return None
+    return [item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) for item in items]
+
+# ==================== NOTIFICATIONS ====================
+
+NOTIFY_MESSAGE_CHARS = 4000  # Telegram 4096 / Discord embed 4096 sınırının altında
+
+def send_telegram(message: str) -> requests.Response:
+    """Telegram bildirimi gönder (tek deneme - tekrar denemeyi dispatcher yapar)"""
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    with PROVIDER_LIMITS['notify']:
+        return http_request('POST', url, timeout=10, json={
+            'chat_id': TELEGRAM_CHAT_ID,
+            'text': message,
+            'parse_mode': 'HTML'
+        })
+
+def send_discord(message: str) -> requests.Response:
+    """Discord webhook bildirimi (tek deneme)"""
+    with PROVIDER_LIMITS['notify']:
+        return http_request('POST', DISCORD_WEBHOOK, timeout=10, json={
             'embeds': [{
                 'title': '🤖 OmniFlow',
                 'description': message,
                 'color': 5814783
             }]
-        }, timeout=10)
-        print("✓ Discord mesajı gönderildi")
-    except Exception as e:
-        print(f"⚠️ Discord hatası: {e}")
+        })
+
+def notify_retry_after(response: requests.Response) -> Optional[float]:
+    """429 bekleme süresi: Retry-After başlığı veya Telegram'ın parameters.retry_after alanı"""
+    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    if retry_after is not None:
+        return retry_after
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    value = (body.get('parameters') or {}).get('retry_after', body.get('retry_after'))
+    return float(value) if isinstance(value, (int, float)) else None
+
+class NotificationChannel:
+    """Tek bildirim kanalı - kendi sınırlı kuyruğu, hız limiti ve worker thread'i"""
+    
+    def __init__(self, name: str, format_message: Callable[[str, str], str],
+                 send: Callable[[str], requests.Response], rate: float):
+        self.name = name
+        self.format_message = format_message
+        self.send = send
+        self.limiter = RateLimiter(rate, rate)
+        self.queue: 'queue.Queue[Optional[Tuple[str, str]]]' = queue.Queue(maxsize=max(1, NOTIFY_QUEUE_SIZE))
+        self.thread: Optional[threading.Thread] = None
+
+def configured_notify_channels() -> List[NotificationChannel]:
+    """Token'ı/webhook'u tanımlı kanallar"""
+    channels = []
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        channels.append(NotificationChannel('telegram', lambda title, message: f"<b>{title}</b>\n\n{message}",
+                                            send_telegram, TELEGRAM_RATE_LIMIT))
+    if DISCORD_WEBHOOK:
+        channels.append(NotificationChannel('discord', lambda title, message: f"**{title}**\n{message}",
+                                            send_discord, DISCORD_RATE_LIMIT))
+    return channels
+
+class NotificationDispatcher:
+    """
+    Bildirimleri arka planda kanallara dağıtır - notify() asla ağ beklemez
+    Her kanalın sınırlı kuyruğu (dolunca en eski mesaj düşer), hız limiti ve
+    429/5xx/ağ hatalarında backoff'lu tekrar denemesi vardır.
+    digest_interval > 0 ise bildirimler biriktirilir ve aralık başına tek özet mesajı gider.
+    """
+    
+    def __init__(self, digest_interval: float, max_retries: int):
+        self.digest_interval = digest_interval
+        self.max_retries = max(0, max_retries)
+        self.channels: Optional[List[NotificationChannel]] = None
+        self.digest: List[Tuple[str, str]] = []
+        self.counts = {'queued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'digested': 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._digest_thread: Optional[threading.Thread] = None
+    
+    def _ensure_started(self):
+        if self.channels is None:
+            self.channels = configured_notify_channels()
+            for channel in self.channels:
+                channel.thread = threading.Thread(target=self._run, args=(channel,),
+                                                  name=f'notify-{channel.name}', daemon=True)
+                channel.thread.start()
+        if self._digest_thread is None and self.digest_interval > 0 and self.channels:
+            self._stop.clear()
+            self._digest_thread = threading.Thread(target=self._run_digest, name='notify-digest', daemon=True)
+            self._digest_thread.start()
+    
+    def notify(self, title: str, message: str):
+        """Bildirimi kuyruğa al (digest modunda özete ekle)"""
+        with self._lock:
+            self._ensure_started()
+            if not self.channels:
+                return
+            if self.digest_interval > 0:
+                self.digest.append((title, message))
+                return
+        self._enqueue(title, message)
+    
+    def _enqueue(self, title: str, message: str):
+        for channel in self.channels or []:
+            while True:
+                try:
+                    channel.queue.put_nowait((title, message))
+                    break
+                except queue.Full:
+                    # Yeni mesaj eskisinden değerli: en eskisini düşür
+                    try:
+                        channel.queue.get_nowait()
+                        with self._lock:
+                            self.counts['dropped'] += 1
+                    except queue.Empty:
+                        pass
+            with self._lock:
+                self.counts['queued'] += 1
+    
+    def flush_digest(self):
+        """Biriken bildirimleri tek özet mesajı olarak kuyruğa al"""
+        with self._lock:
+            pending, self.digest = self.digest, []
+            self.counts['digested'] += len(pending)
+        if not pending:
+            return
+        if len(pending) == 1:
+            self._enqueue(*pending[0])
+            return
+        
+        lines = []
+        used = 0
+        for index, (title, message) in enumerate(pending):
+            line = f"{title} - {' '.join(message.split())}"
+            if used + len(line) > NOTIFY_MESSAGE_CHARS - 100:
+                lines.append(f"… ve {len(pending) - index} bildirim daha")
+                break
+            lines.append(line)
+            used += len(line) + 1
+        self._enqueue(f"📬 OmniFlow Özeti ({len(pending)} bildirim)", '\n'.join(lines))
+    
+    def _run_digest(self):
+        while not self._stop.wait(self.digest_interval):
+            self.flush_digest()
+    
+    def _run(self, channel: NotificationChannel):
+        while True:
+            item = channel.queue.get()
+            if item is None:
+                return
+            delivered = self._deliver(channel, *item)
+            with self._lock:
+                self.counts['sent' if delivered else 'failed'] += 1
+    
+    def _deliver(self, channel: NotificationChannel, title: str, message: str) -> bool:
+        """Mesajı gönder - 429/5xx/ağ hatasında backoff'la tekrar dene, diğer 4xx'te bırak"""
+        text = channel.format_message(title, message)[:NOTIFY_MESSAGE_CHARS]
+        error = ''
+        for attempt in range(self.max_retries + 1):
+            channel.limiter.acquire()
+            try:
+                response = channel.send(text)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.ok:
+                    channel.limiter.on_success()
+                    print(f"✓ {channel.name.capitalize()} mesajı gönderildi")
+                    return True
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code == 429:
+                    # Limiter Retry-After kadar kanalı durdurur, ek bekleme gerekmez
+                    channel.limiter.on_throttle(notify_retry_after(response))
+                    continue
+                if response.status_code < 500:
+                    break
+            if attempt < self.max_retries:
+                time.sleep(min(30, 2 ** attempt))
+        
+        print(f"⚠️ {channel.name.capitalize()} hatası: {error}")
+        return False
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = sum(channel.queue.qsize() for channel in self.channels or [])
+            return dict(self.counts, pending=pending + len(self.digest))
+    
+    def close(self, timeout: float = NOTIFY_CLOSE_TIMEOUT):
+        """Özeti gönder, kuyrukları boşalt (en fazla timeout sn) ve worker'ları durdur"""
+        self._stop.set()
+        if self._digest_thread is not None:
+            self._digest_thread.join()
+            self._digest_thread = None
+        self.flush_digest()
+        
+        channels, self.channels = self.channels or [], None
+        for channel in channels:
+            channel.queue.put(None)
+        deadline = time.monotonic() + timeout
+        for channel in channels:
+            channel.thread.join(max(0.0, deadline - time.monotonic()))
+            if channel.thread.is_alive():
+                print(f"⚠️ {channel.name.capitalize()}: {channel.queue.qsize()} bildirim gönderilemeden kapanıldı")
+
+notifications = NotificationDispatcher(NOTIFY_DIGEST_INTERVAL, NOTIFY_MAX_RETRIES)
 
 def notify(title: str, message: str):
-    """Tüm kanallara bildirim gönder"""
-    full_message = f"<b>{title}</b>\n\n{message}"
-    send_telegram(full_message)
-    send_discord(f"**{title}**\n{message}")
+    """Tüm kanallara bildirim gönder (kuyruğa alır, beklemez)"""
+    notifications.notify(title, message)
+
+# ==================== DAG SCHEDULER ====================
+
+def resolve_dependencies(nodes: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Her düğümün ebeveyn indekslerini döndür
+    Öncelik: node['depends_on'] > connections[].targetId > doğrusal zincir
+    """
+    index_by_id = {str(node.get('id', i)): i for i, node in enumerate(nodes)}
+    uses_connections = any(node.get('connections') for node in nodes)
+    parents: List[List[int]] = [[] for _ in nodes]
+    
+    for i, node in enumerate(nodes):
+        if 'depends_on' in node:
+            for dep in node.get('depends_on') or []:
+                if str(dep) not in index_by_id:
+                    raise ValueError(f"Bilinmeyen bağımlılık '{dep}' ({node.get('title', i)})")
+                parents[i].append(index_by_id[str(dep)])
+        elif not uses_connections and i > 0:
+            # Varsayılan: bir önceki düğüme bağlı (eski davranış)
+            parents[i].append(i - 1)
+    
+    if uses_connections:
+        for i, node in enumerate(nodes):
+            for conn in node.get('connections') or []:
+                target = index_by_id.get(str(conn.get('targetId')))
+                if target is None or 'depends_on' in nodes[target]:
+                    continue
+                if i not in parents[target]:
+                    parents[target].append(i)
+    
+    # Döngü kontrolü (Kahn)
+    indegree = [len(set(p)) for p in parents]
+    children: List[List[int]] = [[] for _ in nodes]
+    for i, p in enumerate(parents):
+        for parent in set(p):
+            children[parent].append(i)
+    queue = [i for i, d in enumerate(indegree) if d == 0]
+    visited = 0
+    while queue:
+        current = queue.pop()
+        visited += 1
+        for child in children[current]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    if visited != len(nodes):
+        raise ValueError('Döngüsel bağımlılık tespit edildi')
+    
+    return parents
+
+def collect_ancestors(parents: List[List[int]]) -> List[List[int]]:
+    """Her düğümün tüm atalarını (sıralı) döndür"""
+    cache: Dict[int, set] = {}
+    
+    def visit(i: int) -> set:
+        if i not in cache:
+            found = set()
+            for parent in parents[i]:
+                found.add(parent)
+                found |= visit(parent)
+            cache[i] = found
+        return cache[i]
+    
+    return [sorted(visit(i)) for i in range(len(parents))]
+
+def build_node_prompt(node: Dict[str, Any], context: str, node_input: str) -> str:
+    """Düğüm prompt'unu oluştur"""
+    return f"""You are a {node.get('role', 'Assistant')}.
+
+Task: {node.get('task', 'Complete the task')}
+
+Context: {context}
+
+Input: {node_input}
+
+Provide actionable output only."""
+
+def execute_node(position: str, node_title: str, prompt, use_cache: bool = True,
+                 checkpoint: Optional[Tuple[str, int, str]] = None,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 submitted_at: Optional[float] = None,
+                 hedge: bool = False) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """
+    Tek bir düğümü çalıştır - (result, output, metrics) döndür
+    prompt: str veya batch düğümlerinde öğe başına prompt listesi (çıktı JSON dizisi olur)
+    checkpoint: (blueprint_id, version, node_key) - aynı girdiyle kayıtlı çıktı varsa model çağrılmaz
+    on_token: model çıktısı parça parça bu callback'e stream edilir
+    submitted_at: havuza gönderilme anı (time.monotonic) - kuyruk beklemesi için
+    hedge: yavaş model çağrılarında hedged istek kullan
+    """
+    started = time.monotonic()
+    metrics = start_node_metrics()
+    metrics['queue_wait_ms'] = int((started - submitted_at) * 1000) if submitted_at else 0
+    prompt_text = prompt if isinstance(prompt, str) else ''.join(prompt)
+    metrics['prompt_chars'] = len(prompt_text)
+    
+    try:
+        result, output = _execute_node(position, node_title, prompt, use_cache, checkpoint, on_token, hedge)
+    finally:
+        stop_node_metrics()
+    
+    metrics['duration_ms'] = int((time.monotonic() - started) * 1000)
+    metrics['completion_chars'] = len(output)
+    if result['status'] == 'success':
+        if metrics['prompt_tokens'] is None:
+            metrics['prompt_tokens'] = estimate_tokens(prompt_text)
+        if metrics['completion_tokens'] is None:
+            metrics['completion_tokens'] = estimate_tokens(output)
+    return result, output, metrics
+
+def _execute_node(position: str, node_title: str, prompt, use_cache: bool,
+                  checkpoint: Optional[Tuple[str, int, str]],
+                  on_token: Optional[Callable[[str], None]], hedge: bool) -> Tuple[Dict[str, Any], str]:
+    """execute_node gövdesi - metrik kaydı açıkken çalışır"""
+    print(f"\n[{position}] 🔄 {node_title}...")
+    
+    hashed = prompt if isinstance(prompt, str) else json.dumps(prompt, ensure_ascii=False)
+    input_hash = hashlib.sha256(hashed.encode('utf-8')).hexdigest()
+    if checkpoint:
+        saved = load_checkpoint(*checkpoint, input_hash)
+        if saved is not None:
+            print(f"[{position}] ♻️ Checkpoint'ten yüklendi")
+            record_metric(resumed=True)
+            if on_token is not None:
+                on_token(saved)
+            return {'node': node_title, 'status': 'success', 'output': saved[:300], 'resumed': True}, saved
+    
+    try:
+        if isinstance(prompt, list):
+            success, output, error = _execute_batch(prompt, use_cache)
+            if success and on_token is not None:
+                on_token(output)
+        else:
+            success, output, error = call_model(prompt, use_cache=use_cache, on_token=on_token, hedge=hedge)
+    except Exception as e:
+        success, output, error = False, '', str(e)
+    
+    if not success:
+        print(f"[{position}] ❌ HATA: {error}")
+        return {'node': node_title, 'status': 'error', 'error': error}, ''
+    
+    if checkpoint:
+        save_checkpoint(*checkpoint, input_hash, output)
+    
+    print(f"[{position}] ✅ Tamamlandı")
+    return {'node': node_title, 'status': 'success', 'output': output[:300]}, output
+
+def _execute_batch(prompts: List[str], use_cache: bool) -> Tuple[bool, str, str]:
+    """Batch düğümü: tüm öğeler başarılıysa çıktılar sırayla JSON dizisi olarak döner"""
+    results = call_model_batch(prompts, use_cache=use_cache)
+    errors = [error for success, _, error in results if not success]
+    if errors:
+        return False, '', f"{len(errors)}/{len(results)} öğe başarısız: {errors[0]}"
+    return True, json.dumps([output for _, output, _ in results], ensure_ascii=False), ''
+
+# ==================== PROMPT TEMPLATES ====================
+
+TEMPLATE_CACHE_MAX = 256  # Bellekte tutulan derlenmiş blueprint sürümü
+
+class NodePrompt(str):
+    """Statik prefix'ini (rol/görev/base_knowledge) taşıyan prompt - sağlayıcı katmanı prefix cache için okur"""
+    prefix = ''
+    prefix_hash: Optional[str] = None
+
+class PromptTemplate:
+    """
+    Düğüm prompt şablonu - blueprint sürümü başına bir kez derlenir
+    Statik kısım (rol, görev, base_knowledge) prompt'un başında durur ve hash'lenir;
+    aynı prefix'le gelen çağrılarda sağlayıcıların prefix/KV cache'i devreye girebilir.
+    """
+    
+    def __init__(self, node: Dict[str, Any], base_knowledge: str):
+        self.head = f"You are a {node.get('role', 'Assistant')}.\n\nTask: {node.get('task', 'Complete the task')}\n\nContext: "
+        self.base_knowledge = base_knowledge
+        self.prefix = self.head + base_knowledge
+        self.prefix_hash = hashlib.sha256(self.prefix.encode('utf-8')).hexdigest()[:16]
+        self.overhead_tokens = estimate_tokens(self.render_plain('', ''))
+    
+    def render_plain(self, context: str, node_input: str) -> str:
+        """build_node_prompt ile aynı metin (prefix garantisi olmadan)"""
+        return f"{self.head}{context}\n\nInput: {node_input}\n\nProvide actionable output only."
+    
+    def render(self, context_tail: str, node_input: str) -> NodePrompt:
+        """Tam base_knowledge + ata çıktıları + Input - statik prefix işaretli"""
+        prompt = NodePrompt(self.render_plain(self.base_knowledge + context_tail, node_input))
+        prompt.prefix = self.prefix
+        prompt.prefix_hash = self.prefix_hash
+        return prompt
+
+_template_cache: 'OrderedDict[Tuple[str, int, str], Dict[str, PromptTemplate]]' = OrderedDict()
+_template_cache_lock = threading.Lock()
+
+def compile_templates(blueprint: Dict[str, Any], node_keys: List[str]) -> Dict[str, PromptTemplate]:
+    """Blueprint sürümünün düğüm şablonları - (id, version, updated_at) başına bir kez derlenir"""
+    nodes = blueprint.get('nodes', [])
+    base_knowledge = blueprint.get('base_knowledge', '') or ''
+    key = (str(blueprint.get('id')), int(blueprint.get('version') or 1), str(blueprint.get('updated_at')))
+    
+    with _template_cache_lock:
+        templates = _template_cache.get(key) if blueprint.get('id') else None
+        if templates is not None:
+            _template_cache.move_to_end(key)
+            return templates
+    
+    templates = {node_key: PromptTemplate(node, base_knowledge) for node_key, node in zip(node_keys, nodes)}
+    if blueprint.get('id'):
+        with _template_cache_lock:
+            _template_cache[key] = templates
+            while len(_template_cache) > TEMPLATE_CACHE_MAX:
+                _template_cache.popitem(last=False)
+    return templates
+
+def note_prompt_prefix(prompt: str):
+    """
+    Prompt'un statik prefix hash'ini düğüm metriğine işle
+    prefix_bytes_saved burada değil, prefix gerçekten gönderilmediğinde
+    (Ollama context yeniden kullanımı, ollama_prompt_fields) sayılır.
+    """
+    prefix_hash = getattr(prompt, 'prefix_hash', None)
+    if prefix_hash:
+        record_metric(prefix_hash=prefix_hash)
+
+# ==================== CONTEXT WINDOW ====================
+
+CONTEXT_ENTRY_CHARS = 200  # Ata çıktısı başına varsayılan kesit
+CONTEXT_SUMMARY_CHARS = 80  # Bütçe darsa kısaltılmış kesit
+
+def prompt_token_budget() -> int:
+    """Kullanılacak modellerin en dar penceresine göre prompt token bütçesi"""
+    if CONTEXT_TOKEN_BUDGET > 0:
+        return CONTEXT_TOKEN_BUDGET
+    
+    window = min(MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) for _, model in configured_backends())
+    # Üretim payı + token tahmini için %10 güvenlik marjı
+    return int((window - GENERATION_PARAMS['max_tokens']) * 0.9)
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Metni yaklaşık token sayısına kırp"""
+    max_chars = max(0, tokens) * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 1)] + '…'
+
+def build_bounded_prompt(node: Dict[str, Any], base_knowledge: str, entries: List[Tuple[str, str]],
+                         node_input: str, budget: int,
+                         template: Optional[PromptTemplate] = None) -> Tuple[str, int]:
+    """
+    Token bütçesine sığan düğüm prompt'u oluştur - (prompt, kısaltılan/atılan girdi sayısı)
+    Öncelik: Input > base_knowledge > ata çıktıları (yeniden eskiye).
+    Sığmayan ata çıktıları önce kısaltılır, sonra en eskiden başlayarak atılır.
+    template: derlenmiş şablon - base_knowledge kırpılmadıysa prompt statik prefix'iyle işaretlenir
+    """
+    if template is not None:
+        remaining = budget - template.overhead_tokens
+    else:
+        remaining = budget - estimate_tokens(build_node_prompt(node, '', ''))
+    full_base_knowledge = base_knowledge
+    
+    # Input ve base_knowledge tek başına taşıyorsa ikisini de kırp
+    input_tokens = estimate_tokens(node_input)
+    base_tokens = estimate_tokens(base_knowledge)
+    if input_tokens + base_tokens > remaining:
+        input_share = max(int(remaining * 0.6), remaining - base_tokens)
+        node_input = truncate_to_tokens(node_input, input_share)
+        base_knowledge = truncate_to_tokens(base_knowledge, remaining - estimate_tokens(node_input))
+    remaining -= estimate_tokens(node_input) + estimate_tokens(base_knowledge)
+    
+    kept: List[str] = []
+    trimmed = 0
+    for title, output in reversed(entries):
+        for limit in (CONTEXT_ENTRY_CHARS, CONTEXT_SUMMARY_CHARS):
+            line = f"\n\n{title} Çıktısı: {output[:limit]}"
+            cost = estimate_tokens(line)
+            if cost <= remaining:
+                kept.append(line)
+                remaining -= cost
+                if limit != CONTEXT_ENTRY_CHARS and len(output) > limit:
+                    trimmed += 1
+                break
+        else:
+            trimmed += 1
+    
+    context_tail = ''.join(reversed(kept))
+    if template is not None and base_knowledge == full_base_knowledge:
+        return template.render(context_tail, node_input), trimmed
+    return build_node_prompt(node, base_knowledge + context_tail, node_input), trimmed
+
+# ==================== ASYNC ENGINE ====================
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Event loop'lar için paylaşılan bloklayan I/O havuzu (ASYNC_MAX_IN_FLIGHT thread)
+    Sağlayıcı istemcileri (retry, rate limiter, SSE/NDJSON stream) requests tabanlı
+    olduğundan coroutine'ler onları bu havuza devreder; gerçek HTTP eşzamanlılığını
+    PROVIDER_LIMITS semaforları belirler.
+    """
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(max_workers=max(1, ASYNC_MAX_IN_FLIGHT), thread_name_prefix='aio')
+        return _io_executor
+
+async def offload(func: Callable, *args, **kwargs):
+    """Bloklayan çağrıyı event loop'u tutmadan paylaşılan havuzda çalıştır"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), partial(func, *args, **kwargs))
 
 # ==================== BLUEPRINT EXECUTOR ====================
 
-def run_blueprint(blueprint: Dict[str, Any]) -> Tuple[bool, str]:
-    """Tek bir blueprint'i çalıştır"""
+def summarize_metrics(node_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Düğüm metriklerini çalıştırma özetine indir"""
+    summary: Dict[str, Any] = {
+        'prompt_tokens': 0, 'completion_tokens': 0, 'http_ms': 0, 'queue_wait_ms': 0,
+        'retries': 0, 'fallbacks': 0, 'cache_hits': 0, 'hedges': 0, 'hedge_wins': 0,
+        'load_ms': 0, 'eval_ms': 0, 'prompt_chars': 0, 'prefix_bytes_saved': 0, 'cached_prompt_tokens': 0,
+        'providers': {},
+    }
+    for metrics in node_metrics:
+        summary['prompt_tokens'] += metrics.get('prompt_tokens') or 0
+        summary['completion_tokens'] += metrics.get('completion_tokens') or 0
+        summary['http_ms'] += metrics.get('http_ms') or 0
+        summary['queue_wait_ms'] += metrics.get('queue_wait_ms') or 0
+        summary['retries'] += metrics.get('retries') or 0
+        summary['fallbacks'] += int(bool(metrics.get('fallback')))
+        summary['cache_hits'] += int(bool(metrics.get('cached')))
+        summary['hedges'] += int(bool(metrics.get('hedged')))
+        summary['hedge_wins'] += int(bool(metrics.get('hedge_won')))
+        summary['load_ms'] += metrics.get('load_ms') or 0
+        summary['eval_ms'] += metrics.get('eval_ms') or 0
+        summary['prompt_chars'] += metrics.get('prompt_chars') or 0
+        summary['prefix_bytes_saved'] += metrics.get('prefix_bytes_saved') or 0
+        summary['cached_prompt_tokens'] += metrics.get('cached_prompt_tokens') or 0
+        provider = metrics.get('provider')
+        if provider:
+            summary['providers'][provider] = summary['providers'].get(provider, 0) + 1
+    return summary
+
+def run_blueprint(blueprint: Dict[str, Any],
+                  on_token: Optional[Callable[[str, str], None]] = None,
+                  run_id: Optional[str] = None) -> Tuple[bool, str]:
+    """Senkron çağıranlar için run_blueprint_async shim'i (çalışan bir event loop içinden çağırmayın)"""
+    return asyncio.run(run_blueprint_async(blueprint, on_token=on_token, run_id=run_id))
+
+async def run_blueprint_async(blueprint: Dict[str, Any],
+                              on_token: Optional[Callable[[str, str], None]] = None,
+                              run_id: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    Tek bir blueprint'i çalıştır
+    Bağımlılıkları hazır olan düğümler coroutine olarak başlar, blueprint başına en fazla
+    NODE_WORKERS'ı aynı anda çalışır; her düğüm yalnızca kendi atalarının çıktılarını görür.
+    on_token(node_title, chunk): interaktif çalıştırmalar için token stream hook'u
+    run_id: düğüm loglarını runner_executions satırına bağlar
+    """
+    
+    run_id = run_id or uuid.uuid4().hex
     
     name = blueprint.get('name', 'Unknown')
     nodes = blueprint.get('nodes', [])
     base_knowledge = blueprint.get('base_knowledge', '')
+    use_cache = blueprint.get('use_cache') is not False
+    hedge = HEDGE_REQUESTS if blueprint.get('hedge_requests') is None else bool(blueprint.get('hedge_requests'))
+    bp_id = blueprint.get('id')
+    version = int(blueprint.get('version') or 1)
+    resumable = RESUME_FROM_CHECKPOINT and bool(bp_id)
     
     print(f"\n{'='*60}")
     print(f"🚀 Çalıştırılıyor: {name}")
     print(f"📦 Düğüm sayısı: {len(nodes)}")
     print(f"{'='*60}")
     
-    results = []
-    context = base_knowledge
+    try:
+        parents = resolve_dependencies(nodes)
+    except ValueError as e:
+        print(f"❌ Geçersiz düğüm grafiği: {e}")
+        return False, json.dumps([{'node': name, 'status': 'error', 'error': str(e)}], ensure_ascii=False)
+    
+    ancestors = collect_ancestors(parents)
+    titles = [node.get('title', f'Node {i+1}') for i, node in enumerate(nodes)]
+    node_keys = [str(node.get('id', i)) for i, node in enumerate(nodes)]
+    index_by_key = {key: i for i, key in enumerate(node_keys)}
+    budget = prompt_token_budget()
+    templates = compile_templates(blueprint, node_keys)
+    
+    if resumable:
+        # Eski sürümlerin checkpoint'leri artık geçersiz
+        await offload(clear_checkpoints, str(bp_id), keep_version=version)
+    
+    results: Dict[int, Dict[str, Any]] = {}
+    outputs: Dict[int, str] = {}
+    waiting_on = {i: set(p) for i, p in enumerate(parents)}
+    pending = set(range(len(nodes)))
+    running = {}
+    node_metrics: List[Dict[str, Any]] = []
+    failed = False
     start_time = time.time()
+    node_slots = asyncio.Semaphore(max(1, NODE_WORKERS))
     
-    for i, node in enumerate(nodes):
-        node_title = node.get('title', f'Node {i+1}')
-        node_type = node.get('type', 'agent')
-        node_role = node.get('role', 'Assistant')
-        node_task = node.get('task', 'Complete the task')
+    async def run_node(*args, **kwargs):
+        async with node_slots:
+            return await offload(execute_node, *args, **kwargs)
+    
+    while pending or running:
+        # Hata sonrası yeni düğüm başlatma, çalışanları bekle
+        if not failed:
+            for i in sorted(pending):
+                if waiting_on[i]:
+                    continue
+                pending.discard(i)
+                
+                # Ebeveynler zaten Input'ta; context'e yalnızca diğer atalar (veya context_from)
+                context_sources = [a for a in ancestors[i] if a not in parents[i]]
+                if 'context_from' in nodes[i]:
+                    wanted = {index_by_key.get(str(key)) for key in nodes[i].get('context_from') or []}
+                    context_sources = [a for a in ancestors[i] if a in wanted]
+                entries = [(titles[a], outputs[a]) for a in context_sources]
+                
+                if len(parents[i]) == 1:
+                    node_input = outputs[parents[i][0]]
+                elif parents[i]:
+                    node_input = "\n\n".join(f"{titles[p]}: {outputs[p]}" for p in parents[i])
+                else:
+                    node_input = 'Start'
+                
+                items = batch_items(nodes[i], node_input)
+                if items is not None:
+                    # Öğe başına bağımsız prompt - call_model_batch ile paralel
+                    built = [build_bounded_prompt(nodes[i], base_knowledge, entries, item, budget, templates[node_keys[i]])
+                             for item in items]
+                    prompt, trimmed = [item_prompt for item_prompt, _ in built], max(t for _, t in built)
+                else:
+                    prompt, trimmed = build_bounded_prompt(nodes[i], base_knowledge, entries, node_input, budget,
+                                                           templates[node_keys[i]])
+                if trimmed:
+                    print(f"[{i+1}/{len(nodes)}] ✂️ Context bütçesi ({budget} token): {trimmed} girdi kısaltıldı/atıldı")
+                checkpoint = (str(bp_id), version, node_keys[i]) if resumable else None
+                task = asyncio.ensure_future(run_node(
+                    f"{i+1}/{len(nodes)}", titles[i], prompt, use_cache, checkpoint,
+                    partial(on_token, titles[i]) if on_token else None, time.monotonic(), hedge=hedge
+                ))
+                running[task] = i
         
-        print(f"\n[{i+1}/{len(nodes)}] 🔄 {node_title}...")
+        if not running:
+            break
         
-        try:
-            # Prompt'u oluştur
-            prompt = f"""You are a {node_role}.
-
-Task: {node_task}
-
-Context: {context}
-
-Input: {results[-1]['output'] if results else 'Start'}
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            i = running.pop(task)
+            result, output, metrics = task.result()
+            results[i] = result
+            node_metrics.append(metrics)
+            # Tampon dolunca SQLite'a flush eder - event loop'u bloklamasın
+            await offload(log_node_execution, run_id, bp_id, node_keys[i], titles[i], result['status'],
+                          result.get('error'), metrics)
+            if result['status'] != 'success':
+                failed = True
+                continue
+            outputs[i] = output
+            for j in pending:
+                waiting_on[j].discard(i)
 
-Provide actionable output only."""
-            
-            # Model'i çağır
-            success, output, error = call_model(prompt)
-            
-            if not success:
-                results.append({
-                    'node': node_title,
-                    'status': 'error',
-                    'error': error
-                })
-                print(f"[{i+1}] ❌ HATA: {error}")
-                return False, json.dumps(results, ensure_ascii=False)
-            
-            # Başarılı
-            results.append({
-                'node': node_title,
-                'status': 'success',
-                'output': output[:300]
-            })
-            context += f"\n\n{node_title} Çıktısı: {output[:200]}"
-            print(f"[{i+1}] ✅ Tamamlandı")
-            
-            time.sleep(1)  # Rate limiting
-        
-        except Exception as e:
-            results.append({
-                'node': node_title,
-                'status': 'error',
-                'error': str(e)
-            })
-            print(f"[{i+1}] ❌ Hata: {e}")
-            return False, json.dumps(results, ensure_ascii=False)
+    ordered_results = [results[i] for i in sorted(results)]
+    summary = summarize_metrics(node_metrics)
+    print(f"📊 {name}: {summary['prompt_tokens']}+{summary['completion_tokens']} token | "
+          f"HTTP {summary['http_ms']}ms | retry {summary['retries']} | cache {summary['cache_hits']} | "
+          f"prefix tasarrufu {summary['prefix_bytes_saved']}B / prompt {summary['prompt_chars']} kr")
+    if failed:
+        return False, json.dumps(ordered_results, ensure_ascii=False)
+    
+    # Tam başarı: sonraki zamanlanmış çalışma sıfırdan başlasın
+    if resumable:
+        await offload(clear_checkpoints, str(bp_id))
     
     total_time = int((time.time() - start_time) * 1000)
     return True, json.dumps({
         'status': 'success',
         'total_time_ms': total_time,
         'nodes_executed': len(nodes),
-        'results': results
+        'metrics': summary,
+        'results': ordered_results
     }, ensure_ascii=False)
 
-# ==================== MAIN ====================
+# ==================== CRON SCHEDULER ====================
 
-def main():
-    """Ana çalıştırıcı"""
+class CronSchedule:
+    """5 alanlı cron ifadesi: dakika saat ayın-günü ay haftanın-günü (UTC)"""
+    
+    ALIASES = {
+        '@hourly': '0 * * * *',
+        '@daily': '0 0 * * *',
+        '@midnight': '0 0 * * *',
+        '@weekly': '0 0 * * 0',
+        '@monthly': '0 0 1 * *',
+        '@yearly': '0 0 1 1 *',
+        '@annually': '0 0 1 1 *',
+    }
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+    
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = self.ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron ifadesi 5 alan olmalı: '{expression}'")
+        
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}  # 7 = Pazar
+        # Klasik cron: gün ve haftanın günü birlikte kısıtlıysa VEYA ile eşleşir
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+    
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Geçersiz adım: '{field}'")
+            
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_text, end_text = part.split('-', 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            
+            if start < low or end > high or start > end:
+                raise ValueError(f"Aralık dışı değer: '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+    
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays  # cron: 0 = Pazar
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """moment'tan sonraki ilk tetiklenme zamanı"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                candidate = candidate.replace(year=year, month=candidate.month % 12 + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        
+        raise ValueError(f"Cron ifadesi hiç tetiklenmiyor: '{self.expression}'")
+
+def blueprint_schedule(bp: Dict[str, Any], now: datetime) -> CronSchedule:
+    """Blueprint'in cron'u - boş/geçersizse veya hiç tetiklenmiyorsa (ör. '0 0 31 2 *') DEFAULT_SCHEDULE_CRON"""
+    expression = (bp.get('schedule_cron') or '').strip()
+    if expression:
+        try:
+            schedule = CronSchedule(expression)
+            schedule.next_after(now)
+            return schedule
+        except ValueError as e:
+            print(f"⚠️ {bp.get('name', 'İsimsiz')}: {e}, varsayılan cron kullanılıyor")
+    return CronSchedule(DEFAULT_SCHEDULE_CRON)
+
+def run_daemon():
+    """
+    Resident mod: süreç açık kalır, blueprint'ler kendi schedule_cron'una göre çalışır
+    Bir sonraki tetiklenme zamanları heap'te tutulur; zamanı gelen blueprint
+    BLUEPRINT_WORKERS havuzuna gönderilir. Önceki çalışması bitmemişse o tur atlanır.
+    """
     
     print("=" * 70)
-    print("🤖 OmniFlow Automation Runner - HuggingFace Native (0 Maliyet)")
+    print("🤖 OmniFlow Automation Runner - Daemon Modu")
     print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 70)
     
-    # Yapılandırma kontrol
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("❌ SUPABASE_URL ve SUPABASE_KEY gerekli!")
         return
     
-    # Database oluştur
     init_database()
+    start_ollama_warmup()
     
-    # Aktif blueprint'leri getir
-    print("\n📋 Aktif blueprint'ler Supabase'den çekiliyor...")
-    blueprints = get_active_blueprints()
+    stop = threading.Event()
     
-    print(f"✓ {len(blueprints)} aktif blueprint bulundu")
+    def request_stop(signum, frame):
+        print(f"\n🛑 Sinyal alındı ({signum}), kapanıyor...")
+        stop.set()
     
-    if not blueprints:
-        print("ℹ️ Çalıştırılacak blueprint yok.")
-        return
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
     
-    # Her blueprint'i çalıştır
-    success_count = 0
-    error_count = 0
+    blueprints: Dict[str, Dict[str, Any]] = {}
+    schedules: Dict[str, CronSchedule] = {}
+    next_fire: Dict[str, datetime] = {}
+    heap: List[Tuple[datetime, str]] = []
+    running: Dict[str, Any] = {}
+    last_refresh = None
+    dispatched = 0
     
-    for bp in blueprints:
-        if not isinstance(bp, dict):
-            print(f"⚠️ Geçersiz blueprint formatı, atlaniyor...")
-            continue
-        
-        bp_id = bp.get('id')
-        bp_name = bp.get('name', 'İsimsiz')
-        
-        if not bp_id:
-            print(f"⚠️ Blueprint ID bulunamadı, atlaniyor...")
-            continue
-        
-        print(f"\n🔍 Blueprint: {bp_name}")
-        
-        # Çalıştır
-        success, result = run_blueprint(bp)
+    with ThreadPoolExecutor(max_workers=max(1, BLUEPRINT_WORKERS)) as pool:
+        while not stop.is_set():
+            now = datetime.utcnow()
+            
+            # Blueprint listesini periyodik olarak yenile
+            if last_refresh is None or time.monotonic() - last_refresh >= DAEMON_REFRESH_INTERVAL:
+                last_refresh = time.monotonic()
+                fresh = {str(bp['id']): bp for bp in runnable_blueprints(get_active_blueprints())}
+                
+                for bp_id, bp in fresh.items():
+                    if bp_id not in schedules or blueprints[bp_id].get('schedule_cron') != bp.get('schedule_cron'):
+                        schedules[bp_id] = blueprint_schedule(bp, now)
+                        next_fire[bp_id] = schedules[bp_id].next_after(now)
+                        heapq.heappush(heap, (next_fire[bp_id], bp_id))
+                        print(f"🗓️ {bp.get('name', 'İsimsiz')}: '{schedules[bp_id].expression}' "
+                              f"→ {next_fire[bp_id].strftime('%Y-%m-%d %H:%M')} UTC")
+                
+                for bp_id in set(blueprints) - set(fresh):
+                    schedules.pop(bp_id, None)
+                    next_fire.pop(bp_id, None)
+                blueprints = fresh
+            
+            # Zamanı gelenleri gönder (eski heap kayıtları next_fire ile ayıklanır)
+            while heap and heap[0][0] <= now:
+                fire_at, bp_id = heapq.heappop(heap)
+                if next_fire.get(bp_id) != fire_at:
+                    continue
+                
+                bp = blueprints[bp_id]
+                next_fire[bp_id] = schedules[bp_id].next_after(now)
+                heapq.heappush(heap, (next_fire[bp_id], bp_id))
+                
+                if bp_id in running and not running[bp_id].done():
+                    print(f"⏭️ {bp.get('name', 'İsimsiz')} hâlâ çalışıyor, bu tur atlandı")
+                    continue
+                
+                running[bp_id] = pool.submit(process_blueprint, bp)
+                dispatched += 1
+            
+            # Ollama keep_alive bir sonraki çalışmaya kadar modeli bellekte tutsun
+            set_next_scheduled_run(min(next_fire.values()) if next_fire else None)
+            
+            # Sonraki tetiklenmeye veya yenilemeye kadar uyu
+            sleep_for = DAEMON_REFRESH_INTERVAL - (time.monotonic() - last_refresh)
+            if heap:
+                sleep_for = min(sleep_for, (heap[0][0] - datetime.utcnow()).total_seconds())
+            stop.wait(min(max(sleep_for, 1), 60))
         
-        # Log'a kaydet
-        try:
-            if success:
-                success_count += 1
-                log_execution(bp_id, bp_name, 'success', 0, result)
-                print(f"✓ {bp_name} başarıyla tamamlandı")
-                notify('✅ Otomasyon Başarılı', f"📋 {bp_name}\n⏰ {datetime.now().strftime('%H:%M')}")
-            else:
-                error_count += 1
-                log_execution(bp_id, bp_name, 'error', 0, None, result)
-                print(f"✗ {bp_name} başarısız")
-                notify('❌ Otomasyon Hatası', f"📋 {bp_name}\n🔴 {result[:100]}")
-        except Exception as e:
-            print(f"⚠️ Log hatası: {e}")
+        print("⏳ Çalışan blueprint'lerin bitmesi bekleniyor...")
     
-    # Özet
-    print("\n" + "=" * 70)
-    print(f"📊 ÖZET")
-    print(f"   ✅ Başarılı: {success_count}")
-    print(f"   ❌ Hata: {error_count}")
-    print(f"   📊 Database: {DB_FILE}")
-    print("=" * 70)
-
-if __name__ == "__main__":
-    main()
+    print(f"📊 Daemon durdu - {dispatched} çalıştırma gönderildi")
+    notifications.close()
+    supabase_writes.close()
+    close_http_session()
+    close_database()
 
+# ==================== MAIN ====================
 
-def get_active_blueprints() -> list:
-    """Aktif blueprint'leri getir"""
-    return supabase_request('GET', 'blueprints?is_active=eq.true')
-
-def log_execution(blueprint_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
-    """Execution log kaydet"""
-    supabase_request('POST', 'execution_logs', {
-        'blueprint_id': blueprint_id,
-        'status': status,
-        'node_results': {'output': result} if result else None,
-        'error_message': error,
-        'finished_at': datetime.utcnow().isoformat() if status != 'running' else None
-    })
-
-def update_blueprint_status(blueprint_id: str, last_result: str):
-    """Blueprint durumunu güncelle"""
-    supabase_request('PATCH', f'blueprints?id=eq.{blueprint_id}', {
-        'last_run': datetime.utcnow().isoformat(),
-        'last_result': last_result,
-        'run_count': 'run_count + 1'  # Bu Supabase'de çalışmaz, RPC kullanın
-    })
-
-# ============================================
-# GEMINI AI
-# ============================================
+def process_blueprint(bp: Dict[str, Any]) -> bool:
+    """Senkron çağıranlar (daemon) için process_blueprint_async shim'i"""
+    return asyncio.run(process_blueprint_async(bp))
 
-def run_gemini_agent(node: dict, context: str) -> str:
-    """Gemini AI ile ajan çalıştır"""
-    if not GEMINI_API_KEY:
-        return f"[MOCK] {node.get('title', 'Agent')}: Simülasyon yanıtı"
+async def process_blueprint_async(bp: Dict[str, Any]) -> bool:
+    """Blueprint'i çalıştır, logla ve bildir - başarılı mı döndür"""
+    bp_id = bp.get('id')
+    bp_name = bp.get('name', 'İsimsiz')
+    notify_on = bp.get('notify_on') or ['error']
     
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+    print(f"\n🔍 Blueprint: {bp_name}")
     
-    prompt = f"""
-    ROL: {node.get('role', 'Assistant')}
-    GÖREV: {node.get('task', '')}
-    BAĞLAM: {context}
-    
-    Türkçe ve detaylı yanıt ver.
-    """
+    # Çalıştır
+    run_id = uuid.uuid4().hex
+    started_at = datetime.now()
+    started_at_utc = datetime.utcnow()
+    start = time.time()
+    success, result = await run_blueprint_async(bp, run_id=run_id)
+    total_time = int((time.time() - start) * 1000)
     
+    # Log'a kaydet (Supabase yazımları toplu, write-behind)
+    # Tampon dolunca senkron flush (Supabase POST / SQLite) yaptıklarından havuzda çalışır
     try:
-        response = requests.post(url, json={
-            'contents': [{'parts': [{'text': prompt}]}]
-        })
-        data = response.json()
-        
-        if 'candidates' in data and data['candidates']:
-            return data['candidates'][0]['content']['parts'][0]['text']
+        status = 'success' if success else 'error'
+        await offload(record_remote_execution, bp_id, status, result, started_at_utc, total_time)
+        if success:
+            await offload(log_execution, bp_id, bp_name, 'success', total_time, result, run_id=run_id, started_at=started_at)
+            print(f"✓ {bp_name} başarıyla tamamlandı")
+            if 'success' in notify_on or 'always' in notify_on:
+                notify('✅ Otomasyon Başarılı', f"📋 {bp_name}\n⏰ {datetime.now().strftime('%H:%M')}")
         else:
-            return f"API Hatası: {data.get('error', {}).get('message', 'Unknown')}"
-    except Exception as e:
-        return f"Bağlantı hatası: {str(e)}"
-
-# ============================================
-# NOTIFICATIONS
-# ============================================
-
-def send_telegram(message: str):
-    """Telegram bildirimi gönder"""
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        print("[Telegram] Yapılandırılmamış, atlaniyor...")
-        return
-    
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    try:
-        requests.post(url, json={
-            'chat_id': TELEGRAM_CHAT_ID,
-            'text': message,
-            'parse_mode': 'HTML'
-        })
-        print("[Telegram] Mesaj gönderildi ✓")
+            await offload(log_execution, bp_id, bp_name, 'error', total_time, None, result, run_id=run_id, started_at=started_at)
+            print(f"✗ {bp_name} başarısız")
+            if 'error' in notify_on or 'always' in notify_on:
+                notify('❌ Otomasyon Hatası', f"📋 {bp_name}\n🔴 {result[:100]}")
     except Exception as e:
-        print(f"[Telegram] Hata: {e}")
-
-def send_discord(message: str):
-    """Discord webhook bildirimi"""
-    if not DISCORD_WEBHOOK:
-        return
+        print(f"⚠️ Log hatası: {e}")
     
-    try:
-        requests.post(DISCORD_WEBHOOK, json={
-            'embeds': [{
-                'title': '🤖 OmniFlow',
-                'description': message,
-                'color': 5814783
-            }]
-        })
-        print("[Discord] Mesaj gönderildi ✓")
-    except Exception as e:
-        print(f"[Discord] Hata: {e}")
-
-def notify(title: str, message: str):
-    """Tüm kanallara bildirim gönder"""
-    full_message = f"<b>{title}</b>\n\n{message}"
-    send_telegram(full_message)
-    send_discord(f"**{title}**\n{message}")
+    return success
 
-# ============================================
-# MAIN RUNNER
-# ============================================
+def runnable_blueprints(blueprints: list) -> List[Dict[str, Any]]:
+    """Geçersiz/ID'siz kayıtları ayıkla"""
+    runnable = []
+    for bp in blueprints:
+        if not isinstance(bp, dict):
+            print(f"⚠️ Geçersiz blueprint formatı, atlaniyor...")
+            continue
+        
+        if not bp.get('id'):
+            print(f"⚠️ Blueprint ID bulunamadı, atlaniyor...")
+            continue
+        
+        runnable.append(bp)
+    return runnable
 
-def run_blueprint(blueprint: dict) -> tuple[bool, str]:
-    """Tek bir blueprint'i çalıştır"""
-    name = blueprint.get('name', 'Unknown')
-    nodes = blueprint.get('nodes', [])
-    context = blueprint.get('base_knowledge', '')
-    
-    print(f"\n{'='*50}")
-    print(f"🚀 Çalıştırılıyor: {name}")
-    print(f"📦 Düğüm sayısı: {len(nodes)}")
-    print(f"{'='*50}")
+async def run_blueprints_async(runnable: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Blueprint'leri tek event loop'ta çalıştır (en fazla BLUEPRINT_WORKERS) - (başarılı, hata)"""
+    slots = asyncio.Semaphore(max(1, BLUEPRINT_WORKERS))
     
-    results = []
-    
-    for i, node in enumerate(nodes):
-        node_title = node.get('title', f'Node {i+1}')
-        print(f"\n[{i+1}/{len(nodes)}] {node_title}...")
-        
-        try:
-            result = run_gemini_agent(node, context)
-            results.append({
-                'node': node_title,
-                'status': 'success',
-                'output': result[:500]  # İlk 500 karakter
-            })
-            context += f"\n\n{node_title} Çıktısı: {result[:200]}"
-            print(f"   ✓ Tamamlandı")
-        except Exception as e:
-            results.append({
-                'node': node_title,
-                'status': 'error',
-                'error': str(e)
-            })
-            print(f"   ✗ Hata: {e}")
-            return False, str(e)
+    async def guarded(bp: Dict[str, Any]) -> bool:
+        async with slots:
+            try:
+                return await process_blueprint_async(bp)
+            except Exception as e:
+                print(f"⚠️ {bp.get('name', 'İsimsiz')} beklenmeyen hata: {e}")
+                return False
     
-    return True, json.dumps(results, ensure_ascii=False)
+    outcomes = await asyncio.gather(*(guarded(bp) for bp in runnable))
+    success_count = sum(1 for success in outcomes if success)
+    return success_count, len(outcomes) - success_count
 
 def main():
     """Ana çalıştırıcı"""
-    print("="*60)
-    print("🤖 OmniFlow Automation Runner")
+    
+    print("=" * 70)
+    print("🤖 OmniFlow Automation Runner - HuggingFace Native (0 Maliyet)")
     print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("="*60)
+    print("=" * 70)
     
-    # Yapılandırma kontrolü
+    # Yapılandırma kontrol
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("❌ SUPABASE_URL ve SUPABASE_KEY gerekli!")
         return
     
+    # Database oluştur
+    init_database()
+    start_ollama_warmup()
+    
     # Aktif blueprint'leri getir
+    print("\n📋 Aktif blueprint'ler Supabase'den çekiliyor...")
     blueprints = get_active_blueprints()
     
-    # Debug: Gelen veriyi kontrol et
-    print(f"\n📋 Supabase yanıtı: {type(blueprints)}")
-    
-    # Liste olmayanı listeye çevir
-    if not isinstance(blueprints, list):
-        print(f"⚠️ Beklenmeyen format: {blueprints}")
-        blueprints = []
-    
-    print(f"📋 {len(blueprints)} aktif blueprint bulundu")
+    print(f"✓ {len(blueprints)} aktif blueprint bulundu")
     
     if not blueprints:
         print("ℹ️ Çalıştırılacak blueprint yok.")
         return
     
-    # Her blueprint'i çalıştır
-    success_count = 0
-    error_count = 0
+    runnable = runnable_blueprints(blueprints)
     
-    for bp in blueprints:
-        # Debug: Blueprint türünü kontrol et
-        print(f"\n🔍 Blueprint türü: {type(bp)}")
-        
-        # Eğer bp bir dict değilse atla
-        if not isinstance(bp, dict):
-            print(f"⚠️ Geçersiz blueprint formatı: {bp}")
-            continue
-        
-        bp_id = bp.get('id')
-        bp_name = bp.get('name', 'İsimsiz')
-        notify_on = bp.get('notify_on') or ['error']
-        
-        print(f"📋 Blueprint: {bp_name} (ID: {bp_id})")
-        
-        if not bp_id:
-            print("⚠️ Blueprint ID bulunamadı, atlaniyor...")
-            continue
-        
-        # Başlangıç logu
-        try:
-            log_execution(bp_id, 'running')
-        except Exception as e:
-            print(f"⚠️ Log hatası: {e}")
-        
-        # Çalıştır
-        success, result = run_blueprint(bp)
-        
-        # Sonuç logu
-        if success:
-            success_count += 1
-            try:
-                log_execution(bp_id, 'success', result=result)
-                update_blueprint_status(bp_id, 'success')
-            except Exception as e:
-                print(f"⚠️ Status güncelleme hatası: {e}")
-            
-            if 'success' in notify_on or 'always' in notify_on:
-                notify('✅ Otomasyon Tamamlandı', f"📋 {bp_name}\n⏰ {datetime.now().strftime('%H:%M')}")
-        else:
-            error_count += 1
-            try:
-                log_execution(bp_id, 'error', error=result)
-                update_blueprint_status(bp_id, 'error')
-            except Exception as e:
-                print(f"⚠️ Status güncelleme hatası: {e}")
-            
-            if 'error' in notify_on or 'always' in notify_on:
-                notify('❌ Otomasyon Hatası', f"📋 {bp_name}\n🔴 {result[:200]}")
+    # Blueprint'leri tek event loop'ta eşzamanlı çalıştır
+    print(f"⚙️ {min(len(runnable), max(1, BLUEPRINT_WORKERS))} paralel blueprint, "
+          f"en fazla {ASYNC_MAX_IN_FLIGHT} eşzamanlı çağrı")
+    success_count, error_count = asyncio.run(run_blueprints_async(runnable))
+    
+    # Bekleyen bildirimleri gönder (özet sayıları kesinleşsin)
+    notifications.close()
     
     # Özet
-    print("\n" + "="*60)
-    print(f"📊 ÖZET: {success_count} başarılı, {error_count} hata")
-    print("="*60)
+    print("\n" + "=" * 70)
+    print(f"📊 ÖZET")
+    print(f"   ✅ Başarılı: {success_count}")
+    print(f"   ❌ Hata: {error_count}")
+    if LLM_CACHE_ENABLED:
+        stats = cache_stats()
+        print(f"   ⚡ Cache: {stats['hits']} hit / {stats['misses']} miss")
+    for key, stats in rate_limiter_stats().items():
+        print(f"   🚦 {key}: {stats['rate']} req/s, {stats['throttled']} throttle")
+    hedges = hedge_stats()
+    if hedges['calls']:
+        print(f"   🏁 Hedge: {hedges['calls']} çağrı, {hedges['fired']} ateşlendi, {hedges['won']} kazandı, {hedges['cancelled']} iptal")
+    for key, stats in router_stats().items():
+        print(f"   🧭 {key}: p50 {stats['p50_ms']}ms / p95 {stats['p95_ms']}ms, "
+              f"hata %{stats['error_rate'] * 100:.0f}, devre {stats['state']}")
+    notes = notifications.stats()
+    if notes['queued'] or notes['digested']:
+        print(f"   📨 Bildirim: {notes['sent']} gönderildi, {notes['failed']} başarısız, "
+              f"{notes['dropped']} düştü, {notes['digested']} özetlendi")
+    print(f"   📊 Database: {DB_FILE}")
+    print("=" * 70)
+    
+    supabase_writes.close()
+    close_http_session()
+    close_database()
 
 if __name__ == "__main__":
-    main()
+    if '--daemon' in sys.argv or os.environ.get('RUNNER_MODE') == 'daemon':
+        run_daemon()
+    else:
+        main()
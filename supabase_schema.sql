@@ -23,11 +23,17 @@ CREATE TABLE IF NOT EXISTS blueprints (
   last_run TIMESTAMPTZ,
   last_result TEXT,
   run_count INTEGER DEFAULT 0,
+  use_cache BOOLEAN DEFAULT true, -- runner LLM yanıt cache'i (false = her seferinde üret)
+  hedge_requests BOOLEAN, -- yavaş model çağrılarına kopya istek (NULL = runner HEDGE_REQUESTS)
   
   created_at TIMESTAMPTZ DEFAULT NOW(),
   updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Mevcut kurulumlar için
+ALTER TABLE blueprints ADD COLUMN IF NOT EXISTS use_cache BOOLEAN DEFAULT true;
+ALTER TABLE blueprints ADD COLUMN IF NOT EXISTS hedge_requests BOOLEAN;
+
 -- 2. EXECUTION LOGS TABLE
 CREATE TABLE IF NOT EXISTS execution_logs (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -73,10 +79,15 @@ CREATE POLICY "Allow all for notification_settings" ON notification_settings
   FOR ALL USING (true) WITH CHECK (true);
 
 -- 6. UPDATED_AT TRIGGER
+-- Runner'ın durum alanları (last_run, last_result, run_count) updated_at'i değiştirmez,
+-- böylece artımlı blueprint senkronu her çalıştırmada nodes'u yeniden çekmez
 CREATE OR REPLACE FUNCTION update_updated_at()
 RETURNS TRIGGER AS $$
 BEGIN
-  NEW.updated_at = NOW();
+  IF to_jsonb(NEW) - ARRAY['last_run', 'last_result', 'run_count', 'updated_at']
+     IS DISTINCT FROM to_jsonb(OLD) - ARRAY['last_run', 'last_result', 'run_count', 'updated_at'] THEN
+    NEW.updated_at = NOW();
+  END IF;
   RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -86,7 +97,20 @@ CREATE TRIGGER blueprints_updated_at
   FOR EACH ROW
   EXECUTE FUNCTION update_updated_at();
 
--- 7. SAMPLE DATA (Opsiyonel - Kaldırıldı)
+-- 7. RUNNER DURUM RPC'Sİ
+-- Toplu durum güncellemesi: runs = [{"id", "last_run", "last_result", "runs"}, ...]
+-- run_count atomik olarak artırılır (runner tek istekte birden çok blueprint yazar)
+CREATE OR REPLACE FUNCTION record_blueprint_runs(runs JSONB)
+RETURNS VOID AS $$
+  UPDATE blueprints b SET
+    last_run = (r->>'last_run')::TIMESTAMPTZ,
+    last_result = r->>'last_result',
+    run_count = COALESCE(b.run_count, 0) + COALESCE((r->>'runs')::INTEGER, 1)
+  FROM jsonb_array_elements(runs) AS r
+  WHERE b.id = (r->>'id')::UUID;
+$$ LANGUAGE sql;
+
+-- 8. SAMPLE DATA (Opsiyonel - Kaldırıldı)
 -- Tablolar boş olarak oluşturulacak
 -- OmniFlow uygulamasından blueprint ekleyebilirsiniz
 